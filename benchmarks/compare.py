@@ -0,0 +1,57 @@
+from typing import Dict, Any, Tuple
+import argparse
+import json
+import sys
+
+"""
+Compare two benchmark result files
+
+Results are matched by scenario and implementation. The median wall time and the peak memory of
+the new file are reported relative to the baseline, and the script exits with status 1 if any of
+them regressed by more than the threshold.
+
+Usage (from the repository root):
+    python -m benchmarks.compare benchmarks/results/<baseline>.json benchmarks/results/<new>.json
+"""
+
+DEFAULT_THRESHOLD = 0.1  # 10% slower or larger counts as a regression
+METRICS = ["wall_time_median", "peak_memory_bytes"]
+
+
+def load_results(path: str) -> Tuple[str, Dict[Tuple[str, str], Dict[str, Any]]]:
+    with open(path) as f:
+        data = json.load(f)
+    return data.get("commit", "unknown"), {(result["scenario"], result["implementation"]): result for result in data["results"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="relative increase counted as a regression")
+    args = parser.parse_args()
+
+    baseline_commit, baseline = load_results(args.baseline)
+    new_commit, new = load_results(args.new)
+    print(f"Baseline {baseline_commit[:12]} -> new {new_commit[:12]}")
+
+    regressions = 0
+    for key in sorted(baseline.keys() & new.keys()):
+        ratios = []
+        for metric in METRICS:
+            old_value = baseline[key][metric]
+            ratio = new[key][metric] / old_value if old_value else 1.0
+            ratios.append(ratio)
+            if ratio > 1 + args.threshold:
+                regressions += 1
+        flag = " REGRESSION" if any(ratio > 1 + args.threshold for ratio in ratios) else ""
+        print(f"{key[0]:<40} {key[1]:<24} time x{ratios[0]:.2f} memory x{ratios[1]:.2f}{flag}")
+
+    missing = baseline.keys() ^ new.keys()
+    if missing:
+        print(f"{len(missing)} scenario/implementation pairs are only in one of the files")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any
+import random
+
+"""
+Synthetic availability generators for the benchmarks
+
+Availability is generated per participant as a sequence of 30 minute slots over the date range.
+Density is the fraction of slots a participant is available for. Clustering is the probability
+that a slot repeats the state of the slot before it, so higher clustering gives fewer, longer runs
+of availability (closer to what users paint in the webapp) while keeping the same density.
+"""
+
+SLOT_SIZE = 30  # minutes
+SLOTS_PER_DAY = 24 * 60 // SLOT_SIZE
+BASE_TIME = datetime(2025, 1, 6, 0, 0, tzinfo=timezone(timedelta(hours=8)))
+
+
+def generate_availability_blocks(participants: int, days: int, density: float, clustering: float, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Generate availability blocks in the database format for an event
+    """
+    rng = random.Random(seed)
+    slot_count = days * SLOTS_PER_DAY
+    # format every slot once, participants share the same start and end strings as in the database
+    slot_times = [(BASE_TIME + timedelta(minutes=SLOT_SIZE * slot)).isoformat() for slot in range(slot_count + 1)]
+
+    availability_blocks = []
+    for participant in range(participants):
+        user_uuid = f"user-{participant:04d}"
+        available = rng.random() < density
+        for slot in range(slot_count):
+            if slot and rng.random() >= clustering:
+                available = rng.random() < density
+            if available:
+                availability_blocks.append({
+                    "start_time": slot_times[slot],
+                    "end_time": slot_times[slot + 1],
+                    "event_id": "benchmark",
+                    "user_uuid": user_uuid
+                })
+    return availability_blocks
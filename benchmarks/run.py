@@ -0,0 +1,191 @@
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Callable, Tuple
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the bot is run from bot/ and imports its modules from there
+sys.path.insert(0, os.path.join(REPO_ROOT, "bot"))
+sys.path.insert(0, REPO_ROOT)
+
+# Import from benchmarks
+from benchmarks.generators import generate_availability_blocks
+
+# Import from best time algo
+from best_time_algo.best_time_algo import BestTimeAlgo, BITSET_BACKEND, NUMPY_BACKEND, MAP_BACKEND
+from best_time_algo.availability_matrix import parse_slot
+from best_time_algo.sleep_masks import get_slot_of_day
+from best_time_algo.parallel_solver import ParallelSolver
+
+# Import from shared
+from shared.business_logic.services.scheduler import Scheduler
+
+"""
+Benchmark suite for BestTimeAlgo and the shared Scheduler
+
+Every scenario generates synthetic availability and runs each implementation on it. The wall time
+of every run is recorded (min and median over the repeats) and the peak memory allocated by one
+additional run is measured with tracemalloc. Results are written to a JSON file named after the
+current commit, so two commits can be compared with benchmarks/compare.py.
+
+Usage (from the repository root):
+    python -m benchmarks.run                 # full grid
+    python -m benchmarks.run --quick         # small grid for a quick check
+    python -m benchmarks.run --output out.json --repeat 5
+"""
+
+PARTICIPANTS = [5, 20, 100]
+DAYS = [1, 7, 14]
+DENSITIES = [0.3, 0.7]
+CLUSTERING = [0.0, 0.8]
+QUICK_PARTICIPANTS = [5, 20]
+QUICK_DAYS = [1, 7]
+DEFAULT_REPEAT = 3
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+
+def clear_caches():
+    """
+    Clear the parse caches between runs so every run starts cold
+    """
+    parse_slot.cache_clear()
+    get_slot_of_day.cache_clear()
+
+
+def run_best_time_algo(backend: str) -> Callable[[List[Dict[str, Any]]], Any]:
+    def run(availability_blocks: List[Dict[str, Any]]) -> Any:
+        return BestTimeAlgo(backend=backend)._process_availability_blocks(availability_blocks)
+    return run
+
+
+def run_best_time_algo_within(availability_blocks: List[Dict[str, Any]]) -> Any:
+    # a budget the search never reaches, measures the best-bound-first search to completion
+    return BestTimeAlgo().get_best_times_within(availability_blocks, 3600)
+
+
+# every event with more than one chunk of days is solved in the worker processes
+parallel_solver = ParallelSolver(min_blocks=0)
+
+
+def run_parallel_solver(availability_blocks: List[Dict[str, Any]]) -> Any:
+    return parallel_solver.get_best_event_blocks(BestTimeAlgo(), availability_blocks)
+
+
+def run_shared_scheduler(availability_blocks: List[Dict[str, Any]]) -> Any:
+    # the scheduler prints every sorted slot, keep that out of the timings
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Scheduler()._process_availability_blocks(availability_blocks)
+
+
+IMPLEMENTATIONS = {
+    "best_time_algo.bitset": run_best_time_algo(BITSET_BACKEND),
+    "best_time_algo.numpy": run_best_time_algo(NUMPY_BACKEND),
+    "best_time_algo.map": run_best_time_algo(MAP_BACKEND),
+    "best_time_algo.within": run_best_time_algo_within,
+    "best_time_algo.parallel": run_parallel_solver,
+    "shared.scheduler": run_shared_scheduler,
+}
+
+
+def get_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def get_scenarios(quick: bool) -> List[Dict[str, Any]]:
+    participants = QUICK_PARTICIPANTS if quick else PARTICIPANTS
+    days = QUICK_DAYS if quick else DAYS
+    scenarios = []
+    for participant_count, day_count, density, clustering in itertools.product(participants, days, DENSITIES, CLUSTERING):
+        scenarios.append({
+            "scenario": f"p{participant_count}-d{day_count}-density{density}-clustering{clustering}",
+            "participants": participant_count,
+            "days": day_count,
+            "density": density,
+            "clustering": clustering,
+        })
+    return scenarios
+
+
+def measure(run: Callable[[List[Dict[str, Any]]], Any], availability_blocks: List[Dict[str, Any]], repeat: int) -> Tuple[List[float], int]:
+    """
+    Time repeat runs, then measure the peak memory of one more run
+    """
+    wall_times = []
+    for _ in range(repeat):
+        clear_caches()
+        start = time.perf_counter()
+        run(availability_blocks)
+        wall_times.append(time.perf_counter() - start)
+
+    clear_caches()
+    tracemalloc.start()
+    try:
+        run(availability_blocks)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return wall_times, peak
+
+
+def run_benchmarks(scenarios: List[Dict[str, Any]], implementations: List[str], repeat: int) -> List[Dict[str, Any]]:
+    results = []
+    for scenario in scenarios:
+        availability_blocks = generate_availability_blocks(scenario["participants"], scenario["days"], scenario["density"], scenario["clustering"])
+        for implementation in implementations:
+            wall_times, peak = measure(IMPLEMENTATIONS[implementation], availability_blocks, repeat)
+            result = {
+                **scenario,
+                "blocks": len(availability_blocks),
+                "implementation": implementation,
+                "repeat": repeat,
+                "wall_time_min": min(wall_times),
+                "wall_time_median": statistics.median(wall_times),
+                "peak_memory_bytes": peak,
+            }
+            results.append(result)
+            print(f"{scenario['scenario']:<40} {implementation:<24} {result['wall_time_median'] * 1000:>10.2f} ms {peak / 1024:>10.1f} KiB")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BestTimeAlgo and the shared Scheduler")
+    parser.add_argument("--quick", action="store_true", help="run a small grid of scenarios")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed runs per scenario and implementation")
+    parser.add_argument("--implementation", action="append", choices=sorted(IMPLEMENTATIONS), help="only run the given implementation (repeatable)")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<commit>.json)")
+    args = parser.parse_args()
+
+    commit = get_commit()
+    implementations = args.implementation or list(IMPLEMENTATIONS)
+    results = run_benchmarks(get_scenarios(args.quick), implementations, args.repeat)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{commit[:12]}.json")
+    with open(output, "w") as f:
+        json.dump({
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results,
+        }, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
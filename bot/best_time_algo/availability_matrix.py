@@ -0,0 +1,296 @@
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import List, Dict, Any, Iterator, Tuple, Optional
+import bisect
+
+# Import from utils
+from utils.date_utils import parse_date, format_date
+
+# Import from best time algo
+from best_time_algo.deadline import Deadline
+
+"""
+Bitset representation of the availability of an event
+
+Every participant is assigned a bit position and every distinct time slot an integer index.
+The participants available at a slot are stored as a single integer mask, so the participants
+common to a window of slots is a bitwise AND of the slot masks and the number of participants
+is a popcount of the result.
+
+Slots are keyed by epoch minutes so that the same instant expressed in different timezone offsets
+maps to the same slot (the same behaviour as keying the availability map by aware datetimes).
+Each slot also keeps the UTC offset (in minutes) it was first seen with, so the matrix holds only
+integers from ingestion until a window is formatted back to an ISO string for the result.
+Ingestion can be given a deadline, in which case the matrix holds only the blocks parsed before it.
+
+Availability can be weighted ("preferred" above "possible"). Participants available with a weight
+other than the default are kept in one more mask per slot for every such weight, so the weighted
+count of a window is its participant count times its length plus the extra weight of the
+participants of its mask in those masks.
+"""
+
+SLOT_PARSE_CACHE_SIZE = 1 << 16
+INGEST_CHECK_INTERVAL = 1024  # Blocks parsed between checks of the ingestion deadline
+POSSIBLE_WEIGHT = 1  # Available if needed
+PREFERRED_WEIGHT = 2  # Available and preferred
+DEFAULT_WEIGHT = POSSIBLE_WEIGHT  # Weight of availability blocks without one
+
+
+def get_block_weight(block: Dict[str, Any]) -> int:
+    """
+    Weight of an availability block, the default if it has none
+    """
+    return block.get("weight") or DEFAULT_WEIGHT
+
+class AvailabilityMatrix:
+    """
+    Participants x slots availability stored as one participant bitmask per slot
+    """
+    def __init__(self, slot_size: int = 30):
+        self.slot_size = slot_size
+        self.participants: List[str] = []  # bit position -> user uuid
+        self.participant_bits: Dict[str, int] = {}  # user uuid -> bit position
+        self.slot_minutes: List[int] = []  # slot index -> epoch minute, sorted ascending
+        self.slot_index: Dict[int, int] = {}  # epoch minute -> slot index
+        self.slot_offsets: List[int] = []  # slot index -> utc offset in minutes the slot was first seen with
+        self.slot_masks: List[int] = []  # slot index -> bitmask of available participants
+        self.weight_masks: Dict[int, List[int]] = {}  # weight other than the default -> slot index -> bitmask of participants available with it
+        self.complete = True  # False if blocks were left out to meet an ingestion deadline
+
+    @classmethod
+    def from_availability_blocks(cls, availability_blocks: List[Dict[str, Any]], slot_size: int = 30, deadline: Optional[Deadline] = None) -> 'AvailabilityMatrix':
+        """
+        Build the matrix from availability blocks in the database format
+        With a deadline only the blocks parsed before it are added, and
+        complete is False if any were left out.
+        """
+        matrix = cls(slot_size)
+
+        # parse every start time to integers once, keeping the first offset seen for each instant
+        parsed_blocks = []
+        weighted_blocks = []  # only the blocks with a weight other than the default, usually few
+        first_seen = {}
+        for count, block in enumerate(availability_blocks):
+            if deadline is not None and count % INGEST_CHECK_INTERVAL == 0 and deadline.expired():
+                matrix.complete = False
+                break
+            minute, offset = parse_slot(block["start_time"])
+            if minute not in first_seen:
+                first_seen[minute] = offset
+            parsed_blocks.append((minute, block["user_uuid"]))
+            weight = block.get("weight")
+            if weight and weight != DEFAULT_WEIGHT:
+                weighted_blocks.append((minute, block["user_uuid"], weight))
+
+        # assign bits in sorted order so that decoded participant lists are already sorted
+        for user_uuid in sorted({user_uuid for minute, user_uuid in parsed_blocks}):
+            matrix._add_participant(user_uuid)
+
+        for minute in sorted(first_seen):
+            matrix.slot_index[minute] = len(matrix.slot_minutes)
+            matrix.slot_minutes.append(minute)
+            matrix.slot_offsets.append(first_seen[minute])
+            matrix.slot_masks.append(0)
+
+        for minute, user_uuid in parsed_blocks:
+            matrix.slot_masks[matrix.slot_index[minute]] |= 1 << matrix.participant_bits[user_uuid]
+
+        slot_count = len(matrix.slot_minutes)
+        for minute, user_uuid, weight in weighted_blocks:
+            matrix.weight_masks.setdefault(weight, [0] * slot_count)[matrix.slot_index[minute]] |= 1 << matrix.participant_bits[user_uuid]
+
+        return matrix
+
+    def _add_participant(self, user_uuid: str) -> int:
+        """
+        Assign the next free bit position to a participant
+        """
+        bit = len(self.participants)
+        self.participants.append(user_uuid)
+        self.participant_bits[user_uuid] = bit
+        return bit
+
+    def ensure_participant(self, user_uuid: str) -> int:
+        """
+        Get the bit position of a participant, assigning one if they have none yet
+        """
+        bit = self.participant_bits.get(user_uuid)
+        return self._add_participant(user_uuid) if bit is None else bit
+
+    def get_slot_count(self) -> int:
+        return len(self.slot_minutes)
+
+    def get_local_hour(self, index: int) -> int:
+        """
+        Hour of the day of the slot in the offset it was first seen with
+        """
+        return (self.slot_minutes[index] + self.slot_offsets[index]) // 60 % 24
+
+    def format_slot(self, index: int, length: int = 0) -> str:
+        """
+        Format the start of the slot, or the end of a window of length slots from it, as an ISO string
+        """
+        return format_slot(self.slot_minutes[index] + length * self.slot_size, self.slot_offsets[index])
+
+    def get_participant_count(self, index: int) -> int:
+        """
+        Number of participants available at the slot
+        """
+        return self.slot_masks[index].bit_count()
+
+    def get_participant_mask(self, user_uuid: str) -> int:
+        """
+        Single bit mask of a participant, 0 if the participant has no availability
+        """
+        bit = self.participant_bits.get(user_uuid)
+        return 0 if bit is None else 1 << bit
+
+    def decode_participants(self, mask: int) -> List[str]:
+        """
+        Convert a participant bitmask back to a sorted list of user uuids
+        """
+        participants = []
+        while mask:
+            low_bit = mask & -mask
+            participants.append(self.participants[low_bit.bit_length() - 1])
+            mask ^= low_bit
+        return sorted(participants)
+
+    def get_range_mask(self, start_minute: int, end_minute: int) -> int:
+        """
+        Bitmask of the participants available at any slot starting in [start_minute, end_minute]
+        """
+        start = bisect.bisect_left(self.slot_minutes, start_minute)
+        end = bisect.bisect_right(self.slot_minutes, end_minute)
+        mask = 0
+        for slot_mask in self.slot_masks[start:end]:
+            mask |= slot_mask
+        return mask
+
+    def ensure_slot(self, minute: int, offset: int) -> int:
+        """
+        Get the index of the slot at the epoch minute, inserting an empty slot if it does not exist
+        Inserting before the last slot shifts the indices of every later slot.
+        """
+        index = self.slot_index.get(minute)
+        if index is not None:
+            return index
+        index = bisect.bisect_left(self.slot_minutes, minute)
+        self.slot_minutes.insert(index, minute)
+        self.slot_offsets.insert(index, offset)
+        self.slot_masks.insert(index, 0)
+        for masks in self.weight_masks.values():
+            masks.insert(index, 0)
+        if index == len(self.slot_minutes) - 1:
+            self.slot_index[minute] = index
+        else:
+            self.slot_index = {slot_minute: i for i, slot_minute in enumerate(self.slot_minutes)}
+        return index
+
+    def set_available(self, user_uuid: str, minute: int, available: bool):
+        """
+        Set or clear the bit of a participant at an existing slot
+        """
+        bit = self.ensure_participant(user_uuid)
+        index = self.slot_index[minute]
+        if available:
+            self.slot_masks[index] |= 1 << bit
+        else:
+            self.slot_masks[index] &= ~(1 << bit)
+
+    def set_weight(self, user_uuid: str, minute: int, weight: int):
+        """
+        Set the weight of a participant at an existing slot
+        The weight only counts while the participant is available at the slot.
+        """
+        bit = self.ensure_participant(user_uuid)
+        index = self.slot_index[minute]
+        for masks_weight, masks in self.weight_masks.items():
+            if masks_weight != weight:
+                masks[index] &= ~(1 << bit)
+        if weight != DEFAULT_WEIGHT:
+            self.weight_masks.setdefault(weight, [0] * len(self.slot_minutes))[index] |= 1 << bit
+
+    def get_max_weight(self) -> int:
+        """
+        Largest weight of any participant at any slot
+        """
+        return max([DEFAULT_WEIGHT, *(weight for weight, masks in self.weight_masks.items() if any(masks))])
+
+    def get_weighted_count(self, start: int, length: int, mask: int) -> int:
+        """
+        Sum of the weights of the participants of the mask over the window of length slots from the start
+        Every participant of the mask must be available at every slot of the window.
+        """
+        weighted_count = mask.bit_count() * length
+        for weight, masks in self.weight_masks.items():
+            weighted_count += (weight - DEFAULT_WEIGHT) * sum((mask & weight_mask).bit_count() for weight_mask in masks[start:start + length])
+        return weighted_count
+
+    def window_at(self, start: int, min_participants: int, min_length: int, max_length: int, jumps: Optional[List[bool]] = None) -> Optional[Tuple[int, int]]:
+        """
+        Get the (length in slots, participant mask) of the window starting at the slot, None if there is none
+
+        The window is extended one slot at a time for as long as the next slot is contiguous, the
+        participants common to the whole window stay at or above the minimum and, if jumps are given,
+        the participant count does not jump between the last slot and the next one. Windows shorter
+        than the minimum length are discarded.
+        """
+        mask = self.slot_masks[start]
+        if mask.bit_count() < min_participants:
+            return None
+        start_minute = self.slot_minutes[start]
+        last_index = start
+        length = 1
+        while length < max_length:
+            if jumps is not None and jumps[last_index]:
+                break
+            next_index = self.slot_index.get(start_minute + length * self.slot_size)
+            if next_index is None:
+                break
+            new_mask = mask & self.slot_masks[next_index]
+            if new_mask.bit_count() < min_participants:
+                break
+            mask = new_mask
+            last_index = next_index
+            length += 1
+        if length < min_length:
+            return None
+        return length, mask
+
+    def iter_windows(self, min_participants: int, min_length: int, max_length: int, jumps: Optional[List[bool]] = None) -> Iterator[Tuple[int, int, int]]:
+        """
+        Yield (start index, length in slots, participant mask) for the window from every start slot
+        """
+        for start in range(len(self.slot_minutes)):
+            window = self.window_at(start, min_participants, min_length, max_length, jumps)
+            if window is not None:
+                yield start, window[0], window[1]
+
+
+def to_epoch_minute(dt: datetime) -> int:
+    """
+    Convert an aware datetime to minutes since the unix epoch
+    """
+    return int(dt.timestamp()) // 60
+
+
+@lru_cache(maxsize=SLOT_PARSE_CACHE_SIZE)
+def parse_slot(datetime_str: str) -> Tuple[int, int]:
+    """
+    Parse a start time string to (epoch minute, utc offset in minutes)
+    The same start times repeat for every participant, so each distinct string is parsed once
+    """
+    dt = parse_date(datetime_str)
+    if dt.tzinfo is None:
+        # naive times are UTC, as in format_date
+        dt = dt.replace(tzinfo=timezone.utc)
+    return to_epoch_minute(dt), int(dt.utcoffset().total_seconds()) // 60
+
+
+def format_slot(minute: int, offset: int) -> str:
+    """
+    Format an epoch minute as an ISO string in the given utc offset (in minutes)
+    """
+    return format_date(datetime.fromtimestamp(minute * 60, timezone(timedelta(minutes=offset))))
+
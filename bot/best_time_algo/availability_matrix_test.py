@@ -0,0 +1,124 @@
+import unittest
+import random
+from datetime import datetime, timedelta, timezone
+from best_time_algo.availability_matrix import AvailabilityMatrix, to_epoch_minute, parse_slot, format_slot, PREFERRED_WEIGHT
+from best_time_algo.best_time_algo import BestTimeAlgo, MAP_BACKEND, BITSET_BACKEND
+
+class AvailabilityMatrixTest(unittest.TestCase):
+    def test_from_availability_blocks(self):
+        availability_blocks = [
+            {"start_time": "2025-01-01T10:30:00+08:00", "end_time": "2025-01-01T11:00:00+08:00", "event_id": "1", "user_uuid": "2"},
+            {"start_time": "2025-01-01T10:00:00+08:00", "end_time": "2025-01-01T10:30:00+08:00", "event_id": "1", "user_uuid": "1"},
+            {"start_time": "2025-01-01T02:30:00+00:00", "end_time": "2025-01-01T03:00:00+00:00", "event_id": "1", "user_uuid": "1"},
+        ]
+        matrix = AvailabilityMatrix.from_availability_blocks(availability_blocks)
+        self.assertEqual(matrix.participants, ["1", "2"])
+        self.assertEqual(matrix.get_slot_count(), 2)
+        self.assertEqual(matrix.slot_masks, [0b01, 0b11])
+        self.assertEqual(matrix.get_participant_count(1), 2)
+        # the same instant in another offset is the same slot, keeping the first offset seen
+        self.assertEqual(matrix.slot_offsets, [480, 480])
+        self.assertEqual(matrix.format_slot(1), "2025-01-01T10:30:00+08:00")
+        self.assertEqual(matrix.format_slot(1, 2), "2025-01-01T11:30:00+08:00")
+        self.assertEqual(matrix.get_local_hour(1), 10)
+        self.assertEqual(matrix.slot_minutes[1] - matrix.slot_minutes[0], 30)
+
+    def test_decode_participants(self):
+        availability_blocks = [
+            {"start_time": "2025-01-01T10:00:00+08:00", "end_time": "2025-01-01T10:30:00+08:00", "event_id": "1", "user_uuid": "c"},
+            {"start_time": "2025-01-01T10:00:00+08:00", "end_time": "2025-01-01T10:30:00+08:00", "event_id": "1", "user_uuid": "a"},
+            {"start_time": "2025-01-01T10:00:00+08:00", "end_time": "2025-01-01T10:30:00+08:00", "event_id": "1", "user_uuid": "b"},
+        ]
+        matrix = AvailabilityMatrix.from_availability_blocks(availability_blocks)
+        self.assertEqual(matrix.decode_participants(matrix.slot_masks[0]), ["a", "b", "c"])
+        self.assertEqual(matrix.decode_participants(matrix.get_participant_mask("c") | matrix.get_participant_mask("a")), ["a", "c"])
+        self.assertEqual(matrix.get_participant_mask("unknown"), 0)
+        self.assertEqual(matrix.decode_participants(0), [])
+
+    def test_iter_windows(self):
+        availability_blocks = [
+            {"start_time": "2025-01-01T10:00:00+08:00", "end_time": "2025-01-01T10:30:00+08:00", "event_id": "1", "user_uuid": "1"},
+            {"start_time": "2025-01-01T10:00:00+08:00", "end_time": "2025-01-01T10:30:00+08:00", "event_id": "1", "user_uuid": "2"},
+            {"start_time": "2025-01-01T10:30:00+08:00", "end_time": "2025-01-01T11:00:00+08:00", "event_id": "1", "user_uuid": "1"},
+            {"start_time": "2025-01-01T10:30:00+08:00", "end_time": "2025-01-01T11:00:00+08:00", "event_id": "1", "user_uuid": "2"},
+            # gap at 11:00
+            {"start_time": "2025-01-01T11:30:00+08:00", "end_time": "2025-01-01T12:00:00+08:00", "event_id": "1", "user_uuid": "1"},
+            {"start_time": "2025-01-01T11:30:00+08:00", "end_time": "2025-01-01T12:00:00+08:00", "event_id": "1", "user_uuid": "2"},
+        ]
+        matrix = AvailabilityMatrix.from_availability_blocks(availability_blocks)
+        self.assertEqual(list(matrix.iter_windows(2, 2, 4)), [(0, 2, 0b11)])
+        self.assertEqual(list(matrix.iter_windows(2, 1, 4)), [(0, 2, 0b11), (1, 1, 0b11), (2, 1, 0b11)])
+        self.assertEqual(list(matrix.iter_windows(3, 1, 4)), [])
+
+    def test_matches_map_backend(self):
+        rng = random.Random(7)
+        base = datetime(2025, 1, 1, 9, 0, tzinfo=timezone(timedelta(hours=8)))
+        availability_blocks = []
+        for user in range(12):
+            for slot in range(40):
+                if rng.random() < 0.6:
+                    start = base + timedelta(minutes=30 * slot)
+                    availability_blocks.append({
+                        "start_time": start.isoformat(),
+                        "end_time": (start + timedelta(minutes=30)).isoformat(),
+                        "event_id": "1",
+                        "user_uuid": f"user-{user:02d}"
+                    })
+        rng.shuffle(availability_blocks)
+        for min_participants, min_block_size, max_block_size in [(2, 2, 4), (3, 1, 6), (5, 2, 8)]:
+            map_algo = BestTimeAlgo(min_participants=min_participants, min_block_size=min_block_size, max_block_size=max_block_size, backend=MAP_BACKEND)
+            bitset_algo = BestTimeAlgo(min_participants=min_participants, min_block_size=min_block_size, max_block_size=max_block_size, backend=BITSET_BACKEND)
+            self.assertEqual(
+                map_algo._create_event_blocks(map_algo._create_availability_map(availability_blocks)),
+                bitset_algo._create_event_blocks_from_matrix(bitset_algo._create_availability_matrix(availability_blocks))
+            )
+            self.assertEqual(map_algo._process_availability_blocks(availability_blocks), bitset_algo._process_availability_blocks(availability_blocks))
+
+    def test_weights(self):
+        availability_blocks = [
+            {"start_time": "2025-01-01T10:00:00+08:00", "end_time": "2025-01-01T10:30:00+08:00", "event_id": "1", "user_uuid": "1", "weight": PREFERRED_WEIGHT},
+            {"start_time": "2025-01-01T10:00:00+08:00", "end_time": "2025-01-01T10:30:00+08:00", "event_id": "1", "user_uuid": "2"},
+            {"start_time": "2025-01-01T10:30:00+08:00", "end_time": "2025-01-01T11:00:00+08:00", "event_id": "1", "user_uuid": "1", "weight": PREFERRED_WEIGHT},
+            {"start_time": "2025-01-01T10:30:00+08:00", "end_time": "2025-01-01T11:00:00+08:00", "event_id": "1", "user_uuid": "2", "weight": PREFERRED_WEIGHT},
+        ]
+        matrix = AvailabilityMatrix.from_availability_blocks(availability_blocks)
+        self.assertEqual(matrix.weight_masks, {PREFERRED_WEIGHT: [0b01, 0b11]})
+        self.assertEqual(matrix.get_max_weight(), PREFERRED_WEIGHT)
+        # 2 participants over 2 slots, with 3 of the 4 preferred
+        self.assertEqual(matrix.get_weighted_count(0, 2, 0b11), 7)
+        self.assertEqual(matrix.get_weighted_count(1, 1, 0b10), 2)
+
+        # a slot inserted before the others has no weights, the weights of the others move with them
+        matrix.ensure_slot(matrix.slot_minutes[0] - 30, 480)
+        self.assertEqual(matrix.weight_masks, {PREFERRED_WEIGHT: [0, 0b01, 0b11]})
+        matrix.set_weight("2", matrix.slot_minutes[2], 1)
+        matrix.set_weight("1", matrix.slot_minutes[0], PREFERRED_WEIGHT)
+        self.assertEqual(matrix.weight_masks, {PREFERRED_WEIGHT: [0b01, 0b01, 0b01]})
+        self.assertEqual(matrix.get_weighted_count(1, 2, 0b11), 6)
+
+    def test_get_range_mask(self):
+        availability_blocks = [
+            {"start_time": "2025-01-01T10:00:00+08:00", "end_time": "2025-01-01T10:30:00+08:00", "event_id": "1", "user_uuid": "1"},
+            {"start_time": "2025-01-01T10:30:00+08:00", "end_time": "2025-01-01T11:00:00+08:00", "event_id": "1", "user_uuid": "2"},
+            {"start_time": "2025-01-01T11:30:00+08:00", "end_time": "2025-01-01T12:00:00+08:00", "event_id": "1", "user_uuid": "3"},
+        ]
+        matrix = AvailabilityMatrix.from_availability_blocks(availability_blocks)
+        start = matrix.slot_minutes[0]
+        self.assertEqual(matrix.get_range_mask(start, start + 30), 0b011)
+        self.assertEqual(matrix.get_range_mask(start + 15, start + 90), 0b110)
+        self.assertEqual(matrix.get_range_mask(start + 120, start + 180), 0)
+
+    def test_to_epoch_minute(self):
+        self.assertEqual(to_epoch_minute(datetime(1970, 1, 1, 1, 0, tzinfo=timezone.utc)), 60)
+        self.assertEqual(to_epoch_minute(datetime(1970, 1, 1, 9, 0, tzinfo=timezone(timedelta(hours=8)))), 60)
+
+    def test_parse_and_format_slot(self):
+        self.assertEqual(parse_slot("1970-01-01T09:00:00+08:00"), (60, 480))
+        self.assertEqual(parse_slot("1970-01-01 01:00:00"), (60, 0))
+        self.assertEqual(parse_slot("1970-01-01T01:00:00Z"), (60, 0))
+        self.assertEqual(format_slot(60, 480), "1970-01-01T09:00:00+08:00")
+        self.assertEqual(format_slot(60, 0), "1970-01-01T01:00:00+00:00")
+        self.assertEqual(format_slot(60, -300), "1969-12-31T20:00:00-05:00")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,8 @@
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Set, Tuple, Any
+from typing import List, Dict, Set, Tuple, Any, Optional
 from collections import defaultdict
+from operator import itemgetter
+import heapq
 import math
 import logging
 import uuid
@@ -8,6 +10,16 @@ import uuid
 # Import from utils
 from utils.date_utils import parse_date, format_date
 
+# Import from best time algo
+from best_time_algo.availability_matrix import AvailabilityMatrix, to_epoch_minute, parse_slot, DEFAULT_WEIGHT
+from best_time_algo.vectorized_windows import find_windows, weighted_window_counts
+from best_time_algo.sleep_masks import SleepMasks, get_slot_of_day
+from best_time_algo.slot_counts import SlotCounts
+from best_time_algo.slot_pyramid import SlotPyramid, PYRAMID_MIN_MINUTES
+from best_time_algo.deadline import Deadline
+from best_time_algo.session_cover import select_sessions
+from best_time_algo.weekly_slots import WeeklyFold
+
 # Set up logging
 logger = logging.getLogger(__name__)
 
@@ -16,11 +28,20 @@ DEFAULT_SLEEP_HOURS = {
     "start": 2300,  # 11:00 PM
     "end": 700      # 7:00 AM
 }
+DEFAULT_TIMEZONE = "Asia/Singapore"  # Timezone sleep hours are interpreted in
 DEFAULT_MIN_BLOCK_SIZE = 2  # No of blocks (2 * 30 min blocks)
 TIME_SLOT_SIZE = 30  # minutes
 SENSITIVITY_THRESHOLD = 2  # Threshold for considering a block to be valid (e.g. if the number of participants changes by more than this threshold, the block is not valid)
 MIN_PARTICIPANTS = 2  # Minimum number of participants in an event block
 MAX_BLOCK_SIZE = 4  # Maximum duration of the event block in minutes
+MAP_BACKEND = "map"  # Dict of datetime -> participants, intersections with sets
+BITSET_BACKEND = "bitset"  # Participant bitmask per slot, intersections with bitwise AND
+NUMPY_BACKEND = "numpy"  # Participants x slots boolean array, all windows in vectorized passes
+DEFAULT_BACKEND = BITSET_BACKEND
+DEFAULT_TOP_K = 5  # Number of ranked meeting times returned by get_best_meeting_times
+DEFAULT_SESSION_COUNT = 2  # Number of sessions returned by get_covering_sessions
+DEADLINE_CHECK_INTERVAL = 64  # Windows evaluated between checks of the time budget
+INGESTION_BUDGET_SHARE = 0.5  # Share of a time budget availability blocks can be ingested in, the rest is left to the search
 TIMING_WEIGHTS = {
     0: 1.0,
     1: 1.0,
@@ -56,18 +77,25 @@ Basic Flow:
 2. Break up the availability into contiguous event blocks of time, where the event block size is the minimum availability block size
    For an event block to be valid: 
     a. The event block must be at least the minimum availability block size (e.g. 1 event block = 2 of each 30 min availability blocks)
-    b. The event block must not include sleep hours
+    b. The event block must not include sleep hours (participants are removed from the slots they are asleep before blocks are formed)
     c. The event block must not include any time slots where the number of participants changes drastically (e.g. from 2 to 10)
+       (blocks stop extending before a change in participant count larger than the sensitivity threshold)
     d. The event block must not include any time slots where the number of participants is less than the minimum number of participants
-3. Find the best event block by scoring the event block based on the (average) number of participants across the availability blocks in the event block and the duration of the event block
+    e. The event block must include every required participant (e.g. the event creator) who has submitted any availability
+       (windows of the matrix are checked with a single AND against the bitmask of the required participants)
+3. Find the best event block by scoring the event block based on the number of participants across the availability blocks in the event block
+   (each weighted by their weight at every slot, "preferred" above "possible") and the duration of the event block,
+   weighted by the timing weight of the hour it starts at in the event timezone
 4. Return the best event block
 
 Inputs:
     - Availability blocks of all participants for the given event
     - Minimum block size (Used to determine the minimum number of blocks for the given event)
-    - Sleep hours (Optional) (Not implemented yet)
+    - Sleep hours (Optional) (Default sleep hours, overridden per participant, in the event timezone)
     - Minimum number of participants in an event block (Default: 2)
     - Sensitivity threshold (Default: 2)
+    - Required participants (Optional) (UUIDs every event block must include, everyone else is optional)
+    - Weights of the availability blocks (Optional) (Default: possible, see availability_matrix)
 
 Output:
     - Best event block 
@@ -79,9 +107,12 @@ Output:
         "duration": int # Duration of the event block in minutes (in minutes)
     })
 
+Recurring events:
+    get_best_weekly_times folds the availability onto the slots of a week (weekday and time of day in the
+    event timezone) and ranks weekly blocks with the same rules, for participants available every week
+
 Extensions:
-1. Add sleep hours to the algorithm
-2. Preferential time of day for event (e.g. morning, afternoon, evening)
+1. Preferential time of day for event (e.g. morning, afternoon, evening)
 """
 
 class BestTimeAlgo:
@@ -90,12 +121,27 @@ class BestTimeAlgo:
     This service handles the core scheduling logic for finding the best meeting times
     based on participants' availability and preferences.
     """
-    def __init__(self, sleep_hours: dict = DEFAULT_SLEEP_HOURS, min_block_size: int = DEFAULT_MIN_BLOCK_SIZE, min_participants: int = MIN_PARTICIPANTS, sensitivity_threshold: int = SENSITIVITY_THRESHOLD, max_block_size: int = MAX_BLOCK_SIZE):
+    def __init__(self, sleep_hours: dict = DEFAULT_SLEEP_HOURS, min_block_size: int = DEFAULT_MIN_BLOCK_SIZE, min_participants: int = MIN_PARTICIPANTS, sensitivity_threshold: int = SENSITIVITY_THRESHOLD, max_block_size: int = MAX_BLOCK_SIZE, backend: str = DEFAULT_BACKEND, participant_sleep_hours: dict = None, timezone: str = DEFAULT_TIMEZONE, required_participants: List[str] = None):
         self.sleep_hours = sleep_hours
+        self.participant_sleep_hours = participant_sleep_hours or {}
+        self.timezone = timezone
+        self.sleep_masks = SleepMasks(sleep_hours, self.participant_sleep_hours, timezone, TIME_SLOT_SIZE)
+        self.slot_counts: Optional[SlotCounts] = None  # counts of the last availability processed
+        self.slot_pyramid: Optional[SlotPyramid] = None  # bounds of the last availability searched
+        self.required_participants: List[str] = sorted(set(required_participants or []))  # every event block must include them
+        self.required_in_availability: Set[str] = set()  # required participants with availability in the last availability map
+        self.participant_weights: Dict[Tuple[str, int], int] = {}  # (user uuid, epoch minute) -> weight other than the default in the last availability processed
         self.min_block_size = min_block_size
         self.min_participants = min_participants
         self.sensitivity_threshold = sensitivity_threshold
         self.max_block_size = max_block_size
+        self.backend = backend
+
+    def get_parameters(self) -> Tuple[int, int, int, str, Tuple[str, ...]]:
+        """
+        Event parameters the results depend on: minimum participants, minimum and maximum block size, timezone and required participants
+        """
+        return (self.min_participants, self.min_block_size, self.max_block_size, self.timezone, tuple(self.required_participants))
 
     def _create_availability_map(self, availability_blocks: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -113,8 +159,14 @@ class BestTimeAlgo:
         The time slot is a tuple of the date and the time, and the participants is the list of the user UUIDs.
         """
         availability_map = {}
+        self.required_in_availability = set()
+        self.participant_weights = self._get_participant_weights(availability_blocks)
         for block in availability_blocks:
+            if block["user_uuid"] in self.required_participants:
+                self.required_in_availability.add(block["user_uuid"])
             start_time = self._parse_datetime(block["start_time"])
+            if self.sleep_masks.is_asleep(block["user_uuid"], to_epoch_minute(start_time)):
+                continue
             if start_time not in availability_map:
                 availability_map[start_time] = [block["user_uuid"]]
             else:
@@ -127,8 +179,16 @@ class BestTimeAlgo:
         """
         Create event blocks from the availability map
         """
+        return [self._format_event_block(event_block) for event_block in self._create_raw_event_blocks(availability_map)]
+
+    def _create_raw_event_blocks(self, availability_map: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Create event blocks from the availability map with datetime start and end times
+        Validation and scoring use the datetimes directly, only the result is formatted to ISO strings
+        """
         event_blocks = []
         sorted_slots = sorted(availability_map.keys())
+        self.slot_counts = SlotCounts([to_epoch_minute(slot) for slot in sorted_slots], [len(availability_map[slot]) for slot in sorted_slots], TIME_SLOT_SIZE, self.sensitivity_threshold)
         for time_slot in sorted_slots:
             # initialise the event block if minimum number of participants are available for any given availability block
             start_time = time_slot
@@ -138,6 +198,10 @@ class BestTimeAlgo:
                 # Scan through all subsequent blocks and merge consecutive ones as long as they have more than the minimum participants
                 i = 1
                 while i < self.max_block_size:
+                    # stop before a change in participant count larger than the sensitivity threshold
+                    last_block = time_slot + timedelta(minutes=(i - 1) * 30)
+                    if self.slot_counts.jumps[self.slot_counts.slot_index[to_epoch_minute(last_block)]]:
+                        break
                     next_block = time_slot + timedelta(minutes=i * 30)
                     if next_block in availability_map:
                         new_intersection = intersection.intersection(set(availability_map[next_block]))
@@ -152,8 +216,8 @@ class BestTimeAlgo:
                     end_time = time_slot + timedelta(minutes=i * 30)
                     event_block_participants = sorted(list(intersection))
                     event_blocks.append({
-                        "start_time": self._format_datetime(start_time),
-                        "end_time": self._format_datetime(end_time),
+                        "start_time": start_time,
+                        "end_time": end_time,
                         "participants": event_block_participants,
                         "participant_count": len(event_block_participants),
                         "duration": i * 30
@@ -161,6 +225,90 @@ class BestTimeAlgo:
 
         return event_blocks
 
+    def _format_event_block(self, event_block: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Format the start and end times of an event block to ISO strings
+        """
+        return {**event_block, "start_time": self._format_datetime(event_block["start_time"]), "end_time": self._format_datetime(event_block["end_time"])}
+
+    def _create_availability_matrix(self, availability_blocks: List[Dict[str, Any]], deadline: Optional[Deadline] = None) -> AvailabilityMatrix:
+        """
+        Create a bitset matrix of time slots to participants, without participants in the slots they are asleep
+        With a deadline only the blocks ingested before it are in the matrix (see AvailabilityMatrix.from_availability_blocks).
+        """
+        matrix = AvailabilityMatrix.from_availability_blocks(availability_blocks, TIME_SLOT_SIZE, deadline)
+        self.sleep_masks.apply(matrix)
+        # read back from the weight masks rather than from every block again, weights are usually few
+        self.participant_weights = {
+            (user_uuid, matrix.slot_minutes[index]): weight
+            for weight, masks in matrix.weight_masks.items()
+            for index, mask in enumerate(masks) if mask
+            for user_uuid in matrix.decode_participants(mask)
+        }
+        return matrix
+
+    def _get_participant_weights(self, availability_blocks: List[Dict[str, Any]]) -> Dict[Tuple[str, int], int]:
+        """
+        Map (user uuid, epoch minute) to the weight of the availability blocks with a weight other than the default
+        """
+        return {
+            (block["user_uuid"], parse_slot(block["start_time"])[0]): weight
+            for block in availability_blocks if (weight := block.get("weight")) and weight != DEFAULT_WEIGHT
+        }
+
+    def _create_event_blocks_from_matrix(self, matrix: AvailabilityMatrix) -> List[Dict[str, Any]]:
+        """
+        Create event blocks from the availability matrix
+        Produces the same event blocks as _create_event_blocks on the availability map
+        """
+        return [self._format_window(matrix, start, length, mask) for start, length, mask in self._find_matrix_windows(matrix)]
+
+    def _format_window(self, matrix: AvailabilityMatrix, start: int, length: int, mask: int) -> Dict[str, Any]:
+        """
+        Format a (start index, length, participant mask) window of the matrix as an event block
+        """
+        event_block_participants = matrix.decode_participants(mask)
+        return {
+            "start_time": matrix.format_slot(start),
+            "end_time": matrix.format_slot(start, length),
+            "participants": event_block_participants,
+            "participant_count": len(event_block_participants),
+            "duration": length * TIME_SLOT_SIZE
+        }
+
+    def _find_matrix_windows(self, matrix: AvailabilityMatrix) -> List[Tuple[int, int, int]]:
+        """
+        Find the (start index, length, participant mask) windows of the matrix with the configured backend
+        Windows stop before a change in participant count larger than the sensitivity threshold
+        """
+        self.slot_counts = SlotCounts.from_matrix(matrix, self.sensitivity_threshold)
+        return self._find_windows(matrix, self.slot_counts.jumps)
+
+    def _find_windows(self, matrix: AvailabilityMatrix, jumps: List[bool]) -> List[Tuple[int, int, int]]:
+        """
+        Find the (start index, length, participant mask) windows of the matrix stopping at the given jumps
+        """
+        if self.backend == NUMPY_BACKEND:
+            windows = find_windows(matrix, self.min_participants, self.min_block_size, self.max_block_size, jumps)
+        else:
+            windows = list(matrix.iter_windows(self.min_participants, self.min_block_size, self.max_block_size, jumps))
+        required_mask = self._get_required_mask(matrix)
+        if required_mask:
+            return [window for window in windows if window[2] & required_mask == required_mask]
+        return windows
+
+    def _get_required_mask(self, matrix: AvailabilityMatrix) -> int:
+        """
+        Bitmask of the required participants in the matrix, a window missing any of them has mask & required_mask != required_mask
+        Required participants without any availability have not responded yet and are not enforced.
+        """
+        required_mask = 0
+        for user_uuid in self.required_participants:
+            bit = matrix.participant_bits.get(user_uuid)
+            if bit is not None:
+                required_mask |= 1 << bit
+        return required_mask
+
     def _is_valid_event_block(self, event_block: Dict[str, Any]) -> bool:
         """
         Check if the event block is valid
@@ -177,22 +325,45 @@ class BestTimeAlgo:
         # check if the event block is within the minimum block size
         if not self._is_within_minimum_block_size(event_block):
             return False
+        # check if the event block includes the required participants
+        if not self._is_within_required_participants(event_block):
+            return False
 
         return True
     
     def _is_within_sleep_hours(self, event_block: Dict[str, Any]) -> bool:
         """
         Check if the event block is within sleep hours
+        Sleep hours are already removed from the availability, so this only rejects blocks given from elsewhere
         """
-        #TODO when sleep hours are implemented
+        start = event_block["start_time"]
+        end = event_block["end_time"]
+        if isinstance(start, str):
+            start = self._parse_datetime(start)
+        if isinstance(end, str):
+            end = self._parse_datetime(end)
+        start_minute = to_epoch_minute(start)
+        end_minute = to_epoch_minute(end)
+        for participant in event_block["participants"]:
+            for minute in range(start_minute, end_minute, TIME_SLOT_SIZE):
+                if self.sleep_masks.is_asleep(participant, minute):
+                    return False
         return True
     
     def _is_within_sensitivity_threshold(self, event_block: Dict[str, Any]) -> bool:
         """
         Check if the event block is within the sensitivity threshold
+        Uses the slot counts of the last availability processed, in O(1) per block
         """
-        #TODO: Implement this when sensitivity threshold is implemented
-        return True
+        if self.slot_counts is None:
+            return True
+        start = event_block["start_time"]
+        end = event_block["end_time"]
+        if isinstance(start, str):
+            start = self._parse_datetime(start)
+        if isinstance(end, str):
+            end = self._parse_datetime(end)
+        return self.slot_counts.is_within_threshold(to_epoch_minute(start), to_epoch_minute(end))
     
     def _is_within_minimum_block_size(self, event_block: Dict[str, Any]) -> bool:
         """
@@ -220,12 +391,19 @@ class BestTimeAlgo:
             return False
         return True
 
+    def _is_within_required_participants(self, event_block: Dict[str, Any]) -> bool:
+        """
+        Check if the event block includes every required participant with availability in the last availability map
+        """
+        return self.required_in_availability.issubset(event_block["participants"])
+
     def _score_event_block(self, event_block: Dict[str, Any]) -> float:
         """
         Score the event block
         Metrics to score: 
-        - Number of participants
+        - Number of participants, each weighted by their weight at every slot in the last availability processed
         - Duration
+        - Timing weight of the hour it starts at in the event timezone
         - Break ties by earliest start time
         """
         start = event_block["start_time"]
@@ -234,10 +412,49 @@ class BestTimeAlgo:
             start = self._parse_datetime(start)
         if isinstance(end, str):
             end = self._parse_datetime(end)
-        duration = (end - start).total_seconds() / 30
-        participant_count = len(event_block["participants"])
-        timing_weight = TIMING_WEIGHTS[start.hour]
-        return participant_count * duration * timing_weight
+        start_minute = to_epoch_minute(start)
+        slot_minutes = range(start_minute, to_epoch_minute(end), TIME_SLOT_SIZE)
+        if self.participant_weights:
+            weighted_count = sum(self.participant_weights.get((participant, minute), DEFAULT_WEIGHT) for participant in event_block["participants"] for minute in slot_minutes)
+        else:
+            weighted_count = len(event_block["participants"]) * len(slot_minutes)
+        return self._score_weight(self._get_timing_weight(start_minute), weighted_count)
+
+    def _get_timing_weight(self, minute: int) -> float:
+        """
+        Timing weight of the hour an epoch minute is in, in the event timezone
+        """
+        return TIMING_WEIGHTS[get_slot_of_day(minute, self.timezone, TIME_SLOT_SIZE) * TIME_SLOT_SIZE // 60]
+
+    def _get_timing_weights(self, matrix: AvailabilityMatrix) -> List[float]:
+        """
+        Timing weight of every slot of the matrix, in the event timezone
+        """
+        return [self._get_timing_weight(minute) for minute in matrix.slot_minutes]
+
+    def _score_weight(self, timing_weight: float, weighted_count: int) -> float:
+        """
+        Score a block from the timing weight it starts at and the weights of its participants summed over its slots
+        Without weights the weighted count is the number of participants times the number of slots.
+        """
+        return weighted_count * (TIME_SLOT_SIZE * 60 / 30) * timing_weight
+
+    def _score_matrix_windows(self, matrix: AvailabilityMatrix) -> List[Tuple[float, int, int, int]]:
+        """
+        Score every window of the matrix exactly once
+        Returns (score, start index, length, participant mask) in order of start time
+        """
+        return self._score_windows(matrix, self._find_matrix_windows(matrix), self._get_timing_weights(matrix))
+
+    def _score_windows(self, matrix: AvailabilityMatrix, windows: List[Tuple[int, int, int]], timing_weights: List[float]) -> List[Tuple[float, int, int, int]]:
+        """
+        Score (start index, length, participant mask) windows of the matrix with the timing weights of its slots
+        The weighted counts of all windows are summed in vectorized passes.
+        """
+        return [
+            (self._score_weight(timing_weights[start], weighted_count), start, length, mask)
+            for (start, length, mask), weighted_count in zip(windows, weighted_window_counts(matrix, windows))
+        ]
     
     def _get_best_event_block(self, event_blocks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
@@ -245,9 +462,9 @@ class BestTimeAlgo:
         """
         if not event_blocks:
             return []
-        best_event_block = max(event_blocks, key=self._score_event_block)
-        score = self._score_event_block(best_event_block)
-        best_event_blocks = [event_block for event_block in event_blocks if self._score_event_block(event_block) == score]
+        scores = [self._score_event_block(event_block) for event_block in event_blocks]
+        best_score = max(scores)
+        best_event_blocks = [event_block for event_block, score in zip(event_blocks, scores) if score == best_score]
         return best_event_blocks
 
     
@@ -256,10 +473,204 @@ class BestTimeAlgo:
         """
         Process the availability blocks
         """
-        availability_map = self._create_availability_map(availability_blocks)
-        event_blocks = self._create_event_blocks(availability_map)
-        valid_blocks = [event_block for event_block in event_blocks if self._is_valid_event_block(event_block)]
-        return self._get_best_event_block(valid_blocks)
+        if self.backend == MAP_BACKEND:
+            availability_map = self._create_availability_map(availability_blocks)
+            event_blocks = self._create_raw_event_blocks(availability_map)
+            valid_blocks = [event_block for event_block in event_blocks if self._is_valid_event_block(event_block)]
+            return [self._format_event_block(event_block) for event_block in self._get_best_event_block(valid_blocks)]
+
+        # windows of the matrix already satisfy the minimum participants and block size
+        matrix = self._create_availability_matrix(availability_blocks)
+        return [self._format_window(matrix, start, length, mask) for score, start, length, mask in self._get_top_matrix_windows(matrix, None)]
+
+    def get_best_meeting_times(self, availability_blocks: List[Dict[str, Any]], k: int = DEFAULT_TOP_K) -> List[Dict[str, Any]]:
+        """
+        Get the top k event blocks ranked by score, best first
+        Every candidate is scored once and the top k are kept in a bounded heap.
+        Blocks with equal scores keep their order of start time.
+        """
+        if k <= 0:
+            return []
+        if self.backend == MAP_BACKEND:
+            availability_map = self._create_availability_map(availability_blocks)
+            event_blocks = self._create_raw_event_blocks(availability_map)
+            scored_blocks = ((self._score_event_block(event_block), event_block) for event_block in event_blocks if self._is_valid_event_block(event_block))
+            return [{**self._format_event_block(event_block), "score": score} for score, event_block in heapq.nlargest(k, scored_blocks, key=itemgetter(0))]
+
+        matrix = self._create_availability_matrix(availability_blocks)
+        return [{**self._format_window(matrix, start, length, mask), "score": score} for score, start, length, mask in self._get_top_matrix_windows(matrix, k)]
+
+    def _get_top_matrix_windows(self, matrix: AvailabilityMatrix, k: Optional[int]) -> List[Tuple[float, int, int, int]]:
+        """
+        Get the (score, start index, length, participant mask) windows with the best score (k None, in order
+        of start time) or the top k (best first), exactly
+        Slots spanning at least PYRAMID_MIN_MINUTES are searched through the slot pyramid, which skips the days
+        and blocks that cannot make the results. Shorter ranges score every window in vectorized passes.
+        """
+        if matrix.slot_minutes and matrix.slot_minutes[-1] - matrix.slot_minutes[0] >= PYRAMID_MIN_MINUTES:
+            return self._search_matrix_windows(matrix, Deadline(math.inf), k)[0]
+        scored_windows = self._score_matrix_windows(matrix)
+        if k is not None:
+            return heapq.nlargest(k, scored_windows, key=itemgetter(0))
+        if not scored_windows:
+            return []
+        best_score = max(scored_windows, key=itemgetter(0))[0]
+        return [window for window in scored_windows if window[0] == best_score]
+
+    def get_covering_sessions(self, availability_blocks: List[Dict[str, Any]], k: int = DEFAULT_SESSION_COUNT) -> List[Dict[str, Any]]:
+        """
+        Get up to k non-overlapping event blocks that together cover as many distinct participants as possible,
+        for events run as several identical sessions
+        Blocks are chosen greedily by the participants they add, in order of selection, each with its score and
+        the participants it covers first ("new_participants").
+        Always uses the availability matrix, whatever the backend.
+        """
+        if k <= 0:
+            return []
+        matrix = self._create_availability_matrix(availability_blocks)
+        return self._format_sessions(matrix, select_sessions(self._score_matrix_windows(matrix), matrix.slot_minutes, matrix.slot_size, k))
+
+    def _format_sessions(self, matrix: AvailabilityMatrix, sessions: List[Tuple[float, int, int, int, int]]) -> List[Dict[str, Any]]:
+        """
+        Format (score, start index, length, participant mask, newly covered mask) sessions as event blocks
+        """
+        return [
+            {**self._format_window(matrix, start, length, mask), "score": score, "new_participants": matrix.decode_participants(new_mask)}
+            for score, start, length, mask, new_mask in sessions
+        ]
+
+    def get_best_weekly_times(self, availability_blocks: List[Dict[str, Any]], k: int = DEFAULT_TOP_K) -> List[Dict[str, Any]]:
+        """
+        Get the top k recurring weekly event blocks ranked by score, best first
+        The availability is folded onto the slots of a week in the event timezone, where participants are
+        available if they are in every week of the event, and windows follow the same rules as one-off event blocks.
+        Blocks have the weekday (0 is Monday) and the local start and end times (HH:MM) instead of dates.
+        """
+        if k <= 0:
+            return []
+        matrix = WeeklyFold(self._create_availability_matrix(availability_blocks), self.timezone).to_matrix()
+        # the counts of the week are not kept in slot_counts, which the event blocks of the event are checked against
+        windows = self._find_windows(matrix, SlotCounts.from_matrix(matrix, self.sensitivity_threshold).jumps)
+        # slot minutes of the week are already in the event timezone
+        scored_windows = self._score_windows(matrix, windows, [TIMING_WEIGHTS[minute // 60 % 24] for minute in matrix.slot_minutes])
+        top_windows = heapq.nlargest(k, scored_windows, key=itemgetter(0))
+        return [{**self._format_weekly_window(matrix, start, length, mask), "score": score} for score, start, length, mask in top_windows]
+
+    def _format_weekly_window(self, matrix: AvailabilityMatrix, start: int, length: int, mask: int) -> Dict[str, Any]:
+        """
+        Format a (start index, length, participant mask) window of a weekly matrix as a recurring event block
+        """
+        start_minute = matrix.slot_minutes[start]
+        end_minute = start_minute + length * TIME_SLOT_SIZE
+        event_block_participants = matrix.decode_participants(mask)
+        return {
+            "weekday": start_minute // (24 * 60),
+            "start_time": f"{start_minute // 60 % 24:02d}:{start_minute % 60:02d}",
+            "end_time": f"{end_minute // 60 % 24:02d}:{end_minute % 60:02d}",
+            "participants": event_block_participants,
+            "participant_count": len(event_block_participants),
+            "duration": length * TIME_SLOT_SIZE
+        }
+
+    def get_best_times_within(self, availability_blocks: List[Dict[str, Any]], time_budget: float, k: Optional[int] = None) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Get the best event blocks found within a time budget (in seconds), see get_best_times_until
+        """
+        return self.get_best_times_until(availability_blocks, Deadline(time_budget), k)
+
+    def get_best_times_until(self, availability_blocks: List[Dict[str, Any]], deadline: Deadline, k: Optional[int] = None) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Get the best event blocks found before a deadline
+        With k None these are the blocks with the best score, as _process_availability_blocks returns,
+        otherwise the top k ranked blocks with their scores, as get_best_meeting_times returns.
+        Returns the blocks and whether the search completed, in which case they are the exact result
+        Always searches the availability matrix, whatever the backend. Ingesting the blocks is charged to
+        the deadline: it may use up to INGESTION_BUDGET_SHARE of the time left, and if blocks are left out
+        by then the windows are searched from the blocks ingested so far (and the search is incomplete).
+        """
+        if k is not None and k <= 0:
+            return [], True
+        matrix = self._create_availability_matrix(availability_blocks, deadline.share(INGESTION_BUDGET_SHARE))
+        scored_windows, complete = self._search_matrix_windows(matrix, deadline, k)
+        complete = complete and matrix.complete
+        if k is None:
+            return [self._format_window(matrix, start, length, mask) for score, start, length, mask in scored_windows], complete
+        return [{**self._format_window(matrix, start, length, mask), "score": score} for score, start, length, mask in scored_windows], complete
+
+    def _search_matrix_windows(self, matrix: AvailabilityMatrix, deadline: Deadline, k: Optional[int]) -> Tuple[List[Tuple[float, int, int, int]], bool]:
+        """
+        Evaluate the windows of the matrix in order of the best score they could have, until no remaining
+        window can make the results or the deadline passes
+        The window from a slot has at most the participants of that slot, the maximum block size and the
+        largest weight, so its score is bounded by the count of the slot weighted by the timing weight of the slot.
+        Slots are visited through a pyramid of days and 2 hour blocks bounded by their largest count and
+        best timing weight, so days and blocks that cannot make the results are never refined into slots.
+        With k None every window with the best score is kept (in order of start time), otherwise the top k (best first).
+        Returns the (score, start index, length, participant mask) windows found and whether the search completed
+        The indexes the search needs are built before the first window, with the deadline checked between them.
+        """
+        if deadline.expired():
+            return [], False
+        self.slot_counts = SlotCounts.from_matrix(matrix, self.sensitivity_threshold)
+        jumps = self.slot_counts.jumps
+        if deadline.expired():
+            return [], False
+        timing_weights = self._get_timing_weights(matrix)
+        if deadline.expired():
+            return [], False
+        # weighted count of a participant over the longest window with the largest weight
+        max_weighted_count = self.max_block_size * matrix.get_max_weight()
+        # buckets are split in the local time of the first slot
+        offset = matrix.slot_offsets[0] if matrix.slot_offsets else 0
+        self.slot_pyramid = SlotPyramid(matrix.slot_minutes, self.slot_counts.counts, offset)
+        if deadline.expired():
+            return [], False
+        required_mask = self._get_required_mask(matrix)
+
+        def bound(low: int, high: int, count: int) -> float:
+            # scored at the best timing weight among the slots the windows can start at
+            return self._score_weight(max(timing_weights[low:high]), count * max_weighted_count)
+
+        def slot_bound(start: int) -> float:
+            return self._score_weight(timing_weights[start], self.slot_counts.counts[start] * max_weighted_count)
+
+        # k None: every window with the best score, otherwise a min heap of (score, -start, length, mask)
+        # so that among equal scores the latest start is evicted first
+        best: List[Tuple[float, int, int, int]] = []
+        complete = True
+        evaluated = 0
+        for bucket_bound, slots in self.slot_pyramid.iter_slots(bound, slot_bound, self.min_participants):
+            # k None: stop below the best score, otherwise below the k-th score once there are k windows
+            if not complete or (best and (k is None or len(best) == k) and bucket_bound < best[0][0]):
+                break
+            for negative_bound, start in slots:
+                if evaluated % DEADLINE_CHECK_INTERVAL == 0 and evaluated and deadline.expired():
+                    complete = False
+                    break
+                if best and (k is None or len(best) == k) and -negative_bound < best[0][0]:
+                    break
+                # the window has at most the participants of its first slot
+                if matrix.slot_masks[start] & required_mask != required_mask:
+                    continue
+                evaluated += 1
+                window = matrix.window_at(start, self.min_participants, self.min_block_size, self.max_block_size, jumps)
+                if window is None or window[1] & required_mask != required_mask:
+                    continue
+                length, mask = window
+                score = self._score_weight(timing_weights[start], matrix.get_weighted_count(start, length, mask))
+                if k is None:
+                    if not best or score > best[0][0]:
+                        best = [(score, start, length, mask)]
+                    elif score == best[0][0]:
+                        best.append((score, start, length, mask))
+                elif len(best) < k:
+                    heapq.heappush(best, (score, -start, length, mask))
+                elif (score, -start) > best[0][:2]:
+                    heapq.heapreplace(best, (score, -start, length, mask))
+
+        if k is None:
+            return sorted(best, key=itemgetter(1)), complete
+        return [(score, -negative_start, length, mask) for score, negative_start, length, mask in sorted(best, key=lambda window: (-window[0], -window[1]))], complete
     
     def _parse_datetime(self, datetime_str: str) -> datetime:
         """
@@ -273,24 +684,19 @@ class BestTimeAlgo:
         """
         return format_date(dt)
     
-    def get_event_participants(self, availability_blocks: List[Dict[str, Any]], best_start_time: str, best_end_time: str) -> List[Dict[str, Any]]:
+    def get_event_participants(self, availability_blocks: List[Dict[str, Any]], best_start_time: str, best_end_time: str, matrix: Optional[AvailabilityMatrix] = None) -> List[str]:
         """
         Get the participants of an event by availability blocks and the confirmed best start and end time
+        These are the participants available at any slot starting from the start to the end time (inclusive),
+        in sorted order, as they submitted it: sleep hours only apply to ranking, so a participant who marked
+        a slot during their sleep hours is still a participant. An availability matrix of the submitted
+        availability (without sleep masks) can be passed in, in which case the availability blocks are not used.
         """
-        participants = []
-        # generate availability map
-        availability_map = self._create_availability_map(availability_blocks)
-        start_time = self._parse_datetime(best_start_time)
-        end_time = self._parse_datetime(best_end_time)
-        
-        # get participants
-        for block in availability_map:
-            if block >= start_time and block <= end_time:
-                for participant in availability_map[block]:
-                    if participant not in participants:
-                        participants.append(participant)
-
-        return participants
+        if matrix is None:
+            matrix = AvailabilityMatrix.from_availability_blocks(availability_blocks, TIME_SLOT_SIZE)
+        start_minute = parse_slot(best_start_time)[0]
+        end_minute = parse_slot(best_end_time)[0]
+        return matrix.decode_participants(matrix.get_range_mask(start_minute, end_minute))
 
 if __name__ == "__main__":
     scheduler = BestTimeAlgo()
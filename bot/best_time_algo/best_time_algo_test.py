@@ -1,6 +1,9 @@
 import unittest
 from datetime import datetime
-from best_time_algo.best_time_algo import BestTimeAlgo
+from best_time_algo.best_time_algo import BestTimeAlgo, MAP_BACKEND, TIMING_WEIGHTS
+from best_time_algo.availability_matrix import AvailabilityMatrix, PREFERRED_WEIGHT
+from best_time_algo.deadline import Deadline
+from best_time_algo.testing import generate_availability_blocks, prefer_availability_blocks, StepClock
 
 ### NOT UPDATED FOR NEW TIMING WEIGHTS
 
@@ -142,5 +145,150 @@ class BestTimeAlgoTest(unittest.TestCase):
         self.assertEqual(scheduler._process_availability_blocks(avail_blocks_test_2), 
                          [{"start_time": "2025-01-01T10:00:00+08:00", "end_time": "2025-01-01T11:00:00+08:00", "participants": ["1","2"], "duration": 60, "participant_count": 2}])
 
+    def test_get_best_meeting_times(self):
+        availability_blocks = [
+            {"start_time": "2025-01-01T10:00:00+08:00", "end_time": "2025-01-01T10:30:00+08:00", "event_id": "1", "user_uuid": "1"},
+            {"start_time": "2025-01-01T10:00:00+08:00", "end_time": "2025-01-01T10:30:00+08:00", "event_id": "1", "user_uuid": "2"},
+            {"start_time": "2025-01-01T10:30:00+08:00", "end_time": "2025-01-01T11:00:00+08:00", "event_id": "1", "user_uuid": "1"},
+            {"start_time": "2025-01-01T10:30:00+08:00", "end_time": "2025-01-01T11:00:00+08:00", "event_id": "1", "user_uuid": "2"},
+            {"start_time": "2025-01-01T10:30:00+08:00", "end_time": "2025-01-01T11:00:00+08:00", "event_id": "1", "user_uuid": "3"},
+            {"start_time": "2025-01-01T11:00:00+08:00", "end_time": "2025-01-01T11:30:00+08:00", "event_id": "1", "user_uuid": "1"},
+            {"start_time": "2025-01-01T11:00:00+08:00", "end_time": "2025-01-01T11:30:00+08:00", "event_id": "1", "user_uuid": "2"},
+            {"start_time": "2025-01-01T11:00:00+08:00", "end_time": "2025-01-01T11:30:00+08:00", "event_id": "1", "user_uuid": "3"},
+        ]
+        for backend in ["bitset", "numpy", MAP_BACKEND]:
+            scheduler = BestTimeAlgo(min_block_size=2, backend=backend)
+            ranked = scheduler.get_best_meeting_times(availability_blocks, k=2)
+            self.assertEqual([(block["start_time"], block["end_time"], block["participants"]) for block in ranked], [
+                ("2025-01-01T10:00:00+08:00", "2025-01-01T11:30:00+08:00", ["1", "2"]),
+                ("2025-01-01T10:30:00+08:00", "2025-01-01T11:30:00+08:00", ["1", "2", "3"]),
+            ])
+            self.assertGreaterEqual(ranked[0]["score"], ranked[1]["score"])
+            self.assertEqual(ranked[0]["score"], scheduler._score_event_block(ranked[0]))
+            self.assertEqual(len(scheduler.get_best_meeting_times(availability_blocks, k=10)), 2)
+            self.assertEqual(scheduler.get_best_meeting_times(availability_blocks, k=0), [])
+            # the top ranked block is always one of the best event blocks
+            self.assertIn({key: value for key, value in ranked[0].items() if key != "score"}, scheduler._process_availability_blocks(availability_blocks))
+
+    def test_required_participants(self):
+        availability_blocks = [
+            {"start_time": "2025-01-01T10:00:00+08:00", "end_time": "2025-01-01T10:30:00+08:00", "event_id": "1", "user_uuid": "1"},
+            {"start_time": "2025-01-01T10:00:00+08:00", "end_time": "2025-01-01T10:30:00+08:00", "event_id": "1", "user_uuid": "2"},
+            {"start_time": "2025-01-01T10:30:00+08:00", "end_time": "2025-01-01T11:00:00+08:00", "event_id": "1", "user_uuid": "1"},
+            {"start_time": "2025-01-01T10:30:00+08:00", "end_time": "2025-01-01T11:00:00+08:00", "event_id": "1", "user_uuid": "2"},
+            {"start_time": "2025-01-01T10:30:00+08:00", "end_time": "2025-01-01T11:00:00+08:00", "event_id": "1", "user_uuid": "3"},
+            {"start_time": "2025-01-01T11:00:00+08:00", "end_time": "2025-01-01T11:30:00+08:00", "event_id": "1", "user_uuid": "1"},
+            {"start_time": "2025-01-01T11:00:00+08:00", "end_time": "2025-01-01T11:30:00+08:00", "event_id": "1", "user_uuid": "2"},
+            {"start_time": "2025-01-01T11:00:00+08:00", "end_time": "2025-01-01T11:30:00+08:00", "event_id": "1", "user_uuid": "3"},
+        ]
+        for backend in ["bitset", "numpy", MAP_BACKEND]:
+            # the best block (10:00 - 11:30) does not include 3
+            scheduler = BestTimeAlgo(min_block_size=2, backend=backend, required_participants=["3"])
+            best_blocks = scheduler._process_availability_blocks(availability_blocks)
+            self.assertEqual([(block["start_time"], block["end_time"], block["participants"]) for block in best_blocks], [
+                ("2025-01-01T10:30:00+08:00", "2025-01-01T11:30:00+08:00", ["1", "2", "3"]),
+            ])
+            self.assertEqual([block["participants"] for block in scheduler.get_best_meeting_times(availability_blocks, k=5)], [["1", "2", "3"]])
+            self.assertEqual(scheduler.get_best_times_within(availability_blocks, 60), (best_blocks, True))
+            self.assertEqual(BestTimeAlgo(min_block_size=2, backend=backend, required_participants=["1", "3"])._process_availability_blocks(availability_blocks), best_blocks)
+            # required participants without any availability are not enforced
+            scheduler = BestTimeAlgo(min_block_size=2, backend=backend, required_participants=["4"])
+            self.assertEqual(scheduler._process_availability_blocks(availability_blocks), BestTimeAlgo(min_block_size=2, backend=backend)._process_availability_blocks(availability_blocks))
+
+    def test_get_event_participants(self):
+        scheduler = BestTimeAlgo()
+        availability_blocks = [
+            {"start_time": "2025-01-01T10:00:00+08:00", "end_time": "2025-01-01T10:30:00+08:00", "event_id": "1", "user_uuid": "3"},
+            {"start_time": "2025-01-01T10:30:00+08:00", "end_time": "2025-01-01T11:00:00+08:00", "event_id": "1", "user_uuid": "1"},
+            {"start_time": "2025-01-01T11:00:00+08:00", "end_time": "2025-01-01T11:30:00+08:00", "event_id": "1", "user_uuid": "2"},
+            {"start_time": "2025-01-01T11:30:00+08:00", "end_time": "2025-01-01T12:00:00+08:00", "event_id": "1", "user_uuid": "4"},
+            {"start_time": "2025-01-01T23:00:00+08:00", "end_time": "2025-01-01T23:30:00+08:00", "event_id": "1", "user_uuid": "5"},
+        ]
+        # slots from the start to the end time, inclusive
+        self.assertEqual(scheduler.get_event_participants(availability_blocks, "2025-01-01T10:30:00+08:00", "2025-01-01T11:00:00+08:00"), ["1", "2"])
+        self.assertEqual(scheduler.get_event_participants(availability_blocks, "2025-01-01T02:00:00+00:00", "2025-01-01T03:30:00+00:00"), ["1", "2", "3", "4"])
+        # participants who marked a slot during their sleep hours are still participants
+        self.assertEqual(scheduler.get_event_participants(availability_blocks, "2025-01-01T22:00:00+08:00", "2025-01-02T00:00:00+08:00"), ["5"])
+        matrix = AvailabilityMatrix.from_availability_blocks(availability_blocks)
+        self.assertEqual(scheduler.get_event_participants([], "2025-01-01T11:00:00+08:00", "2025-01-01T12:00:00+08:00", matrix), ["2", "4"])
+
+    def test_get_best_times_within(self):
+        for seed, users, density in [(1, 6, 0.7), (2, 30, 0.5), (3, 60, 0.8)]:
+            availability_blocks = generate_availability_blocks(seed, users, 96, density)
+            scheduler = BestTimeAlgo(min_participants=3, min_block_size=2, max_block_size=6)
+            # with enough time the search completes with the exact results
+            self.assertEqual(scheduler.get_best_times_within(availability_blocks, 60), (scheduler._process_availability_blocks(availability_blocks), True))
+            for k in [1, 5, 50]:
+                self.assertEqual(scheduler.get_best_times_within(availability_blocks, 60, k), (scheduler.get_best_meeting_times(availability_blocks, k), True))
+            # without any time the search stops at once
+            self.assertEqual(scheduler.get_best_times_within(availability_blocks, 0), ([], False))
+
+    def test_get_best_times_until_charges_ingestion(self):
+        # the deadline passes while the blocks are ingested: only about 20 of the ~100 ingestion checks are made
+        availability_blocks = generate_availability_blocks(4, 300, 14 * 48, 0.5)
+        scheduler = BestTimeAlgo(min_participants=3, min_block_size=2, max_block_size=6)
+        results, complete = scheduler.get_best_times_until(availability_blocks, Deadline(41, StepClock()), 5)
+        self.assertFalse(complete)
+        # the windows found in the blocks ingested before the deadline are returned
+        self.assertEqual(len(results), 5)
+        for result in results:
+            self.assertGreaterEqual(len(result["participants"]), 3)
+
+    def test_get_best_times_until_charges_setup(self):
+        availability_blocks = generate_availability_blocks(5, 6, 96, 0.7)
+        scheduler = BestTimeAlgo(min_participants=3, min_block_size=2, max_block_size=6)
+        # an expired deadline ingests nothing
+        self.assertEqual(scheduler.get_best_times_until(availability_blocks, Deadline(0, StepClock())), ([], False))
+        # the deadline passes while the search indexes are built, before any window is evaluated
+        self.assertEqual(scheduler.get_best_times_until(availability_blocks, Deadline(5, StepClock())), ([], False))
+        self.assertEqual(scheduler.get_best_times_until(availability_blocks, Deadline(1000, StepClock())), (scheduler._process_availability_blocks(availability_blocks), True))
+
+    def test_preferred_availability(self):
+        availability_blocks = [
+            {"start_time": "2025-01-01T10:00:00+08:00", "end_time": "2025-01-01T10:30:00+08:00", "event_id": "1", "user_uuid": "1"},
+            {"start_time": "2025-01-01T10:00:00+08:00", "end_time": "2025-01-01T10:30:00+08:00", "event_id": "1", "user_uuid": "2"},
+            {"start_time": "2025-01-01T10:30:00+08:00", "end_time": "2025-01-01T11:00:00+08:00", "event_id": "1", "user_uuid": "1"},
+            {"start_time": "2025-01-01T10:30:00+08:00", "end_time": "2025-01-01T11:00:00+08:00", "event_id": "1", "user_uuid": "2"},
+            {"start_time": "2025-01-01T14:00:00+08:00", "end_time": "2025-01-01T14:30:00+08:00", "event_id": "1", "user_uuid": "1", "weight": PREFERRED_WEIGHT},
+            {"start_time": "2025-01-01T14:00:00+08:00", "end_time": "2025-01-01T14:30:00+08:00", "event_id": "1", "user_uuid": "2", "weight": PREFERRED_WEIGHT},
+            {"start_time": "2025-01-01T14:30:00+08:00", "end_time": "2025-01-01T15:00:00+08:00", "event_id": "1", "user_uuid": "1", "weight": PREFERRED_WEIGHT},
+            {"start_time": "2025-01-01T14:30:00+08:00", "end_time": "2025-01-01T15:00:00+08:00", "event_id": "1", "user_uuid": "2"},
+        ]
+        for backend in ["bitset", "numpy", MAP_BACKEND]:
+            scheduler = BestTimeAlgo(min_block_size=2, max_block_size=2, backend=backend)
+            ranked = scheduler.get_best_meeting_times(availability_blocks, k=2)
+            # the afternoon has 3 of the 4 participant slots preferred
+            self.assertEqual([(block["start_time"], block["score"]) for block in ranked], [
+                ("2025-01-01T14:00:00+08:00", scheduler._score_weight(TIMING_WEIGHTS[14], 7)),
+                ("2025-01-01T10:00:00+08:00", scheduler._score_weight(TIMING_WEIGHTS[10], 4)),
+            ])
+            self.assertEqual(ranked[0]["score"], scheduler._score_event_block(ranked[0]))
+
+    def test_weighted_backends_match(self):
+        for seed, users, density in [(1, 6, 0.7), (2, 30, 0.5)]:
+            availability_blocks = prefer_availability_blocks(seed, generate_availability_blocks(seed, users, 96, density), 0.3)
+            results = []
+            for backend in ["bitset", "numpy", MAP_BACKEND]:
+                scheduler = BestTimeAlgo(min_participants=3, min_block_size=2, max_block_size=6, backend=backend)
+                results.append((scheduler._process_availability_blocks(availability_blocks), scheduler.get_best_meeting_times(availability_blocks, 20)))
+            self.assertEqual(results[0], results[1])
+            self.assertEqual(results[0], results[2])
+            # the search bounds hold with weights
+            self.assertEqual(scheduler.get_best_times_within(availability_blocks, 60), (results[0][0], True))
+            self.assertEqual(scheduler.get_best_times_within(availability_blocks, 60, 20), (results[0][1], True))
+
+    def test_timing_weights_in_event_timezone(self):
+        # 02:00 UTC is 10:00 in Singapore and 21:00 the day before in New York
+        availability_blocks = [
+            {"start_time": "2025-01-01T02:00:00+00:00", "end_time": "2025-01-01T02:30:00+00:00", "event_id": "1", "user_uuid": "1"},
+            {"start_time": "2025-01-01T02:00:00+00:00", "end_time": "2025-01-01T02:30:00+00:00", "event_id": "1", "user_uuid": "2"},
+            {"start_time": "2025-01-01T02:30:00+00:00", "end_time": "2025-01-01T03:00:00+00:00", "event_id": "1", "user_uuid": "1"},
+            {"start_time": "2025-01-01T02:30:00+00:00", "end_time": "2025-01-01T03:00:00+00:00", "event_id": "1", "user_uuid": "2"},
+        ]
+        for timezone, hour in [("Asia/Singapore", 10), ("America/New_York", 21)]:
+            scheduler = BestTimeAlgo(min_block_size=2, timezone=timezone, sleep_hours=None)
+            self.assertEqual(scheduler.get_best_meeting_times(availability_blocks, k=1)[0]["score"], scheduler._score_weight(TIMING_WEIGHTS[hour], 4))
+        self.assertEqual(scheduler._get_timing_weights(scheduler._create_availability_matrix(availability_blocks)), [TIMING_WEIGHTS[21], TIMING_WEIGHTS[21]])
+
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,177 @@
+from bisect import bisect_left
+from typing import List, Dict, Set, Tuple, Any, Optional, Iterable
+import threading
+import time
+
+# Import from best time algo
+from best_time_algo.availability_matrix import parse_slot
+
+"""
+Busy intervals of users across events
+
+A user committed to a confirmed event (a member of it) is busy from its confirmed start to its confirmed
+end time, whatever their availability for other events says. The index keeps the confirmed time of every
+event it knows and its members, and for each user the busy intervals merged into disjoint intervals sorted
+by start, so whether a slot overlaps a commitment is a binary search on the starts of that user's intervals.
+
+Every merged interval keeps the events it was merged from, so the commitment to the event being scheduled
+itself can be ignored. The merged intervals of a user are rebuilt on the first lookup after a change to
+their events, and version is bumped on every change to the events of loaded users so results computed
+before can be told apart.
+
+Changes made through the bot are applied as they happen, but events can also be joined, left or confirmed
+from the webapp, so the events of a user are reloaded once they are older than reload_ttl seconds. A reload
+replaces the user's events, and bumps version if they or their confirmed times changed.
+"""
+
+RELOAD_TTL = 5 * 60  # seconds the loaded events of a user are used before they are reloaded
+
+
+class BusyIntervals:
+    """
+    Index of the busy intervals of users from the confirmed events they are members of
+    """
+    def __init__(self, reload_ttl: float = RELOAD_TTL):
+        self.event_times: Dict[str, Tuple[int, int]] = {}  # event id -> (start minute, end minute) as confirmed
+        self.event_members: Dict[str, Set[str]] = {}  # event id -> user uuids
+        self.user_events: Dict[str, Set[str]] = {}  # user uuid -> event ids
+        self.loaded_at: Dict[str, float] = {}  # user uuid -> monotonic time their events were all loaded
+        self.reload_ttl = reload_ttl
+        # user uuid -> (starts, ends, events) of the merged intervals, built on first lookup
+        self.merged: Dict[str, Tuple[List[int], List[int], List[List[Tuple[int, int, str]]]]] = {}
+        self.version = 0
+        self.lock = threading.RLock()
+
+    def _changed(self, user_uuids: Iterable[str]):
+        for user_uuid in user_uuids:
+            self.merged.pop(user_uuid, None)
+        self.version += 1
+
+    def set_event_time(self, event_id: str, start_time: Optional[str], end_time: Optional[str]):
+        """
+        Set the confirmed time of an event (ISO strings), or clear it if either is missing
+        """
+        with self.lock:
+            if start_time and end_time:
+                self.event_times[event_id] = (parse_slot(start_time)[0], parse_slot(end_time)[0])
+            elif self.event_times.pop(event_id, None) is None:
+                return
+            self._changed(self.event_members.get(event_id, ()))
+
+    def remove_event(self, event_id: str):
+        with self.lock:
+            self.event_times.pop(event_id, None)
+            members = self.event_members.pop(event_id, set())
+            for user_uuid in members:
+                self.user_events.get(user_uuid, set()).discard(event_id)
+            self._changed(members)
+
+    def add_member(self, event_id: str, user_uuid: str):
+        with self.lock:
+            self.event_members.setdefault(event_id, set()).add(user_uuid)
+            self.user_events.setdefault(user_uuid, set()).add(event_id)
+            self._changed([user_uuid])
+
+    def remove_member(self, event_id: str, user_uuid: str):
+        with self.lock:
+            self.event_members.get(event_id, set()).discard(user_uuid)
+            self.user_events.get(user_uuid, set()).discard(event_id)
+            self._changed([user_uuid])
+
+    def is_loaded(self, user_uuid: str) -> bool:
+        """
+        Check if the events of a user were loaded, however long ago
+        """
+        return user_uuid in self.loaded_at
+
+    def needs_load(self, user_uuid: str) -> bool:
+        """
+        Check if the events of a user were never loaded or are older than the reload TTL
+        """
+        loaded_at = self.loaded_at.get(user_uuid)
+        return loaded_at is None or time.monotonic() - loaded_at >= self.reload_ttl
+
+    def load_user(self, user_uuid: str, events: List[Tuple[str, Optional[str], Optional[str]]]):
+        """
+        Replace the events of a user with every (event id, confirmed start time, confirmed end time) event
+        they are a member of
+        Times are None for events that are not confirmed.
+        """
+        with self.lock:
+            changed_users = set()
+            event_ids = set()
+            for event_id, start_time, end_time in events:
+                event_ids.add(event_id)
+                event_time = (parse_slot(start_time)[0], parse_slot(end_time)[0]) if start_time and end_time else None
+                if self.event_times.get(event_id) != event_time:
+                    if event_time is None:
+                        del self.event_times[event_id]
+                    else:
+                        self.event_times[event_id] = event_time
+                    changed_users |= self.event_members.get(event_id, set())
+                self.event_members.setdefault(event_id, set()).add(user_uuid)
+            old_event_ids = self.user_events.get(user_uuid, set())
+            for event_id in old_event_ids - event_ids:
+                self.event_members.get(event_id, set()).discard(user_uuid)
+            if old_event_ids != event_ids:
+                changed_users.add(user_uuid)
+            self.user_events[user_uuid] = event_ids
+            if user_uuid not in self.loaded_at:
+                # the user was not looked up before, so no earlier result depends on their events
+                self.merged.pop(user_uuid, None)
+                changed_users.discard(user_uuid)
+            self.loaded_at[user_uuid] = time.monotonic()
+            if changed_users:
+                self._changed(changed_users)
+
+    def _get_merged(self, user_uuid: str) -> Tuple[List[int], List[int], List[List[Tuple[int, int, str]]]]:
+        merged = self.merged.get(user_uuid)
+        if merged is not None:
+            return merged
+        intervals = sorted(
+            (*self.event_times[event_id], event_id)
+            for event_id in self.user_events.get(user_uuid, ())
+            if event_id in self.event_times
+        )
+        starts: List[int] = []
+        ends: List[int] = []
+        events: List[List[Tuple[int, int, str]]] = []
+        for start, end, event_id in intervals:
+            if ends and start < ends[-1]:
+                ends[-1] = max(ends[-1], end)
+                events[-1].append((start, end, event_id))
+            else:
+                starts.append(start)
+                ends.append(end)
+                events.append([(start, end, event_id)])
+        merged = (starts, ends, events)
+        self.merged[user_uuid] = merged
+        return merged
+
+    def is_busy(self, user_uuid: str, start_minute: int, end_minute: int, exclude_event_id: Optional[str] = None) -> bool:
+        """
+        Check if a user is committed to any event (other than the excluded one) between two epoch minutes
+        """
+        with self.lock:
+            starts, ends, events = self._get_merged(user_uuid)
+            index = bisect_left(starts, end_minute) - 1
+            # merged intervals are disjoint, so only those ending after the start minute can overlap
+            while index >= 0 and ends[index] > start_minute:
+                if exclude_event_id is None:
+                    return True
+                if any(start < end_minute and start_minute < end and event_id != exclude_event_id for start, end, event_id in events[index]):
+                    return True
+                index -= 1
+            return False
+
+    def filter_blocks(self, availability_blocks: List[Dict[str, Any]], exclude_event_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Remove the availability blocks overlapping the busy intervals of their users
+        """
+        with self.lock:
+            if not self.event_times:
+                return availability_blocks
+            return [
+                block for block in availability_blocks
+                if not self.is_busy(block["user_uuid"], parse_slot(block["start_time"])[0], parse_slot(block["end_time"])[0], exclude_event_id)
+            ]
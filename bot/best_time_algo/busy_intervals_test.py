@@ -0,0 +1,82 @@
+import unittest
+from best_time_algo.busy_intervals import BusyIntervals
+from best_time_algo.availability_matrix import parse_slot
+from best_time_algo.testing import make_blocks
+
+def minute(time_string: str) -> int:
+    return parse_slot(time_string)[0]
+
+class BusyIntervalsTest(unittest.TestCase):
+    def test_is_busy(self):
+        busy_intervals = BusyIntervals()
+        busy_intervals.load_user("1", [
+            ("a", "2025-01-01T10:00:00+08:00", "2025-01-01T11:00:00+08:00"),
+            ("b", "2025-01-01T10:30:00+08:00", "2025-01-01T12:00:00+08:00"),
+            ("c", "2025-01-02T10:00:00+08:00", "2025-01-02T11:00:00+08:00"),
+            ("d", None, None),
+        ])
+        # a and b are merged into a single interval
+        self.assertEqual(busy_intervals._get_merged("1")[:2], ([minute("2025-01-01T10:00:00+08:00"), minute("2025-01-02T10:00:00+08:00")], [minute("2025-01-01T12:00:00+08:00"), minute("2025-01-02T11:00:00+08:00")]))
+        self.assertTrue(busy_intervals.is_busy("1", minute("2025-01-01T11:30:00+08:00"), minute("2025-01-01T12:00:00+08:00")))
+        self.assertFalse(busy_intervals.is_busy("1", minute("2025-01-01T12:00:00+08:00"), minute("2025-01-01T12:30:00+08:00")))
+        self.assertFalse(busy_intervals.is_busy("1", minute("2025-01-01T09:30:00+08:00"), minute("2025-01-01T10:00:00+08:00")))
+        self.assertFalse(busy_intervals.is_busy("2", minute("2025-01-01T10:00:00+08:00"), minute("2025-01-01T10:30:00+08:00")))
+        # the commitment to the excluded event is ignored, not those merged with it
+        self.assertFalse(busy_intervals.is_busy("1", minute("2025-01-01T10:00:00+08:00"), minute("2025-01-01T10:30:00+08:00"), "a"))
+        self.assertTrue(busy_intervals.is_busy("1", minute("2025-01-01T10:30:00+08:00"), minute("2025-01-01T11:00:00+08:00"), "a"))
+        # a range spanning both intervals, with the later one excluded
+        self.assertTrue(busy_intervals.is_busy("1", minute("2025-01-01T11:00:00+08:00"), minute("2025-01-02T11:00:00+08:00"), "c"))
+
+    def test_updates(self):
+        busy_intervals = BusyIntervals()
+        busy_intervals.load_user("1", [("a", None, None)])
+        version = busy_intervals.version
+        start, end = minute("2025-01-01T10:00:00+08:00"), minute("2025-01-01T10:30:00+08:00")
+        self.assertFalse(busy_intervals.is_busy("1", start, end))
+
+        busy_intervals.set_event_time("a", "2025-01-01T10:00:00+08:00", "2025-01-01T11:00:00+08:00")
+        self.assertTrue(busy_intervals.is_busy("1", start, end))
+        busy_intervals.remove_member("a", "1")
+        self.assertFalse(busy_intervals.is_busy("1", start, end))
+        busy_intervals.add_member("a", "1")
+        self.assertTrue(busy_intervals.is_busy("1", start, end))
+        busy_intervals.remove_event("a")
+        self.assertFalse(busy_intervals.is_busy("1", start, end))
+        self.assertEqual(busy_intervals.version, version + 4)
+
+    def test_reload(self):
+        busy_intervals = BusyIntervals(reload_ttl=0)
+        self.assertTrue(busy_intervals.needs_load("1"))
+        busy_intervals.load_user("1", [("a", "2025-01-01T10:00:00+08:00", "2025-01-01T11:00:00+08:00")])
+        self.assertTrue(busy_intervals.is_loaded("1"))
+        self.assertTrue(busy_intervals.needs_load("1"))
+        fresh_intervals = BusyIntervals()
+        fresh_intervals.load_user("1", [])
+        self.assertFalse(fresh_intervals.needs_load("1"))
+        version = busy_intervals.version
+        start, end = minute("2025-01-01T10:00:00+08:00"), minute("2025-01-01T10:30:00+08:00")
+        self.assertTrue(busy_intervals.is_busy("1", start, end))
+
+        # the same events do not change the version
+        busy_intervals.load_user("1", [("a", "2025-01-01T10:00:00+08:00", "2025-01-01T11:00:00+08:00")])
+        self.assertEqual(busy_intervals.version, version)
+        # left from outside the bot: the reload drops the event
+        busy_intervals.load_user("1", [("b", None, None)])
+        self.assertFalse(busy_intervals.is_busy("1", start, end))
+        self.assertEqual(busy_intervals.event_members["a"], set())
+        # confirmed from outside the bot
+        busy_intervals.load_user("1", [("b", "2025-01-01T10:00:00+08:00", "2025-01-01T11:00:00+08:00")])
+        self.assertTrue(busy_intervals.is_busy("1", start, end))
+        self.assertEqual(busy_intervals.version, version + 2)
+
+    def test_filter_blocks(self):
+        busy_intervals = BusyIntervals()
+        availability_blocks = make_blocks("1", [0, 1, 2, 3]) + make_blocks("2", [0, 1, 2, 3])
+        self.assertIs(busy_intervals.filter_blocks(availability_blocks, "event"), availability_blocks)
+        # user 1 is busy from 09:30 to 10:30, slots 1 and 2 after 09:00
+        busy_intervals.load_user("1", [("other", "2025-01-01T09:30:00+08:00", "2025-01-01T10:30:00+08:00")])
+        self.assertEqual(busy_intervals.filter_blocks(availability_blocks, "event"), make_blocks("1", [0, 3]) + make_blocks("2", [0, 1, 2, 3]))
+        self.assertEqual(busy_intervals.filter_blocks(availability_blocks, "other"), availability_blocks)
+
+if __name__ == "__main__":
+    unittest.main()
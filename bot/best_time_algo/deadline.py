@@ -0,0 +1,48 @@
+from typing import Callable
+import time
+
+"""
+Deadline of a time-budgeted call
+
+The deadline is set once, when the call starts, and passed down to every phase of the work (reading the
+event, syncing its session, ingesting the blocks, building the search indexes and the search itself), so
+all of it is charged to the same budget. The clock can be replaced, so budgets can be tested without
+depending on how fast the machine is.
+"""
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised by Deadline.check once the deadline has passed
+    """
+
+
+class Deadline:
+    """
+    Point in time a budgeted call has to return by
+    """
+    def __init__(self, time_budget: float, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.end = clock() + time_budget
+
+    def remaining(self) -> float:
+        """
+        Seconds left before the deadline, negative once it has passed
+        """
+        return self.end - self.clock()
+
+    def expired(self) -> bool:
+        return self.clock() >= self.end
+
+    def check(self):
+        """
+        Raise DeadlineExceeded if the deadline has passed, to stop between phases of the work
+        """
+        if self.expired():
+            raise DeadlineExceeded()
+
+    def share(self, fraction: float) -> 'Deadline':
+        """
+        Deadline after the given fraction of the time left, on the same clock
+        """
+        return Deadline(max(self.remaining(), 0) * fraction, self.clock)
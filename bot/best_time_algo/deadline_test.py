@@ -0,0 +1,27 @@
+import unittest
+from best_time_algo.deadline import Deadline, DeadlineExceeded
+from best_time_algo.testing import StepClock
+
+class DeadlineTest(unittest.TestCase):
+    def test_expiry(self):
+        # every reading of the clock advances it by a second
+        deadline = Deadline(4, StepClock())
+        self.assertEqual(deadline.remaining(), 3)
+        self.assertFalse(deadline.expired())
+        deadline.check()
+        with self.assertRaises(DeadlineExceeded):
+            deadline.check()
+
+    def test_share(self):
+        clock = StepClock()
+        deadline = Deadline(11, clock)
+        # half of the 10 seconds left after reading the clock, from the next reading
+        share = deadline.share(0.5)
+        self.assertEqual(share.end, 2 + 5)
+        self.assertLessEqual(share.end, deadline.end)
+        # the share of an expired deadline is expired
+        clock.now = 20
+        self.assertTrue(deadline.share(0.5).expired())
+
+if __name__ == "__main__":
+    unittest.main()
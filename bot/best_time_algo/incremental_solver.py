@@ -0,0 +1,295 @@
+from typing import List, Dict, Set, Tuple, Any
+import bisect
+import heapq
+import threading
+
+# Import from best time algo
+from best_time_algo.best_time_algo import BestTimeAlgo, TIME_SLOT_SIZE, DEFAULT_TOP_K, DEFAULT_SESSION_COUNT
+from best_time_algo.session_cover import select_sessions
+from best_time_algo.availability_matrix import AvailabilityMatrix, parse_slot, get_block_weight, DEFAULT_WEIGHT
+from best_time_algo.sleep_masks import SleepMasks
+from best_time_algo.slot_counts import SlotCounts
+
+"""
+Incremental best time state for a single event
+
+The state keeps the availability matrix and the scored window starting at every slot. When a user's
+availability or sleep hours are replaced only that user's bit is flipped in the slots that changed,
+and only the windows that can include a changed slot (those starting up to max_block_size - 1 slots
+before it) are recomputed, unless the change gives or takes a required participant's first availability,
+which changes which windows are valid anywhere, so every window is recomputed. Windows are ranked in a heap with lazy invalidation, so reading the best times
+does not rescan every window either.
+"""
+
+class IncrementalSolverState:
+    """
+    Availability matrix and ranked windows of an event, updated per user
+    """
+    def __init__(self, best_time_algo: BestTimeAlgo, availability_blocks: List[Dict[str, Any]]):
+        self.best_time_algo = best_time_algo
+        self.matrix = AvailabilityMatrix.from_availability_blocks(availability_blocks, TIME_SLOT_SIZE)
+        self.lock = threading.Lock()
+
+        # raw (start time, weight) of every user, used to detect which users changed between fetches
+        self.user_start_times: Dict[str, Set[Tuple[str, int]]] = {}
+        # epoch minutes each user submitted, and the subset that is set in the matrix (outside sleep hours)
+        self.user_minutes: Dict[str, Set[int]] = {}
+        self.user_effective_minutes: Dict[str, Set[int]] = {}
+        # epoch minute -> weight of every user, for the minutes with a weight other than the default
+        self.user_weights: Dict[str, Dict[int, int]] = {}
+        for block in availability_blocks:
+            weight = get_block_weight(block)
+            self.user_start_times.setdefault(block["user_uuid"], set()).add((block["start_time"], weight))
+            if weight != DEFAULT_WEIGHT:
+                self.user_weights.setdefault(block["user_uuid"], {})[parse_slot(block["start_time"])[0]] = weight
+        for minute, mask in zip(self.matrix.slot_minutes, self.matrix.slot_masks):
+            while mask:
+                low_bit = mask & -mask
+                self.user_minutes.setdefault(self.matrix.participants[low_bit.bit_length() - 1], set()).add(minute)
+                mask ^= low_bit
+        best_time_algo.sleep_masks.apply(self.matrix)
+        for user_uuid, minutes in self.user_minutes.items():
+            self.user_effective_minutes[user_uuid] = self._get_effective_minutes(user_uuid, minutes)
+        self.slot_counts = SlotCounts.from_matrix(self.matrix, best_time_algo.sensitivity_threshold)
+
+        # start minute -> (score, length, mask, version) of the window starting at that slot
+        self.windows: Dict[int, Tuple[float, int, int, int]] = {}
+        self.heap: List[Tuple[float, int, int]] = []
+        self.version = 0
+        self.required_mask = self._get_required_mask()
+        for start in range(self.matrix.get_slot_count()):
+            self._update_window(start)
+
+    def get_parameters(self) -> Tuple[int, int, int, str, Tuple[str, ...]]:
+        return self.best_time_algo.get_parameters()
+
+    def _get_effective_minutes(self, user_uuid: str, minutes: Set[int]) -> Set[int]:
+        """
+        Minutes of a user that are outside their sleep hours
+        """
+        sleep_masks = self.best_time_algo.sleep_masks
+        return {minute for minute in minutes if not sleep_masks.is_asleep(user_uuid, minute)}
+
+    def _get_required_mask(self) -> int:
+        """
+        Bitmask of the required participants who submitted any availability
+        A participant keeps their bit in the matrix after clearing their availability, so unlike the
+        best time algo this is read from the submitted minutes rather than from the participant bits.
+        Every participant with submitted minutes has a bit, even if all of them are in their sleep hours.
+        """
+        required_mask = 0
+        for user_uuid in self.best_time_algo.required_participants:
+            if self.user_minutes.get(user_uuid):
+                required_mask |= self.matrix.get_participant_mask(user_uuid)
+        return required_mask
+
+    def _update_window(self, start: int):
+        """
+        Recompute and rank the window starting at the slot
+        """
+        algo = self.best_time_algo
+        matrix = self.matrix
+        minute = matrix.slot_minutes[start]
+        window = matrix.window_at(start, algo.min_participants, algo.min_block_size, algo.max_block_size, self.slot_counts.jumps)
+        required_mask = self.required_mask
+        if window is None or window[1] & required_mask != required_mask:
+            self.windows.pop(minute, None)
+            return
+        length, mask = window
+        score = algo._score_weight(algo._get_timing_weight(minute), matrix.get_weighted_count(start, length, mask))
+        self.version += 1
+        self.windows[minute] = (score, length, mask, self.version)
+        heapq.heappush(self.heap, (-score, minute, self.version))
+
+    def replace_user_slots(self, user_uuid: str, availability_blocks: List[Dict[str, Any]]) -> Set[int]:
+        """
+        Replace the availability of a user with the given blocks
+        Returns the epoch minutes of the slots that changed
+        """
+        with self.lock:
+            return self._replace_user_slots(user_uuid, availability_blocks)
+
+    def _replace_user_slots(self, user_uuid: str, availability_blocks: List[Dict[str, Any]]) -> Set[int]:
+        matrix = self.matrix
+        new_minutes = {}
+        new_weights = {}
+        for block in availability_blocks:
+            minute, offset = parse_slot(block["start_time"])
+            new_minutes.setdefault(minute, offset)
+            weight = get_block_weight(block)
+            if weight != DEFAULT_WEIGHT:
+                new_weights[minute] = weight
+        slot_count = matrix.get_slot_count()
+        for minute, offset in new_minutes.items():
+            matrix.ensure_slot(minute, offset)
+        if matrix.get_slot_count() != slot_count:
+            # new slots shift the slot indices, recount
+            self.slot_counts = SlotCounts.from_matrix(matrix, self.best_time_algo.sensitivity_threshold)
+
+        # the weights of a user only count where they are available, so they are set regardless of sleep hours
+        old_weights = self.user_weights.get(user_uuid, {})
+        reweighted_minutes = {minute for minute in set(old_weights) | set(new_weights) if old_weights.get(minute) != new_weights.get(minute)}
+        for minute in reweighted_minutes:
+            matrix.set_weight(user_uuid, minute, new_weights.get(minute, DEFAULT_WEIGHT))
+        self.user_weights[user_uuid] = new_weights
+
+        self.user_minutes[user_uuid] = set(new_minutes)
+        if new_minutes:
+            # a participant with every minute in their sleep hours sets no bit, but still counts as having responded
+            matrix.ensure_participant(user_uuid)
+        self.user_start_times[user_uuid] = {(block["start_time"], get_block_weight(block)) for block in availability_blocks}
+        return self._apply_user_minutes(user_uuid, reweighted_minutes)
+
+    def _apply_user_minutes(self, user_uuid: str, reweighted_minutes: Set[int] = frozenset()) -> Set[int]:
+        """
+        Flip the bits of a user in the slots where the matrix differs from their submitted minutes
+        and re-rank the windows that can contain those slots or the slots where their weight changed
+        Returns the epoch minutes of the slots that changed
+        """
+        matrix = self.matrix
+        effective_minutes = self._get_effective_minutes(user_uuid, self.user_minutes.get(user_uuid, set()))
+        changed_minutes = self.user_effective_minutes.get(user_uuid, set()).symmetric_difference(effective_minutes)
+        for minute in changed_minutes:
+            matrix.set_available(user_uuid, minute, minute in effective_minutes)
+            index = matrix.slot_index[minute]
+            self.slot_counts.update_count(index, matrix.get_participant_count(index))
+        self.user_effective_minutes[user_uuid] = effective_minutes
+        changed_minutes |= effective_minutes & reweighted_minutes
+
+        required_mask = self._get_required_mask()
+        if required_mask != self.required_mask:
+            # a required participant submitted their first availability or cleared it, which is enforced on every window
+            self.required_mask = required_mask
+            for start in range(matrix.get_slot_count()):
+                self._update_window(start)
+            self._compact_heap()
+            return changed_minutes
+
+        # only windows that can contain a changed slot need to be re-ranked
+        # (a changed count also changes the jump from the slot before it, which those windows cover)
+        affected_starts = set()
+        for minute in changed_minutes:
+            for offset in range(self.best_time_algo.max_block_size):
+                start = matrix.slot_index.get(minute - offset * matrix.slot_size)
+                if start is not None:
+                    affected_starts.add(start)
+        for start in affected_starts:
+            self._update_window(start)
+
+        self._compact_heap()
+        return changed_minutes
+
+    def update_sleep_hours(self, participant_sleep_hours: Dict[str, Dict[str, int]]) -> Set[str]:
+        """
+        Replace the sleep hours of the participants
+        Only users whose sleep slots changed are re-applied to the matrix.
+        Returns the uuids of the users whose sleep slots changed
+        """
+        with self.lock:
+            algo = self.best_time_algo
+            old_sleep_masks = algo.sleep_masks
+            algo.participant_sleep_hours = participant_sleep_hours
+            algo.sleep_masks = SleepMasks(algo.sleep_hours, participant_sleep_hours, algo.timezone, TIME_SLOT_SIZE)
+            changed_users = {
+                user_uuid for user_uuid in self.user_minutes
+                if old_sleep_masks.get_sleep_slots(user_uuid) != algo.sleep_masks.get_sleep_slots(user_uuid)
+            }
+            for user_uuid in changed_users:
+                self._apply_user_minutes(user_uuid)
+            return changed_users
+
+    def sync(self, availability_blocks: List[Dict[str, Any]]) -> Set[str]:
+        """
+        Bring the state in line with freshly fetched availability blocks of the event
+        Only users whose start times or weights differ from the state are replaced.
+        Returns the uuids of the users that changed
+        """
+        blocks_by_user: Dict[str, List[Dict[str, Any]]] = {}
+        for block in availability_blocks:
+            blocks_by_user.setdefault(block["user_uuid"], []).append(block)
+
+        with self.lock:
+            changed_users = set()
+            for user_uuid in set(blocks_by_user) | set(self.user_start_times):
+                user_blocks = blocks_by_user.get(user_uuid, [])
+                start_times = {(block["start_time"], get_block_weight(block)) for block in user_blocks}
+                if start_times != self.user_start_times.get(user_uuid, set()):
+                    self._replace_user_slots(user_uuid, user_blocks)
+                    changed_users.add(user_uuid)
+            return changed_users
+
+    def _compact_heap(self):
+        """
+        Drop stale heap entries once they outnumber the live windows
+        """
+        if len(self.heap) > 2 * len(self.windows) + 64:
+            self.heap = [(-score, minute, version) for minute, (score, length, mask, version) in self.windows.items()]
+            heapq.heapify(self.heap)
+
+    def _pop_ranked(self, stop) -> List[Tuple[float, int]]:
+        """
+        Pop live (score, start minute) entries off the heap, best first, until stop returns True
+        The popped entries are pushed back before returning.
+        """
+        popped = []
+        ranked = []
+        while self.heap:
+            entry = self.heap[0]
+            negative_score, minute, version = entry
+            window = self.windows.get(minute)
+            if window is None or window[3] != version:
+                heapq.heappop(self.heap)
+                continue
+            if stop(ranked, -negative_score):
+                break
+            popped.append(heapq.heappop(self.heap))
+            ranked.append((-negative_score, minute))
+        for entry in popped:
+            heapq.heappush(self.heap, entry)
+        return ranked
+
+    def _format(self, minute: int) -> Dict[str, Any]:
+        score, length, mask, version = self.windows[minute]
+        return self.best_time_algo._format_window(self.matrix, self.matrix.slot_index[minute], length, mask)
+
+    def get_best_event_blocks(self) -> List[Dict[str, Any]]:
+        """
+        Get every event block with the best score, in order of start time
+        """
+        with self.lock:
+            ranked = self._pop_ranked(lambda ranked, score: bool(ranked) and score != ranked[0][0])
+            return [self._format(minute) for score, minute in ranked]
+
+    def get_event_participants(self, best_start_time: str, best_end_time: str) -> List[str]:
+        """
+        Get the participants available at any slot from the start to the end time (inclusive), as submitted
+        The state's matrix is masked by sleep hours, which only apply to ranking, so participants are read
+        from the minutes every user submitted instead.
+        """
+        start_minute = parse_slot(best_start_time)[0]
+        end_minute = parse_slot(best_end_time)[0]
+        with self.lock:
+            slot_minutes = self.matrix.slot_minutes
+            minutes = slot_minutes[bisect.bisect_left(slot_minutes, start_minute):bisect.bisect_right(slot_minutes, end_minute)]
+            return sorted(user_uuid for user_uuid, user_minutes in self.user_minutes.items() if any(minute in user_minutes for minute in minutes))
+
+    def get_best_meeting_times(self, k: int = DEFAULT_TOP_K) -> List[Dict[str, Any]]:
+        """
+        Get the top k event blocks ranked by score, best first
+        """
+        if k <= 0:
+            return []
+        with self.lock:
+            ranked = self._pop_ranked(lambda ranked, score: len(ranked) >= k)
+            return [{**self._format(minute), "score": score} for score, minute in ranked]
+
+    def get_covering_sessions(self, k: int = DEFAULT_SESSION_COUNT) -> List[Dict[str, Any]]:
+        """
+        Get up to k non-overlapping event blocks covering the most participants, from the state's windows
+        """
+        if k <= 0:
+            return []
+        with self.lock:
+            windows = [(score, self.matrix.slot_index[minute], length, mask) for minute, (score, length, mask, version) in self.windows.items()]
+            sessions = select_sessions(windows, self.matrix.slot_minutes, self.matrix.slot_size, k)
+            return self.best_time_algo._format_sessions(self.matrix, sessions)
@@ -0,0 +1,132 @@
+import unittest
+import random
+from best_time_algo.best_time_algo import BestTimeAlgo
+from best_time_algo.incremental_solver import IncrementalSolverState
+from best_time_algo.availability_matrix import PREFERRED_WEIGHT
+from best_time_algo.testing import make_blocks
+
+class IncrementalSolverStateTest(unittest.TestCase):
+    def test_initial_state(self):
+        availability_blocks = make_blocks("1", [0, 1, 2]) + make_blocks("2", [0, 1, 2]) + make_blocks("3", [1, 2])
+        best_time_algo = BestTimeAlgo(min_block_size=2, max_block_size=4)
+        state = IncrementalSolverState(best_time_algo, availability_blocks)
+        self.assertEqual(state.get_best_event_blocks(), best_time_algo._process_availability_blocks(availability_blocks))
+        self.assertEqual(state.get_best_meeting_times(3), best_time_algo.get_best_meeting_times(availability_blocks, 3))
+
+    def test_replace_user_slots(self):
+        availability_blocks = make_blocks("1", [0, 1, 2]) + make_blocks("2", [0, 1, 2])
+        best_time_algo = BestTimeAlgo(min_block_size=2, max_block_size=4)
+        state = IncrementalSolverState(best_time_algo, availability_blocks)
+
+        changed = state.replace_user_slots("2", make_blocks("2", [1, 2, 3]))
+        self.assertEqual(len(changed), 2)
+        updated_blocks = make_blocks("1", [0, 1, 2]) + make_blocks("2", [1, 2, 3])
+        self.assertEqual(state.get_best_event_blocks(), best_time_algo._process_availability_blocks(updated_blocks))
+
+        # a new participant and a slot before every existing slot
+        state.replace_user_slots("3", make_blocks("3", [-1, 0, 1, 2]))
+        updated_blocks += make_blocks("3", [-1, 0, 1, 2])
+        self.assertEqual(state.get_best_meeting_times(5), best_time_algo.get_best_meeting_times(updated_blocks, 5))
+
+        # clearing a user
+        state.replace_user_slots("1", [])
+        updated_blocks = make_blocks("2", [1, 2, 3]) + make_blocks("3", [-1, 0, 1, 2])
+        self.assertEqual(state.get_best_meeting_times(5), best_time_algo.get_best_meeting_times(updated_blocks, 5))
+        start_time, end_time = updated_blocks[0]["start_time"], updated_blocks[-1]["start_time"]
+        self.assertEqual(state.get_event_participants(start_time, end_time), best_time_algo.get_event_participants(updated_blocks, start_time, end_time))
+
+    def test_event_participants_as_submitted(self):
+        # slots 28 and 29 (23:00 to 00:00) are in the default sleep hours
+        availability_blocks = make_blocks("1", [0, 1, 28, 29]) + make_blocks("2", [0, 1, 28, 29]) + make_blocks("3", [0, 1])
+        best_time_algo = BestTimeAlgo(min_block_size=2, max_block_size=4)
+        state = IncrementalSolverState(best_time_algo, availability_blocks)
+        self.assertTrue(all(block["start_time"] == availability_blocks[0]["start_time"] for block in state.get_best_meeting_times(5)))
+        # sleep hours only apply to ranking, participants who marked the slots are still participants
+        start_time, end_time = availability_blocks[2]["start_time"], availability_blocks[3]["start_time"]
+        self.assertEqual(state.get_event_participants(start_time, end_time), ["1", "2"])
+        self.assertEqual(state.get_event_participants(start_time, end_time), best_time_algo.get_event_participants(availability_blocks, start_time, end_time))
+
+    def test_sync(self):
+        availability_blocks = make_blocks("1", [0, 1, 2]) + make_blocks("2", [0, 1, 2])
+        state = IncrementalSolverState(BestTimeAlgo(), availability_blocks)
+        self.assertEqual(state.sync(availability_blocks), set())
+        updated_blocks = make_blocks("1", [0, 1, 2]) + make_blocks("3", [0, 1])
+        self.assertEqual(state.sync(updated_blocks), {"2", "3"})
+        self.assertEqual(state.get_best_event_blocks(), BestTimeAlgo()._process_availability_blocks(updated_blocks))
+
+    def test_matches_rebuild(self):
+        rng = random.Random(11)
+        users = [f"user-{i:02d}" for i in range(15)]
+        user_slots = {user: [slot for slot in range(48) if rng.random() < 0.6] for user in users}
+        for required_participants in [[], ["user-00", "user-01"]]:
+            best_time_algo = BestTimeAlgo(min_participants=3, min_block_size=2, max_block_size=6, required_participants=required_participants)
+            state = IncrementalSolverState(best_time_algo, [block for user in users for block in make_blocks(user, user_slots[user])])
+            for _ in range(30):
+                user = rng.choice(users)
+                user_slots[user] = [slot for slot in range(-4, 52) if rng.random() < 0.5]
+                state.replace_user_slots(user, make_blocks(user, user_slots[user]))
+                availability_blocks = [block for user in users for block in make_blocks(user, user_slots[user])]
+                self.assertEqual(state.get_best_meeting_times(10), best_time_algo.get_best_meeting_times(availability_blocks, 10))
+                self.assertEqual(state.get_best_event_blocks(), best_time_algo._process_availability_blocks(availability_blocks))
+
+    def test_required_participant_membership(self):
+        # the required participant has not responded, so the windows of the others are valid
+        other_blocks = make_blocks("2", range(0, 8)) + make_blocks("3", range(0, 8))
+        best_time_algo = BestTimeAlgo(min_block_size=2, max_block_size=4, required_participants=["1"])
+        state = IncrementalSolverState(best_time_algo, other_blocks)
+        self.assertEqual(state.get_best_meeting_times(5), best_time_algo.get_best_meeting_times(other_blocks, 5))
+
+        # their first availability, far from the other windows, invalidates every window without them
+        availability_blocks = other_blocks + make_blocks("1", [20, 21])
+        state.replace_user_slots("1", make_blocks("1", [20, 21]))
+        self.assertEqual(state.get_best_meeting_times(5), best_time_algo.get_best_meeting_times(availability_blocks, 5))
+        self.assertEqual(state.get_best_event_blocks(), best_time_algo._process_availability_blocks(availability_blocks))
+
+        # clearing it makes them valid again
+        state.sync(other_blocks)
+        self.assertEqual(state.get_best_meeting_times(5), best_time_algo.get_best_meeting_times(other_blocks, 5))
+        self.assertEqual(state.get_best_event_blocks(), best_time_algo._process_availability_blocks(other_blocks))
+
+    def test_required_participant_asleep(self):
+        # slots 28 and 29 (23:00 to 00:00) are in the default sleep hours
+        other_blocks = make_blocks("2", range(0, 8)) + make_blocks("3", range(0, 8))
+        asleep_blocks = make_blocks("1", [28, 29])
+        best_time_algo = BestTimeAlgo(min_block_size=2, max_block_size=4, required_participants=["1"])
+        state = IncrementalSolverState(best_time_algo, other_blocks)
+
+        # the required participant responded, only while asleep, so no window can include them
+        state.replace_user_slots("1", asleep_blocks)
+        self.assertEqual(state.get_best_meeting_times(5), [])
+        self.assertEqual(state.get_best_meeting_times(5), best_time_algo.get_best_meeting_times(other_blocks + asleep_blocks, 5))
+        self.assertEqual(state.get_best_event_blocks(), best_time_algo._process_availability_blocks(other_blocks + asleep_blocks))
+
+        state.sync(other_blocks)
+        self.assertEqual(state.get_best_meeting_times(5), best_time_algo.get_best_meeting_times(other_blocks, 5))
+
+    def test_weights_match_rebuild(self):
+        rng = random.Random(12)
+        users = [f"user-{i:02d}" for i in range(10)]
+
+        def make_weighted_blocks(user, slots, preferred):
+            return [{**block, "weight": PREFERRED_WEIGHT} if slot in preferred else block for slot, block in zip(slots, make_blocks(user, slots))]
+
+        user_slots = {user: [slot for slot in range(48) if rng.random() < 0.6] for user in users}
+        user_preferred = {user: {slot for slot in user_slots[user] if rng.random() < 0.3} for user in users}
+        best_time_algo = BestTimeAlgo(min_participants=3, min_block_size=2, max_block_size=6)
+        state = IncrementalSolverState(best_time_algo, [block for user in users for block in make_weighted_blocks(user, user_slots[user], user_preferred[user])])
+        for step in range(30):
+            user = rng.choice(users)
+            if step % 2:
+                # the same slots with other weights
+                user_slots[user] = [slot for slot in range(-4, 52) if rng.random() < 0.5]
+            user_preferred[user] = {slot for slot in user_slots[user] if rng.random() < 0.3}
+            availability_blocks = [block for user in users for block in make_weighted_blocks(user, user_slots[user], user_preferred[user])]
+            if step % 3:
+                state.replace_user_slots(user, make_weighted_blocks(user, user_slots[user], user_preferred[user]))
+            else:
+                state.sync(availability_blocks)
+            self.assertEqual(state.get_best_meeting_times(10), best_time_algo.get_best_meeting_times(availability_blocks, 10))
+            self.assertEqual(state.get_best_event_blocks(), best_time_algo._process_availability_blocks(availability_blocks))
+
+if __name__ == "__main__":
+    unittest.main()
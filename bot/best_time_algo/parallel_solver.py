@@ -0,0 +1,175 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from operator import itemgetter
+from typing import List, Dict, Tuple, Any, Optional
+import heapq
+import logging
+import multiprocessing
+import threading
+
+# Import from best time algo
+from best_time_algo.best_time_algo import BestTimeAlgo, TIME_SLOT_SIZE, DEFAULT_TOP_K
+from best_time_algo.availability_matrix import parse_slot
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+"""
+Parallel solving of events spanning many days
+
+The date range of an event is partitioned into chunks of whole days (in the local time of its first
+slot). Every chunk is solved in a worker process with the availability of its own days plus an
+overlap of max_block_size slots after them, so the windows starting on its last slots are complete.
+A chunk only reports the windows starting on its own days, so every window is reported by exactly one
+chunk, and the best candidates of all chunks are merged into the same results as solving in process.
+Events with fewer availability blocks than the threshold, or with a single chunk, are solved in process,
+where the cost of shipping the blocks to the workers would outweigh the parallelism.
+
+Workers are started from a fork server rather than forked from the bot, as forking a process that runs
+threads (the bot polling, the API server, the HTTP connection pools) can copy locks held by another thread.
+"""
+
+DEFAULT_CHUNK_DAYS = 7
+PARALLEL_MIN_BLOCKS = 20000  # availability blocks below which an event is solved in process
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"  # how worker processes are started
+
+
+def _get_parameters(best_time_algo: BestTimeAlgo) -> Dict[str, Any]:
+    """
+    Constructor arguments recreating the best time algo in a worker process
+    """
+    return {
+        "sleep_hours": best_time_algo.sleep_hours,
+        "min_block_size": best_time_algo.min_block_size,
+        "min_participants": best_time_algo.min_participants,
+        "sensitivity_threshold": best_time_algo.sensitivity_threshold,
+        "max_block_size": best_time_algo.max_block_size,
+        "backend": best_time_algo.backend,
+        "participant_sleep_hours": best_time_algo.participant_sleep_hours,
+        "timezone": best_time_algo.timezone,
+        "required_participants": best_time_algo.required_participants,
+    }
+
+
+def _solve_chunk(parameters: Dict[str, Any], availability_blocks: List[Dict[str, Any]], start_minute: int, end_minute: int, k: Optional[int]) -> List[Tuple[float, int, Dict[str, Any]]]:
+    """
+    Solve a chunk in a worker process
+    Returns the (score, start minute, event block) candidates starting from the start to the end minute:
+    every window with the best score with k None, otherwise the top k
+    """
+    best_time_algo = BestTimeAlgo(**parameters)
+    matrix = best_time_algo._create_availability_matrix(availability_blocks)
+    if any(user_uuid not in matrix.participant_bits for user_uuid in best_time_algo.required_participants):
+        # a required participant with availability elsewhere in the event has none in this chunk
+        return []
+    scored_windows = [window for window in best_time_algo._score_matrix_windows(matrix) if start_minute <= matrix.slot_minutes[window[1]] < end_minute]
+    if not scored_windows:
+        return []
+    if k is None:
+        best_score = max(scored_windows, key=itemgetter(0))[0]
+        scored_windows = [window for window in scored_windows if window[0] == best_score]
+    else:
+        scored_windows = heapq.nlargest(k, scored_windows, key=itemgetter(0))
+    return [(score, matrix.slot_minutes[start], best_time_algo._format_window(matrix, start, length, mask)) for score, start, length, mask in scored_windows]
+
+
+class ParallelSolver:
+    """
+    Solves events spanning many days in day chunks on a pool of worker processes
+    """
+    def __init__(self, max_workers: Optional[int] = None, chunk_days: int = DEFAULT_CHUNK_DAYS, min_blocks: int = PARALLEL_MIN_BLOCKS):
+        self.max_workers = max_workers
+        self.chunk_days = chunk_days
+        self.min_blocks = min_blocks
+        self.lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """
+        Get the pool of worker processes, starting it on first use
+        """
+        with self.lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context(START_METHOD))
+            return self._executor
+
+    def shutdown(self):
+        with self.lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def should_solve_in_parallel(self, availability_blocks: List[Dict[str, Any]]) -> bool:
+        return len(availability_blocks) >= self.min_blocks
+
+    def split_chunks(self, availability_blocks: List[Dict[str, Any]], max_block_size: int) -> List[Tuple[int, int, List[Dict[str, Any]]]]:
+        """
+        Split the availability blocks into (start minute, end minute, blocks) chunks of chunk_days days
+        The blocks of a chunk include those of the max_block_size slots after its end minute.
+        """
+        if not availability_blocks:
+            return []
+        slots = [parse_slot(block["start_time"]) for block in availability_blocks]
+        first_minute, first_offset = min(slots)
+        chunk_minutes = self.chunk_days * 24 * 60
+        chunk_start = (first_minute + first_offset) // (24 * 60) * (24 * 60) - first_offset
+        overlap = max_block_size * TIME_SLOT_SIZE
+
+        chunks: Dict[int, List[Dict[str, Any]]] = {}
+        for block, (minute, _) in zip(availability_blocks, slots):
+            index = (minute - chunk_start) // chunk_minutes
+            chunks.setdefault(index, []).append(block)
+            if index > 0 and minute - chunk_start - index * chunk_minutes < overlap:
+                # within the overlap of the chunk before
+                chunks.setdefault(index - 1, []).append(block)
+        return [
+            (chunk_start + index * chunk_minutes, chunk_start + (index + 1) * chunk_minutes, chunks[index])
+            for index in sorted(chunks)
+        ]
+
+    def _solve(self, best_time_algo: BestTimeAlgo, availability_blocks: List[Dict[str, Any]], k: Optional[int]) -> Optional[List[Tuple[float, int, Dict[str, Any]]]]:
+        """
+        Solve the chunks in the worker processes and merge their candidates (best first, then in order of start)
+        Returns None if the event should be solved in process instead
+        """
+        if not self.should_solve_in_parallel(availability_blocks):
+            return None
+        chunks = self.split_chunks(availability_blocks, best_time_algo.max_block_size)
+        if len(chunks) < 2:
+            return None
+        parameters = _get_parameters(best_time_algo)
+        # required participants are enforced if they have availability anywhere in the event, not just in a chunk
+        user_uuids = {block["user_uuid"] for block in availability_blocks}
+        parameters["required_participants"] = [user_uuid for user_uuid in best_time_algo.required_participants if user_uuid in user_uuids]
+        try:
+            executor = self._get_executor()
+            futures = [executor.submit(_solve_chunk, parameters, blocks, start_minute, end_minute, k) for start_minute, end_minute, blocks in chunks]
+            candidates = [candidate for future in futures for candidate in future.result()]
+        except BrokenProcessPool:
+            logger.exception("Worker processes stopped, solving in process")
+            self.shutdown()
+            return None
+        return sorted(candidates, key=lambda candidate: (-candidate[0], candidate[1]))
+
+    def get_best_event_blocks(self, best_time_algo: BestTimeAlgo, availability_blocks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Get the best event blocks, as _process_availability_blocks of the best time algo returns
+        """
+        candidates = self._solve(best_time_algo, availability_blocks, None)
+        if candidates is None:
+            return best_time_algo._process_availability_blocks(availability_blocks)
+        if not candidates:
+            return []
+        best_score = candidates[0][0]
+        return [event_block for score, _, event_block in candidates if score == best_score]
+
+    def get_best_meeting_times(self, best_time_algo: BestTimeAlgo, availability_blocks: List[Dict[str, Any]], k: int = DEFAULT_TOP_K) -> List[Dict[str, Any]]:
+        """
+        Get the top k event blocks ranked by score, as get_best_meeting_times of the best time algo returns
+        """
+        if k <= 0:
+            return []
+        candidates = self._solve(best_time_algo, availability_blocks, k)
+        if candidates is None:
+            return best_time_algo.get_best_meeting_times(availability_blocks, k)
+        return [{**event_block, "score": score} for score, _, event_block in candidates[:k]]
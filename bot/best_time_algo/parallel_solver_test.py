@@ -0,0 +1,39 @@
+import unittest
+from best_time_algo.parallel_solver import ParallelSolver
+from best_time_algo.testing import generate_availability_blocks
+from best_time_algo.best_time_algo import BestTimeAlgo
+
+class ParallelSolverTest(unittest.TestCase):
+    def test_split_chunks(self):
+        start_times = ["2025-01-01T22:00:00+08:00", "2025-01-02T00:30:00+08:00", "2025-01-02T01:30:00+08:00", "2025-01-02T02:00:00+08:00", "2025-01-03T10:00:00+08:00"]
+        availability_blocks = [{"start_time": start_time, "end_time": start_time, "event_id": "1", "user_uuid": "1"} for start_time in start_times]
+        chunks = ParallelSolver(chunk_days=1).split_chunks(availability_blocks, 4)
+        # chunks of local days, each with the blocks of the first 2 hours (4 slots) of the next day
+        midnight = 28928160 - 8 * 60  # 2025-01-01T00:00:00+08:00 in epoch minutes
+        self.assertEqual([(start_minute - midnight, end_minute - midnight) for start_minute, end_minute, _ in chunks], [(0, 1440), (1440, 2880), (2880, 4320)])
+        self.assertEqual([[block["start_time"] for block in blocks] for _, _, blocks in chunks], [start_times[:3], start_times[1:4], start_times[4:]])
+
+    def test_parallel_matches_in_process(self):
+        solver = ParallelSolver(max_workers=2, chunk_days=2, min_blocks=0)
+        try:
+            for seed, users, density in [(1, 8, 0.7), (2, 20, 0.5)]:
+                # user-000 is only available from the 5th day, so no earlier chunk can meet the requirement
+                availability_blocks = [block for block in generate_availability_blocks(seed, users, 7 * 48, density) if block["user_uuid"] != "user-000" or block["start_time"] >= "2025-01-05"]
+                for max_block_size, required_participants in [(2, []), (6, []), (4, ["user-000", "user-001"])]:
+                    scheduler = BestTimeAlgo(min_participants=3, min_block_size=2, max_block_size=max_block_size, required_participants=required_participants)
+                    self.assertEqual(solver.get_best_event_blocks(scheduler, availability_blocks), scheduler._process_availability_blocks(availability_blocks))
+                    for k in [1, 5, 50]:
+                        self.assertEqual(solver.get_best_meeting_times(scheduler, availability_blocks, k), scheduler.get_best_meeting_times(availability_blocks, k))
+        finally:
+            solver.shutdown()
+
+    def test_small_events_solved_in_process(self):
+        availability_blocks = generate_availability_blocks(1, 4, 7 * 48, 0.7)
+        solver = ParallelSolver(chunk_days=1)
+        scheduler = BestTimeAlgo()
+        self.assertFalse(solver.should_solve_in_parallel(availability_blocks))
+        self.assertEqual(solver.get_best_event_blocks(scheduler, availability_blocks), scheduler._process_availability_blocks(availability_blocks))
+        self.assertIsNone(solver._executor)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,184 @@
+from typing import List, Dict, Set, Any, Optional, Tuple
+import threading
+
+# Import from best time algo
+from best_time_algo.best_time_algo import BestTimeAlgo, TIME_SLOT_SIZE, DEFAULT_TOP_K, DEFAULT_SESSION_COUNT
+from best_time_algo.availability_matrix import AvailabilityMatrix, get_block_weight
+from best_time_algo.incremental_solver import IncrementalSolverState
+from best_time_algo.sleep_masks import SleepMasks
+from best_time_algo.parallel_solver import ParallelSolver
+
+"""
+Scheduling session of a single event
+
+A session is built once from the availability of an event and answers every scheduling query on it
+(best blocks, ranked blocks, covering sessions, participants of a window and counts per slot) from
+indexes that are shared between the queries and built on first use:
+    - the solver state (availability matrix without sleep hours and the ranked windows), used for
+      the best blocks, the covering sessions and the participants of a window
+    - the availability matrix as submitted, used for the counts per slot
+Availability and sleep hour updates are applied to the indexes that are already built.
+With a parallel solver, the best blocks of a large event are solved in worker processes for as long as
+no solver state is built, instead of building the state in the calling thread.
+"""
+
+class SchedulingSession:
+    """
+    Scheduling queries on the availability of one event, answered from shared indexes
+    """
+    def __init__(self, best_time_algo: BestTimeAlgo, availability_blocks: List[Dict[str, Any]], parallel_solver: Optional[ParallelSolver] = None):
+        self.best_time_algo = best_time_algo
+        self.availability_blocks = list(availability_blocks)
+        self.parallel_solver = parallel_solver
+        self.lock = threading.RLock()
+        self._solver_state: Optional[IncrementalSolverState] = None
+        self._availability_matrix: Optional[AvailabilityMatrix] = None
+        # versions of the event's availability and of the busy intervals the session was last synced with, kept by the caller
+        self.availability_version: Optional[int] = None
+        self.busy_intervals_version: Optional[int] = None
+
+    def get_parameters(self) -> Tuple[int, int, int, str, Tuple[str, ...]]:
+        return self.best_time_algo.get_parameters()
+
+    def get_user_uuids(self) -> List[str]:
+        """
+        Users with availability in the session, sorted
+        """
+        with self.lock:
+            return sorted({block["user_uuid"] for block in self.availability_blocks})
+
+    def get_sleep_key(self) -> Tuple[Tuple[str, int, int], ...]:
+        """
+        (user uuid, sleep start, sleep end) of the participants with their own sleep hours, sorted
+        """
+        with self.lock:
+            return tuple(sorted((user_uuid, hours["start"], hours["end"]) for user_uuid, hours in self.best_time_algo.participant_sleep_hours.items()))
+
+    def has_solver_state(self) -> bool:
+        return self._solver_state is not None
+
+    def get_solver_state(self) -> IncrementalSolverState:
+        """
+        Get the solver state, building it on first use
+        """
+        with self.lock:
+            if self._solver_state is None:
+                self._solver_state = IncrementalSolverState(self.best_time_algo, self.availability_blocks)
+            return self._solver_state
+
+    def get_availability_matrix(self) -> AvailabilityMatrix:
+        """
+        Get the availability matrix as submitted (including sleep hours), building it on first use
+        """
+        with self.lock:
+            if self._availability_matrix is None:
+                self._availability_matrix = AvailabilityMatrix.from_availability_blocks(self.availability_blocks, TIME_SLOT_SIZE)
+            return self._availability_matrix
+
+    """
+    Queries
+    """
+    def _get_parallel_blocks(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        Availability blocks to solve with the parallel solver, None to use the solver state
+        """
+        with self.lock:
+            if self.parallel_solver is None or self._solver_state is not None or not self.parallel_solver.should_solve_in_parallel(self.availability_blocks):
+                return None
+            return self.availability_blocks
+
+    def get_best_event_blocks(self) -> List[Dict[str, Any]]:
+        availability_blocks = self._get_parallel_blocks()
+        if availability_blocks is not None:
+            return self.parallel_solver.get_best_event_blocks(self.best_time_algo, availability_blocks)
+        return self.get_solver_state().get_best_event_blocks()
+
+    def get_best_meeting_times(self, k: int = DEFAULT_TOP_K) -> List[Dict[str, Any]]:
+        availability_blocks = self._get_parallel_blocks()
+        if availability_blocks is not None:
+            return self.parallel_solver.get_best_meeting_times(self.best_time_algo, availability_blocks, k)
+        return self.get_solver_state().get_best_meeting_times(k)
+
+    def get_event_participants(self, best_start_time: str, best_end_time: str) -> List[str]:
+        return self.get_solver_state().get_event_participants(best_start_time, best_end_time)
+
+    def get_covering_sessions(self, k: int = DEFAULT_SESSION_COUNT) -> List[Dict[str, Any]]:
+        return self.get_solver_state().get_covering_sessions(k)
+
+    def get_best_weekly_times(self, k: int = DEFAULT_TOP_K) -> List[Dict[str, Any]]:
+        return self.best_time_algo.get_best_weekly_times(self.availability_blocks, k)
+
+    def get_heatmap(self, include_bitmaps: bool = False) -> Dict[str, Any]:
+        """
+        Get the start time and number of participants of every slot
+        With include_bitmaps, also the participants and a hex bitmap of the participants available at
+        every slot (bit i is participants[i])
+        """
+        with self.lock:
+            matrix = self.get_availability_matrix()
+            heatmap = {
+                "slot_size": matrix.slot_size,
+                "start_times": [matrix.format_slot(index) for index in range(matrix.get_slot_count())],
+                "counts": [mask.bit_count() for mask in matrix.slot_masks],
+            }
+            if include_bitmaps:
+                heatmap["participants"] = list(matrix.participants)
+                heatmap["bitmaps"] = [format(mask, "x") for mask in matrix.slot_masks]
+            return heatmap
+
+    """
+    Updates
+    """
+    def replace_user_slots(self, user_uuid: str, availability_blocks: List[Dict[str, Any]]):
+        """
+        Replace the availability of a user with the given blocks
+        """
+        availability_blocks = [{**block, "user_uuid": user_uuid} for block in availability_blocks]
+        with self.lock:
+            self.availability_blocks = [block for block in self.availability_blocks if block["user_uuid"] != user_uuid] + availability_blocks
+            self._availability_matrix = None
+            if self._solver_state is not None:
+                self._solver_state.replace_user_slots(user_uuid, availability_blocks)
+
+    def sync(self, availability_blocks: List[Dict[str, Any]]) -> Set[str]:
+        """
+        Bring the session in line with freshly fetched availability blocks of the event
+        Returns the uuids of the users that changed
+        """
+        with self.lock:
+            if self._solver_state is not None:
+                changed_users = self._solver_state.sync(availability_blocks)
+            else:
+                old_start_times = _group_start_times(self.availability_blocks)
+                new_start_times = _group_start_times(availability_blocks)
+                changed_users = {
+                    user_uuid for user_uuid in set(old_start_times) | set(new_start_times)
+                    if old_start_times.get(user_uuid) != new_start_times.get(user_uuid)
+                }
+            if changed_users:
+                self.availability_blocks = list(availability_blocks)
+                self._availability_matrix = None
+            return changed_users
+
+    def update_sleep_hours(self, participant_sleep_hours: Dict[str, Dict[str, int]]) -> Set[str]:
+        """
+        Replace the sleep hours of the participants
+        Returns the uuids of the users whose sleep hours changed the solver state
+        """
+        with self.lock:
+            if self._solver_state is not None:
+                return self._solver_state.update_sleep_hours(participant_sleep_hours)
+            algo = self.best_time_algo
+            algo.participant_sleep_hours = participant_sleep_hours
+            algo.sleep_masks = SleepMasks(algo.sleep_hours, participant_sleep_hours, algo.timezone, TIME_SLOT_SIZE)
+            return set()
+
+
+def _group_start_times(availability_blocks: List[Dict[str, Any]]) -> Dict[str, Set[Tuple[str, int]]]:
+    """
+    Raw (start time, weight) of every user
+    """
+    start_times: Dict[str, Set[Tuple[str, int]]] = {}
+    for block in availability_blocks:
+        start_times.setdefault(block["user_uuid"], set()).add((block["start_time"], get_block_weight(block)))
+    return start_times
@@ -0,0 +1,60 @@
+import unittest
+from best_time_algo.best_time_algo import BestTimeAlgo
+from best_time_algo.scheduling_session import SchedulingSession
+from best_time_algo.parallel_solver import ParallelSolver
+from best_time_algo.testing import make_blocks
+from best_time_algo.testing import generate_availability_blocks
+
+class SchedulingSessionTest(unittest.TestCase):
+    def test_queries(self):
+        availability_blocks = make_blocks("1", [0, 1, 2]) + make_blocks("2", [0, 1, 2]) + make_blocks("3", [1, 2, 3])
+        best_time_algo = BestTimeAlgo(min_block_size=2, max_block_size=4)
+        session = SchedulingSession(best_time_algo, availability_blocks)
+        # indexes are only built when a query needs them
+        self.assertFalse(session.has_solver_state())
+        heatmap = session.get_heatmap()
+        self.assertEqual(heatmap["counts"], [2, 3, 3, 1])
+        self.assertEqual(heatmap["start_times"][0], availability_blocks[0]["start_time"])
+        self.assertNotIn("bitmaps", heatmap)
+        self.assertEqual(session.get_heatmap(include_bitmaps=True)["bitmaps"], ["3", "7", "7", "4"])
+        self.assertFalse(session.has_solver_state())
+
+        self.assertEqual(session.get_best_event_blocks(), best_time_algo._process_availability_blocks(availability_blocks))
+        self.assertEqual(session.get_best_meeting_times(3), best_time_algo.get_best_meeting_times(availability_blocks, 3))
+        start_time, end_time = availability_blocks[0]["start_time"], availability_blocks[1]["start_time"]
+        self.assertEqual(session.get_event_participants(start_time, end_time), ["1", "2", "3"])
+
+    def test_updates(self):
+        availability_blocks = make_blocks("1", [0, 1, 2]) + make_blocks("2", [0, 1, 2])
+        best_time_algo = BestTimeAlgo(min_block_size=2, max_block_size=4)
+        for build_state in [False, True]:
+            session = SchedulingSession(best_time_algo, availability_blocks)
+            if build_state:
+                session.get_best_event_blocks()
+            self.assertEqual(session.sync(availability_blocks), set())
+
+            updated_blocks = make_blocks("1", [0, 1, 2]) + make_blocks("2", [1, 2, 3])
+            self.assertEqual(session.sync(updated_blocks), {"2"})
+            self.assertEqual(session.get_heatmap()["counts"], [1, 2, 2, 1])
+            self.assertEqual(session.get_best_event_blocks(), best_time_algo._process_availability_blocks(updated_blocks))
+
+            session.replace_user_slots("3", make_blocks("3", [3]))
+            updated_blocks += make_blocks("3", [3])
+            self.assertEqual(session.get_heatmap()["counts"], [1, 2, 2, 2])
+            self.assertEqual(session.get_best_meeting_times(5), best_time_algo.get_best_meeting_times(updated_blocks, 5))
+
+    def test_parallel_solver(self):
+        availability_blocks = generate_availability_blocks(1, 10, 4 * 48, 0.6)
+        best_time_algo = BestTimeAlgo(min_participants=3, min_block_size=2, max_block_size=4)
+        parallel_solver = ParallelSolver(max_workers=2, chunk_days=1, min_blocks=0)
+        try:
+            session = SchedulingSession(best_time_algo, availability_blocks, parallel_solver)
+            # solved in the worker processes without building the solver state
+            self.assertEqual(session.get_best_event_blocks(), best_time_algo._process_availability_blocks(availability_blocks))
+            self.assertEqual(session.get_best_meeting_times(5), best_time_algo.get_best_meeting_times(availability_blocks, 5))
+            self.assertFalse(session.has_solver_state())
+        finally:
+            parallel_solver.shutdown()
+
+if __name__ == "__main__":
+    unittest.main()
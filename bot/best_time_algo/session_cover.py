@@ -0,0 +1,47 @@
+from typing import List, Tuple
+import heapq
+
+"""
+Multi-session coverage scheduling
+
+An event run as several identical sessions needs k windows that do not overlap and that together
+cover as many distinct participants as possible. This is a maximum coverage problem, solved greedily
+on the participant bitsets of the windows: every round picks the window adding the most participants
+not covered yet (then the best score, then the earliest start).
+
+The gain of a window only shrinks as participants get covered, so gains are evaluated lazily: windows
+sit in a heap keyed by their last computed gain, and a popped window whose gain is out of date is
+re-evaluated and pushed back. A window whose gain is up to date beats every other window in the heap,
+whose real gains are at most their keys, so only a few gains are recomputed per round instead of all.
+"""
+
+def select_sessions(windows: List[Tuple[float, int, int, int]], slot_minutes: List[int], slot_size: int, k: int) -> List[Tuple[float, int, int, int, int]]:
+    """
+    Select up to k non-overlapping (score, start index, length, participant mask) windows greedily covering the most participants
+    Returns (score, start index, length, participant mask, newly covered mask) in order of selection, stopping early
+    once no window adds a participant
+    """
+    covered = 0
+    selected: List[Tuple[float, int, int, int, int]] = []
+    taken: List[Tuple[int, int]] = []  # (start minute, end minute) of the selected windows
+    # (-gain, -score, start index, length, mask), the gain last computed for the window
+    heap = [(-mask.bit_count(), -score, start, length, mask) for score, start, length, mask in windows]
+    heapq.heapify(heap)
+    while heap and len(selected) < k:
+        negative_gain, negative_score, start, length, mask = heapq.heappop(heap)
+        start_minute = slot_minutes[start]
+        end_minute = start_minute + length * slot_size
+        if any(start_minute < taken_end and taken_start < end_minute for taken_start, taken_end in taken):
+            # overlaps a selected window, and selected windows are never removed
+            continue
+        new_mask = mask & ~covered
+        gain = new_mask.bit_count()
+        if gain == 0:
+            continue
+        if gain < -negative_gain:
+            heapq.heappush(heap, (-gain, negative_score, start, length, mask))
+            continue
+        selected.append((-negative_score, start, length, mask, new_mask))
+        taken.append((start_minute, end_minute))
+        covered |= mask
+    return selected
@@ -0,0 +1,64 @@
+import unittest
+import random
+from best_time_algo.session_cover import select_sessions
+from best_time_algo.best_time_algo import BestTimeAlgo
+from best_time_algo.incremental_solver import IncrementalSolverState
+from best_time_algo.testing import make_blocks
+
+def eager_select(windows, slot_minutes, slot_size, k):
+    """Reference greedy recomputing the gain of every window each round"""
+    covered = 0
+    selected = []
+    for _ in range(k):
+        candidates = [
+            ((mask & ~covered).bit_count(), score, -start, start, length, mask) for score, start, length, mask in windows
+            if all(slot_minutes[start] + length * slot_size <= slot_minutes[s] or slot_minutes[s] + l * slot_size <= slot_minutes[start] for _, s, l, _, _ in selected)
+        ]
+        if not candidates:
+            break
+        gain, score, _, start, length, mask = max(candidates)
+        if gain == 0:
+            break
+        selected.append((score, start, length, mask, mask & ~covered))
+        covered |= mask
+    return selected
+
+class SessionCoverTest(unittest.TestCase):
+    def test_disjoint_groups(self):
+        # users 1-3 are only available in the morning, users 4-5 only in the afternoon
+        availability_blocks = (
+            make_blocks("1", [0, 1]) + make_blocks("2", [0, 1]) + make_blocks("3", [0, 1])
+            + make_blocks("4", [10, 11]) + make_blocks("5", [10, 11])
+        )
+        best_time_algo = BestTimeAlgo(min_participants=2, min_block_size=2, max_block_size=2)
+        sessions = best_time_algo.get_covering_sessions(availability_blocks, 2)
+        self.assertEqual([session["participants"] for session in sessions], [["1", "2", "3"], ["4", "5"]])
+        self.assertEqual([session["new_participants"] for session in sessions], [["1", "2", "3"], ["4", "5"]])
+        # no third session adds a participant
+        self.assertEqual(len(best_time_algo.get_covering_sessions(availability_blocks, 3)), 2)
+
+    def test_no_overlap(self):
+        # 0-30 and 30-60 minutes cover disjoint groups, the window 0-60 overlaps both
+        windows = [(3.0, 0, 2, 0b111), (1.0, 0, 1, 0b011), (1.0, 1, 1, 0b11100)]
+        self.assertEqual(select_sessions(windows, [0, 30], 30, 2), [(3.0, 0, 2, 0b111, 0b111)])
+        self.assertEqual(select_sessions(windows[1:], [0, 30], 30, 2), [(1.0, 1, 1, 0b11100, 0b11100), (1.0, 0, 1, 0b011, 0b011)])
+
+    def test_matches_eager_greedy(self):
+        for seed in range(20):
+            rng = random.Random(seed)
+            slot_minutes = list(range(0, 30 * 40, 30))
+            # a window per start, as the solver reports
+            windows = [(rng.choice([1.0, 2.0, 3.0]), start, rng.randint(1, 4), rng.getrandbits(12)) for start in range(36)]
+            for k in [1, 3, 6]:
+                self.assertEqual(select_sessions(windows, slot_minutes, 30, k), eager_select(windows, slot_minutes, 30, k))
+
+    def test_state_matches_algo(self):
+        rng = random.Random(1)
+        availability_blocks = [block for user in range(10) for block in make_blocks(f"user-{user:02d}", sorted(rng.sample(range(24), 8)))]
+        best_time_algo = BestTimeAlgo(min_participants=2, min_block_size=2, max_block_size=4)
+        state = IncrementalSolverState(best_time_algo, availability_blocks)
+        for k in [1, 2, 4]:
+            self.assertEqual(state.get_covering_sessions(k), best_time_algo.get_covering_sessions(availability_blocks, k))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Optional, Any
+import pytz
+
+# Import from utils
+from utils.date_utils import parse_time
+
+# Import from best time algo
+from best_time_algo.availability_matrix import AvailabilityMatrix
+
+"""
+Sleep hours compiled into slot masks
+
+The sleep window of a participant (HHMM start and end in the event timezone, wrapping past midnight)
+is compiled once into a bitmask over the slots of a day. Every slot of the event is mapped once to
+its slot of the day in the event timezone, so masking the availability matrix is a single AND NOT
+per slot with the participants asleep at that slot of the day, instead of a check per event block.
+"""
+
+MINUTES_PER_DAY = 24 * 60
+SLOT_OF_DAY_CACHE_SIZE = 1 << 16
+
+
+def parse_sleep_time(value: Any) -> Optional[int]:
+    """
+    Parse a sleep time to an integer (HHMM)
+    Accepts HHMM integers, HHMM strings as entered in /sleep and TIMETZ strings from the database
+    """
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    value = str(value).strip()
+    if ":" in value:
+        return parse_time(value)
+    if value.isdigit():
+        return int(value)
+    return None
+
+
+def get_sleep_hours(user: Dict[str, Any]) -> Optional[Dict[str, int]]:
+    """
+    Get the sleep hours of a user row, None if the user has not set them
+    """
+    start = parse_sleep_time(user.get("sleep_start", user.get("sleep_start_time")))
+    end = parse_sleep_time(user.get("sleep_end", user.get("sleep_end_time")))
+    if start is None or end is None:
+        return None
+    return {"start": start, "end": end}
+
+
+@lru_cache(maxsize=1024)
+def compile_sleep_slots(sleep_start: int, sleep_end: int, slot_size: int) -> int:
+    """
+    Compile a sleep window (HHMM) to a bitmask over the slots of a day that overlap it
+    """
+    start = (sleep_start // 100) * 60 + sleep_start % 100
+    end = (sleep_end // 100) * 60 + sleep_end % 100
+    if start == end:
+        return 0
+    mask = 0
+    for slot_of_day in range(MINUTES_PER_DAY // slot_size):
+        slot_start = slot_of_day * slot_size
+        slot_end = slot_start + slot_size
+        if start < end:
+            overlaps = slot_start < end and slot_end > start
+        else:
+            overlaps = slot_end > start or slot_start < end
+        if overlaps:
+            mask |= 1 << slot_of_day
+    return mask
+
+
+@lru_cache(maxsize=SLOT_OF_DAY_CACHE_SIZE)
+def get_slot_of_day(minute: int, timezone_name: str, slot_size: int) -> int:
+    """
+    Get the slot of the day of an epoch minute in the given timezone
+    """
+    local = datetime.fromtimestamp(minute * 60, pytz.timezone(timezone_name))
+    return (local.hour * 60 + local.minute) // slot_size
+
+
+class SleepMasks:
+    """
+    Sleep slots of every participant of an event, with a fallback for participants without sleep hours
+    """
+    def __init__(self, default_sleep_hours: Optional[Dict[str, int]], participant_sleep_hours: Dict[str, Dict[str, int]], timezone_name: str, slot_size: int):
+        self.timezone_name = timezone_name
+        self.slot_size = slot_size
+        self.default_sleep_slots = self._compile(default_sleep_hours)
+        self.participant_sleep_slots = {user_uuid: self._compile(sleep_hours) for user_uuid, sleep_hours in participant_sleep_hours.items()}
+
+    def _compile(self, sleep_hours: Optional[Dict[str, int]]) -> int:
+        if not sleep_hours:
+            return 0
+        return compile_sleep_slots(sleep_hours["start"], sleep_hours["end"], self.slot_size)
+
+    def get_sleep_slots(self, user_uuid: str) -> int:
+        """
+        Bitmask over the slots of the day that the participant is asleep
+        """
+        return self.participant_sleep_slots.get(user_uuid, self.default_sleep_slots)
+
+    def is_asleep(self, user_uuid: str, minute: int) -> bool:
+        """
+        Check if the participant is asleep at the slot starting at the epoch minute
+        """
+        return bool(self.get_sleep_slots(user_uuid) >> get_slot_of_day(minute, self.timezone_name, self.slot_size) & 1)
+
+    def apply(self, matrix: AvailabilityMatrix):
+        """
+        Clear the bits of participants in every slot they are asleep
+        """
+        # participants with the same sleep slots share one mask
+        groups: Dict[int, int] = {}
+        for user_uuid, bit in matrix.participant_bits.items():
+            sleep_slots = self.get_sleep_slots(user_uuid)
+            if sleep_slots:
+                groups[sleep_slots] = groups.get(sleep_slots, 0) | 1 << bit
+        if not groups:
+            return
+
+        asleep_by_slot_of_day = [0] * (MINUTES_PER_DAY // self.slot_size)
+        for slot_of_day in range(len(asleep_by_slot_of_day)):
+            for sleep_slots, participants in groups.items():
+                if sleep_slots >> slot_of_day & 1:
+                    asleep_by_slot_of_day[slot_of_day] |= participants
+
+        for index, minute in enumerate(matrix.slot_minutes):
+            asleep = asleep_by_slot_of_day[get_slot_of_day(minute, self.timezone_name, self.slot_size)]
+            if asleep:
+                matrix.slot_masks[index] &= ~asleep
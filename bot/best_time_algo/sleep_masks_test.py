@@ -0,0 +1,79 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from best_time_algo.availability_matrix import AvailabilityMatrix, to_epoch_minute
+from best_time_algo.sleep_masks import SleepMasks, compile_sleep_slots, get_slot_of_day, get_sleep_hours, parse_sleep_time
+from best_time_algo.best_time_algo import BestTimeAlgo, MAP_BACKEND
+from best_time_algo.incremental_solver import IncrementalSolverState
+
+SGT = timezone(timedelta(hours=8))
+
+def make_blocks(user_uuid: str, start: datetime, slots: int):
+    blocks = []
+    for slot in range(slots):
+        slot_start = start + timedelta(minutes=30 * slot)
+        blocks.append({
+            "start_time": slot_start.isoformat(),
+            "end_time": (slot_start + timedelta(minutes=30)).isoformat(),
+            "event_id": "1",
+            "user_uuid": user_uuid
+        })
+    return blocks
+
+class SleepMasksTest(unittest.TestCase):
+    def test_parse_sleep_time(self):
+        self.assertEqual(parse_sleep_time("2300"), 2300)
+        self.assertEqual(parse_sleep_time("0700"), 700)
+        self.assertEqual(parse_sleep_time(2330), 2330)
+        self.assertEqual(parse_sleep_time("23:30:00+08:00"), 2330)
+        self.assertIsNone(parse_sleep_time(None))
+        self.assertEqual(get_sleep_hours({"sleep_start_time": "01:00:00+08", "sleep_end_time": "09:00:00+08"}), {"start": 100, "end": 900})
+        self.assertEqual(get_sleep_hours({"sleep_start": "2300", "sleep_end": "0600"}), {"start": 2300, "end": 600})
+        self.assertIsNone(get_sleep_hours({"sleep_start": None}))
+
+    def test_compile_sleep_slots(self):
+        # 23:00 - 07:00 covers slots 46, 47 and 0 - 13
+        sleep_slots = compile_sleep_slots(2300, 700, 30)
+        self.assertEqual([slot for slot in range(48) if sleep_slots >> slot & 1], [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 46, 47])
+        # slots partially overlapping the window count as asleep
+        self.assertEqual(compile_sleep_slots(115, 145, 30), 0b1100)
+        self.assertEqual(compile_sleep_slots(1200, 1200, 30), 0)
+
+    def test_get_slot_of_day(self):
+        minute = to_epoch_minute(datetime(2025, 1, 1, 23, 30, tzinfo=SGT))
+        self.assertEqual(get_slot_of_day(minute, "Asia/Singapore", 30), 47)
+        self.assertEqual(get_slot_of_day(minute, "UTC", 30), 31)
+
+    def test_apply(self):
+        availability_blocks = make_blocks("1", datetime(2025, 1, 1, 22, 0, tzinfo=SGT), 4) + make_blocks("2", datetime(2025, 1, 1, 22, 0, tzinfo=SGT), 4)
+        matrix = AvailabilityMatrix.from_availability_blocks(availability_blocks)
+        SleepMasks({"start": 2300, "end": 700}, {"2": {"start": 100, "end": 900}}, "Asia/Singapore", 30).apply(matrix)
+        # 22:00, 22:30 both awake, 23:00 and 23:30 only user 2 is awake
+        self.assertEqual(matrix.slot_masks, [0b11, 0b11, 0b10, 0b10])
+
+    def test_best_time_algo(self):
+        availability_blocks = make_blocks("1", datetime(2025, 1, 1, 21, 0, tzinfo=SGT), 6) + make_blocks("2", datetime(2025, 1, 1, 21, 0, tzinfo=SGT), 6)
+        scheduler = BestTimeAlgo(min_block_size=2, max_block_size=6)
+        best = scheduler._process_availability_blocks(availability_blocks)
+        self.assertEqual([(block["start_time"], block["end_time"]) for block in best], [("2025-01-01T21:00:00+08:00", "2025-01-01T23:00:00+08:00")])
+        self.assertEqual(BestTimeAlgo(min_block_size=2, max_block_size=6, backend=MAP_BACKEND)._process_availability_blocks(availability_blocks), best)
+
+        night_owls = {"1": {"start": 300, "end": 1100}, "2": {"start": 300, "end": 1100}}
+        scheduler = BestTimeAlgo(min_block_size=2, max_block_size=6, participant_sleep_hours=night_owls)
+        best = scheduler._process_availability_blocks(availability_blocks)
+        self.assertEqual([(block["start_time"], block["end_time"]) for block in best], [("2025-01-01T21:00:00+08:00", "2025-01-02T00:00:00+08:00")])
+
+        no_sleep = BestTimeAlgo(sleep_hours=None, min_block_size=2, max_block_size=6)
+        self.assertEqual(no_sleep._is_within_sleep_hours({"start_time": "2025-01-01T23:00:00+08:00", "end_time": "2025-01-02T00:00:00+08:00", "participants": ["1"]}), True)
+        self.assertEqual(BestTimeAlgo()._is_within_sleep_hours({"start_time": "2025-01-01T22:30:00+08:00", "end_time": "2025-01-01T23:30:00+08:00", "participants": ["1"]}), False)
+
+    def test_incremental_sleep_hours(self):
+        availability_blocks = make_blocks("1", datetime(2025, 1, 1, 21, 0, tzinfo=SGT), 6) + make_blocks("2", datetime(2025, 1, 1, 21, 0, tzinfo=SGT), 6)
+        state = IncrementalSolverState(BestTimeAlgo(min_block_size=2, max_block_size=6), availability_blocks)
+        night_owls = {"1": {"start": 300, "end": 1100}, "2": {"start": 300, "end": 1100}}
+        self.assertEqual(state.update_sleep_hours(night_owls), {"1", "2"})
+        expected = BestTimeAlgo(min_block_size=2, max_block_size=6, participant_sleep_hours=night_owls)._process_availability_blocks(availability_blocks)
+        self.assertEqual(state.get_best_event_blocks(), expected)
+        self.assertEqual(state.update_sleep_hours(dict(night_owls)), set())
+
+if __name__ == "__main__":
+    unittest.main()
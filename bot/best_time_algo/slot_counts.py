@@ -0,0 +1,82 @@
+from typing import List, Dict, Optional
+
+# Import from best time algo
+from best_time_algo.availability_matrix import AvailabilityMatrix
+
+"""
+Per-slot participant counts and their first differences
+
+The number of participants available at every slot is computed once, together with the difference
+to the next contiguous slot. A jump is a difference larger than the sensitivity threshold. Window
+enumeration stops extending a window at a jump, and a prefix count of jumps answers whether any
+window contains a jump in O(1), without rescanning the window's slots.
+"""
+
+class SlotCounts:
+    """
+    Participant counts of every slot with the jumps between contiguous slots
+    """
+    def __init__(self, slot_minutes: List[int], counts: List[int], slot_size: int, sensitivity_threshold: Optional[int]):
+        self.slot_minutes = slot_minutes
+        self.slot_index: Dict[int, int] = {minute: index for index, minute in enumerate(slot_minutes)}
+        self.counts = counts
+        self.slot_size = slot_size
+        self.sensitivity_threshold = sensitivity_threshold
+        # computed for all slots at once here, _update_delta keeps them up to date after a count changes
+        next_indices = [self.slot_index.get(minute + slot_size) for minute in slot_minutes]
+        self.deltas: List[int] = [0 if next_index is None else counts[next_index] - count for next_index, count in zip(next_indices, counts)]  # count of the next contiguous slot - count of the slot
+        self.jumps: List[bool] = [sensitivity_threshold is not None and abs(delta) > sensitivity_threshold for delta in self.deltas]  # the change to the next contiguous slot exceeds the threshold
+        self._jump_prefix: Optional[List[int]] = None
+
+    @classmethod
+    def from_matrix(cls, matrix: AvailabilityMatrix, sensitivity_threshold: Optional[int]) -> 'SlotCounts':
+        return cls(list(matrix.slot_minutes), [mask.bit_count() for mask in matrix.slot_masks], matrix.slot_size, sensitivity_threshold)
+
+    def _update_delta(self, index: int):
+        next_index = self.slot_index.get(self.slot_minutes[index] + self.slot_size)
+        if next_index is None:
+            self.deltas[index] = 0
+            self.jumps[index] = False
+            return
+        self.deltas[index] = self.counts[next_index] - self.counts[index]
+        self.jumps[index] = self.sensitivity_threshold is not None and abs(self.deltas[index]) > self.sensitivity_threshold
+
+    def update_count(self, index: int, count: int):
+        """
+        Set the count of a slot, updating its delta and the delta of the slot before it
+        """
+        self.counts[index] = count
+        self._update_delta(index)
+        previous_index = self.slot_index.get(self.slot_minutes[index] - self.slot_size)
+        if previous_index is not None:
+            self._update_delta(previous_index)
+        self._jump_prefix = None
+
+    def _get_jump_prefix(self) -> List[int]:
+        if self._jump_prefix is None:
+            jump_prefix = [0] * (len(self.jumps) + 1)
+            for index, jump in enumerate(self.jumps):
+                jump_prefix[index + 1] = jump_prefix[index] + jump
+            self._jump_prefix = jump_prefix
+        return self._jump_prefix
+
+    def is_within_threshold(self, start_minute: int, end_minute: int) -> bool:
+        """
+        Check that no two contiguous slots in [start_minute, end_minute) differ by more than the threshold
+        """
+        if self.sensitivity_threshold is None:
+            return True
+        start = self.slot_index.get(start_minute)
+        last = self.slot_index.get(end_minute - self.slot_size)
+        if start is None or last is None:
+            return True
+        if last - start == (end_minute - start_minute) // self.slot_size - 1:
+            # the window covers a contiguous range of slot indices, count the jumps inside it
+            jump_prefix = self._get_jump_prefix()
+            return jump_prefix[last] - jump_prefix[start] == 0
+        # slots off the grid of the window sit between its slots, scan the window itself
+        for minute in range(start_minute, end_minute - self.slot_size, self.slot_size):
+            index = self.slot_index.get(minute)
+            if index is not None and self.jumps[index]:
+                return False
+        return True
@@ -0,0 +1,46 @@
+import unittest
+from best_time_algo.availability_matrix import AvailabilityMatrix
+from best_time_algo.slot_counts import SlotCounts
+from best_time_algo.vectorized_windows import find_windows
+from best_time_algo.testing import generate_availability_blocks
+from best_time_algo.best_time_algo import BestTimeAlgo, MAP_BACKEND
+
+class SlotCountsTest(unittest.TestCase):
+    def test_jumps(self):
+        # 10:00 - 12:00 with a gap at 11:30
+        slot_counts = SlotCounts([600, 630, 660, 720], [2, 6, 5, 1], 30, 2)
+        self.assertEqual(slot_counts.deltas, [4, -1, 0, 0])
+        self.assertEqual(slot_counts.jumps, [True, False, False, False])
+        self.assertFalse(slot_counts.is_within_threshold(600, 660))
+        self.assertTrue(slot_counts.is_within_threshold(630, 690))
+        self.assertTrue(slot_counts.is_within_threshold(600, 630))
+        self.assertTrue(SlotCounts([600, 630], [2, 6], 30, None).is_within_threshold(600, 660))
+
+    def test_update_count(self):
+        slot_counts = SlotCounts([600, 630, 660], [2, 6, 5], 30, 2)
+        self.assertFalse(slot_counts.is_within_threshold(600, 690))
+        slot_counts.update_count(1, 3)
+        self.assertEqual(slot_counts.deltas, [1, 2, 0])
+        self.assertTrue(slot_counts.is_within_threshold(600, 690))
+        slot_counts.update_count(2, 0)
+        self.assertFalse(slot_counts.is_within_threshold(600, 690))
+
+    def test_windows_stop_at_jumps(self):
+        for seed, users, density in [(1, 8, 0.7), (2, 40, 0.5)]:
+            matrix = AvailabilityMatrix.from_availability_blocks(generate_availability_blocks(seed, users, 96, density))
+            jumps = SlotCounts.from_matrix(matrix, 2).jumps
+            windows = list(matrix.iter_windows(2, 1, 8, jumps))
+            self.assertEqual(find_windows(matrix, 2, 1, 8, jumps), windows)
+            for start, length, mask in windows:
+                self.assertFalse(any(jumps[start:start + length - 1]))
+
+    def test_matches_map_backend(self):
+        availability_blocks = generate_availability_blocks(5, 12, 48, 0.6)
+        bitset_algo = BestTimeAlgo(sleep_hours=None, min_participants=3, min_block_size=2, max_block_size=8, sensitivity_threshold=1)
+        map_algo = BestTimeAlgo(sleep_hours=None, min_participants=3, min_block_size=2, max_block_size=8, sensitivity_threshold=1, backend=MAP_BACKEND)
+        best = bitset_algo._process_availability_blocks(availability_blocks)
+        self.assertEqual(best, map_algo._process_availability_blocks(availability_blocks))
+        self.assertTrue(all(bitset_algo._is_within_sensitivity_threshold(block) for block in best))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+from bisect import bisect_left
+from typing import List, Iterator, Tuple, Callable
+import heapq
+import math
+
+"""
+Coarse-to-fine pyramid of participant counts over the slots of an event
+
+Slots are grouped into days and the days into 2 hour blocks, in local time. Every day and block
+covers a contiguous range of the sorted slots and keeps the largest participant count in it, which
+together with the timing weights of its slots bounds the score of every window starting in it. The search visits
+the days and blocks best bound first, and only splits a day into its blocks, and a block into its
+slots, when its bound can still beat the results found so far. Every other day and block is pruned
+without looking at its slots, so the work per slot is only spent on the surviving regions.
+
+The budgeted search (BestTimeAlgo.get_best_times_within) always goes through the pyramid, the best time
+and top k queries only for slots spanning at least PYRAMID_MIN_MINUTES. Over shorter ranges they score
+every window in vectorized passes, which is faster than visiting windows one by one.
+"""
+
+PYRAMID_BUCKET_MINUTES = [2 * 60, 24 * 60]  # 30 minute slots -> 2 hours -> day (each a multiple of the last)
+PYRAMID_MIN_MINUTES = 28 * 24 * 60  # slots spanning less are searched as a single block, where the pyramid costs more than it prunes
+
+
+class SlotPyramid:
+    """
+    Days and 2 hour blocks of the sorted slots, each with the largest participant count in it
+    """
+    def __init__(self, slot_minutes: List[int], counts: List[int], offset: int, bucket_minutes: List[int] = PYRAMID_BUCKET_MINUTES, min_minutes: int = PYRAMID_MIN_MINUTES):
+        self.slot_minutes = slot_minutes  # sorted epoch minutes of the slots
+        self.counts = counts
+        self.offset = offset  # minutes added to the epoch minutes for the local time of the buckets
+        self.bucket_minutes = bucket_minutes if slot_minutes and slot_minutes[-1] - slot_minutes[0] >= min_minutes else []
+        self.refined = 0  # buckets split by the last search
+        # (local start minute, first slot index, end slot index, largest count) of every top level bucket
+        self.buckets: List[Tuple[int, int, int, int]] = self._split(0, len(slot_minutes), self.bucket_minutes[-1]) if self.bucket_minutes else []
+
+    def _split(self, low: int, high: int, size: int) -> List[Tuple[int, int, int, int]]:
+        """
+        Split the slots from low to high into buckets of size minutes of local time
+        """
+        buckets = []
+        while low < high:
+            start_minute = (self.slot_minutes[low] + self.offset) // size * size
+            end = bisect_left(self.slot_minutes, start_minute + size - self.offset, low, high)
+            buckets.append((start_minute, low, end, max(self.counts[low:end])))
+            low = end
+        return buckets
+
+    def iter_slots(self, bound: Callable[[int, int, int], float], slot_bound: Callable[[int], float], min_count: int) -> Iterator[Tuple[float, List[Tuple[float, int]]]]:
+        """
+        Yield (bound, [(-bound, slot index), ...]) for the 2 hour blocks, best bound first, with their
+        slots of at least min_count participants best bound first (then in order of index)
+        bound(first slot index, end slot index, count) bounds the score of the windows starting at the
+        slots from the first to the end with at most count participants, slot_bound(index) that of a slot.
+        Buckets are split lazily, so stopping the iteration early skips every bucket not reached yet.
+        Slots spanning less than the minimum are yielded as a single block without a bound.
+        """
+        self.refined = 0
+        if not self.bucket_minutes:
+            yield math.inf, sorted((-slot_bound(slot), slot) for slot in range(len(self.counts)) if self.counts[slot] >= min_count)
+            return
+        top = len(self.bucket_minutes) - 1
+        heap = []
+        for _, low, high, count in self.buckets:
+            if count >= min_count:
+                heap.append((-bound(low, high, count), top, low, high))
+        heapq.heapify(heap)
+        while heap:
+            negative_bound, level, low, high = heapq.heappop(heap)
+            self.refined += 1
+            if level == 0:
+                yield -negative_bound, sorted((-slot_bound(slot), slot) for slot in range(low, high) if self.counts[slot] >= min_count)
+                continue
+            size = self.bucket_minutes[level - 1]
+            for _, child_low, child_high, count in self._split(low, high, size):
+                if count >= min_count:
+                    heapq.heappush(heap, (-bound(child_low, child_high, count), level - 1, child_low, child_high))
@@ -0,0 +1,63 @@
+import unittest
+import heapq
+from operator import itemgetter
+from best_time_algo.slot_pyramid import SlotPyramid
+from best_time_algo.testing import generate_availability_blocks
+from best_time_algo.best_time_algo import BestTimeAlgo
+
+DAY = 24 * 60
+
+def score_every_window(scheduler: BestTimeAlgo, availability_blocks, k=None):
+    """
+    The best time (k None) or the top k windows from scoring every window of the matrix
+    """
+    matrix = scheduler._create_availability_matrix(availability_blocks)
+    scored_windows = scheduler._score_matrix_windows(matrix)
+    if k is not None:
+        return [{**scheduler._format_window(matrix, start, length, mask), "score": score} for score, start, length, mask in heapq.nlargest(k, scored_windows, key=itemgetter(0))]
+    best_score = max(score for score, _, _, _ in scored_windows)
+    return [scheduler._format_window(matrix, start, length, mask) for score, start, length, mask in scored_windows if score == best_score]
+
+class SlotPyramidTest(unittest.TestCase):
+    def test_buckets(self):
+        # 23:00 - 00:30 and 09:00 - 10:00 of the next day at +08:00
+        slot_minutes = [900, 930, 960, 1500, 1530]
+        pyramid = SlotPyramid(slot_minutes, [3, 5, 2, 4, 1], 480, min_minutes=0)
+        self.assertEqual(pyramid.buckets, [(0, 0, 2, 5), (DAY, 2, 5, 4)])
+        self.assertEqual(pyramid._split(2, 5, 120), [(DAY, 2, 3, 2), (DAY + 480, 3, 5, 4)])
+
+    def test_iter_slots(self):
+        slot_minutes = [900, 930, 960, 1500, 1530]
+        pyramid = SlotPyramid(slot_minutes, [3, 5, 2, 4, 1], 480, min_minutes=0)
+        # bounded by the count alone, blocks and their slots come best first
+        blocks = list(pyramid.iter_slots(lambda low, high, count: count, lambda slot: pyramid.counts[slot], 2))
+        self.assertEqual(blocks, [(5, [(-5, 1), (-3, 0)]), (4, [(-4, 3)]), (2, [(-2, 2)])])
+        # a short range is a single block
+        pyramid = SlotPyramid(slot_minutes, [3, 5, 2, 4, 1], 480)
+        blocks = list(pyramid.iter_slots(lambda low, high, count: count, lambda slot: pyramid.counts[slot], 2))
+        self.assertEqual(blocks, [(float("inf"), [(-5, 1), (-4, 3), (-3, 0), (-2, 2)])])
+
+    def test_search_long_range(self):
+        for seed, users, density in [(1, 8, 0.6), (2, 20, 0.4)]:
+            # 35 days, with every user available every 7th day and one other day a week
+            availability_blocks = [
+                block for block in generate_availability_blocks(seed, users, 35 * 48, density)
+                if int(block["start_time"][8:10]) % 7 in (0, int(block["user_uuid"][-3:]) % 7)
+            ]
+            for max_block_size in [2, 6]:
+                scheduler = BestTimeAlgo(min_participants=2, min_block_size=2, max_block_size=max_block_size)
+                best_time = score_every_window(scheduler, availability_blocks)
+                self.assertEqual(scheduler.get_best_times_within(availability_blocks, 60), (best_time, True))
+                # the range is long enough for the unbudgeted queries to search the pyramid too
+                del scheduler.slot_pyramid
+                self.assertEqual(scheduler._process_availability_blocks(availability_blocks), best_time)
+                if max_block_size == 2:
+                    # every window has the maximum length, so most days are pruned without being split into blocks
+                    self.assertLess(scheduler.slot_pyramid.refined, len(scheduler.slot_pyramid.buckets))
+                for k in [1, 5, 50]:
+                    top_windows = score_every_window(scheduler, availability_blocks, k)
+                    self.assertEqual(scheduler.get_best_times_within(availability_blocks, 60, k), (top_windows, True))
+                    self.assertEqual(scheduler.get_best_meeting_times(availability_blocks, k), top_windows)
+
+if __name__ == "__main__":
+    unittest.main()
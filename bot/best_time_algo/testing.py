@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any
+import random
+
+# Import from best time algo
+from best_time_algo.availability_matrix import PREFERRED_WEIGHT
+
+"""
+Availability block generators and a step clock shared by the tests of the best time algo
+"""
+
+BASE = datetime(2025, 1, 1, 9, 0, tzinfo=timezone(timedelta(hours=8)))  # Start of slot 0
+
+
+def make_blocks(user_uuid: str, slots: List[int]) -> List[Dict[str, Any]]:
+    """
+    Availability blocks of a user at the given slots from BASE
+    """
+    blocks = []
+    for slot in slots:
+        start = BASE + timedelta(minutes=30 * slot)
+        blocks.append({
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(minutes=30)).isoformat(),
+            "event_id": "1",
+            "user_uuid": user_uuid
+        })
+    return blocks
+
+
+def generate_availability_blocks(seed: int, users: int, slots: int, density: float) -> List[Dict[str, Any]]:
+    """
+    Availability blocks of users available at each of the slots from BASE with the given probability
+    """
+    rng = random.Random(seed)
+    availability_blocks = []
+    for user in range(users):
+        availability_blocks.extend(make_blocks(f"user-{user:03d}", [slot for slot in range(slots) if rng.random() < density]))
+    return availability_blocks
+
+
+def prefer_availability_blocks(seed: int, availability_blocks: List[Dict[str, Any]], share: float) -> List[Dict[str, Any]]:
+    """
+    Mark a random share of the availability blocks as preferred
+    """
+    rng = random.Random(seed)
+    return [{**block, "weight": PREFERRED_WEIGHT} if rng.random() < share else block for block in availability_blocks]
+
+
+class StepClock:
+    """
+    Clock for Deadline that advances by step seconds every time it is read, so a budget is spent by
+    the number of deadline checks rather than by how fast the machine is
+    """
+    def __init__(self, step: float = 1):
+        self.step = step
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        now = self.now
+        self.now += self.step
+        return now
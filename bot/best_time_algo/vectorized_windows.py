@@ -0,0 +1,145 @@
+from typing import List, Tuple, Optional
+import numpy as np
+
+# Import from best time algo
+from best_time_algo.availability_matrix import AvailabilityMatrix, DEFAULT_WEIGHT
+
+"""
+Vectorized window enumeration over the availability matrix
+
+The bitset matrix is expanded into a participants x slots boolean array on a dense time axis
+(one column per slot_size step, gaps are columns that are not present). The participants common
+to every window of length k + 1 are then the cumulative AND of the array with itself shifted by
+1..k columns, so all windows of every allowed length are computed in max_length vectorized passes
+instead of walking forward from every slot one step at a time.
+"""
+
+def unpack_masks(masks: List[int], participant_count: int) -> np.ndarray:
+    """
+    Unpack participant bitmasks into a masks x participants boolean array
+    """
+    byte_count = max(1, (participant_count + 7) // 8)
+    packed = np.frombuffer(b"".join(mask.to_bytes(byte_count, "little") for mask in masks), dtype=np.uint8)
+    return np.unpackbits(packed.reshape(len(masks), byte_count), axis=1, bitorder="little")[:, :participant_count].astype(bool)
+
+
+def unpack_slot_masks(matrix: AvailabilityMatrix) -> np.ndarray:
+    """
+    Unpack the slot bitmasks of the matrix into a slots x participants boolean array
+    """
+    return unpack_masks(matrix.slot_masks, len(matrix.participants))
+
+
+def pack_participant_masks(array: np.ndarray) -> List[int]:
+    """
+    Pack a rows x participants boolean array into one participant bitmask per row
+    """
+    packed = np.packbits(array, axis=1, bitorder="little")
+    return [int.from_bytes(row.tobytes(), "little") for row in packed]
+
+
+def to_dense_array(matrix: AvailabilityMatrix) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Expand the matrix into a participants x columns boolean array on a dense time axis
+
+    Returns the array, a boolean array of which columns are present in the matrix and an
+    array mapping each column to its slot index (-1 for columns that are not present)
+    """
+    participant_count = len(matrix.participants)
+    slot_count = matrix.get_slot_count()
+    origin = matrix.slot_minutes[0]
+    columns = (np.asarray(matrix.slot_minutes, dtype=np.int64) - origin) // matrix.slot_size
+    column_count = int(columns[-1]) + 1
+    unpacked = unpack_slot_masks(matrix)
+
+    availability = np.zeros((participant_count, column_count), dtype=bool)
+    availability[:, columns] = unpacked.T
+    present = np.zeros(column_count, dtype=bool)
+    present[columns] = True
+    column_slots = np.full(column_count, -1, dtype=np.int64)
+    column_slots[columns] = np.arange(slot_count)
+    return availability, present, column_slots
+
+
+def is_aligned(matrix: AvailabilityMatrix) -> bool:
+    """
+    Check that every slot lies on the slot_size grid of the first slot
+    """
+    origin = matrix.slot_minutes[0]
+    return all((minute - origin) % matrix.slot_size == 0 for minute in matrix.slot_minutes)
+
+
+def find_windows(matrix: AvailabilityMatrix, min_participants: int, min_length: int, max_length: int, jumps: Optional[List[bool]] = None) -> List[Tuple[int, int, int]]:
+    """
+    Return (start index, length in slots, participant mask) for every window
+
+    Produces the same windows as AvailabilityMatrix.iter_windows. Matrices whose slots are not
+    on a common grid cannot be laid out on a dense time axis and use iter_windows directly.
+    """
+    if matrix.get_slot_count() == 0 or not matrix.participants:
+        return []
+    if not is_aligned(matrix):
+        return list(matrix.iter_windows(min_participants, min_length, max_length, jumps))
+
+    availability, present, column_slots = to_dense_array(matrix)
+    column_count = availability.shape[1]
+
+    # a window cannot extend from a column whose count jumps to the next column
+    continues = np.ones(column_count, dtype=bool)
+    if jumps is not None:
+        slot_columns = np.nonzero(present)[0]
+        continues[slot_columns] = ~np.asarray(jumps, dtype=bool)
+
+    # a window can only start at a present slot with enough participants
+    extending = present & (availability.sum(axis=0) >= min_participants)
+    starts = extending.copy()
+    lengths = starts.astype(np.int64)
+    intersections = availability.copy()
+
+    # intersection[:, s] after pass k is the AND of columns s..s+k
+    intersection = availability
+    for k in range(1, max_length):
+        if column_count - k <= 0 or not extending[:column_count - k].any():
+            break
+        intersection = intersection[:, :column_count - k] & availability[:, k:]
+        extended = extending[:column_count - k] & continues[k - 1:column_count - 1] & present[k:] & (intersection.sum(axis=0) >= min_participants)
+        extended_columns = np.nonzero(extended)[0]
+        lengths[extended_columns] = k + 1
+        intersections[:, extended_columns] = intersection[:, extended_columns]
+        extending = np.zeros(column_count, dtype=bool)
+        extending[extended_columns] = True
+
+    windows = []
+    window_columns = np.nonzero(starts & (lengths >= min_length))[0]
+    if len(window_columns) == 0:
+        return windows
+    packed = np.packbits(intersections[:, window_columns], axis=0, bitorder="little")
+    for i, column in enumerate(window_columns):
+        mask = int.from_bytes(packed[:, i].tobytes(), "little")
+        windows.append((int(column_slots[column]), int(lengths[column]), mask))
+    return windows
+
+
+def weighted_window_counts(matrix: AvailabilityMatrix, windows: List[Tuple[int, int, int]]) -> List[int]:
+    """
+    Sum of the weights of the participants of every (start index, length, participant mask) window over its slots
+
+    Equal to AvailabilityMatrix.get_weighted_count for every window. The extra weight of the participants
+    of all windows at their k-th slot is added in one vectorized pass for every k up to the longest window.
+    """
+    counts = [mask.bit_count() * length for start, length, mask in windows]
+    weight_masks = [(weight, masks) for weight, masks in matrix.weight_masks.items() if any(masks)]
+    if not windows or not weight_masks:
+        return counts
+    participant_count = len(matrix.participants)
+    starts = np.array([window[0] for window in windows], dtype=np.int64)
+    lengths = np.array([window[1] for window in windows], dtype=np.int64)
+    window_participants = unpack_masks([window[2] for window in windows], participant_count)
+    extra = np.zeros(len(windows), dtype=np.int64)
+    for weight, masks in weight_masks:
+        weighted = unpack_masks(masks, participant_count)
+        for k in range(int(lengths.max())):
+            within = lengths > k
+            slots = np.minimum(starts + k, len(masks) - 1)
+            extra += (weight - DEFAULT_WEIGHT) * np.where(within, (window_participants & weighted[slots]).sum(axis=1), 0)
+    return [count + int(extra_count) for count, extra_count in zip(counts, extra)]
@@ -0,0 +1,59 @@
+import unittest
+from best_time_algo.availability_matrix import AvailabilityMatrix
+from best_time_algo.vectorized_windows import find_windows, is_aligned, weighted_window_counts
+from best_time_algo.best_time_algo import BestTimeAlgo, BITSET_BACKEND, NUMPY_BACKEND
+from best_time_algo.testing import generate_availability_blocks, prefer_availability_blocks
+
+class VectorizedWindowsTest(unittest.TestCase):
+    def test_find_windows(self):
+        availability_blocks = [
+            {"start_time": "2025-01-01T10:00:00+08:00", "end_time": "2025-01-01T10:30:00+08:00", "event_id": "1", "user_uuid": "1"},
+            {"start_time": "2025-01-01T10:00:00+08:00", "end_time": "2025-01-01T10:30:00+08:00", "event_id": "1", "user_uuid": "2"},
+            {"start_time": "2025-01-01T10:30:00+08:00", "end_time": "2025-01-01T11:00:00+08:00", "event_id": "1", "user_uuid": "1"},
+            {"start_time": "2025-01-01T10:30:00+08:00", "end_time": "2025-01-01T11:00:00+08:00", "event_id": "1", "user_uuid": "2"},
+            {"start_time": "2025-01-01T11:30:00+08:00", "end_time": "2025-01-01T12:00:00+08:00", "event_id": "1", "user_uuid": "1"},
+            {"start_time": "2025-01-01T11:30:00+08:00", "end_time": "2025-01-01T12:00:00+08:00", "event_id": "1", "user_uuid": "2"},
+        ]
+        matrix = AvailabilityMatrix.from_availability_blocks(availability_blocks)
+        self.assertEqual(find_windows(matrix, 2, 2, 4), [(0, 2, 0b11)])
+        self.assertEqual(find_windows(matrix, 2, 1, 4), [(0, 2, 0b11), (1, 1, 0b11), (2, 1, 0b11)])
+        self.assertEqual(find_windows(AvailabilityMatrix(), 2, 2, 4), [])
+
+    def test_matches_iter_windows(self):
+        for seed, users, density in [(1, 5, 0.7), (2, 40, 0.5), (3, 150, 0.8)]:
+            matrix = AvailabilityMatrix.from_availability_blocks(generate_availability_blocks(seed, users, 96, density))
+            for min_participants, min_length, max_length in [(2, 2, 4), (3, 1, 16), (users // 2, 2, 8)]:
+                self.assertEqual(
+                    find_windows(matrix, min_participants, min_length, max_length),
+                    list(matrix.iter_windows(min_participants, min_length, max_length))
+                )
+
+    def test_unaligned_slots(self):
+        availability_blocks = [
+            {"start_time": "2025-01-01T10:00:00+08:00", "end_time": "2025-01-01T10:30:00+08:00", "event_id": "1", "user_uuid": "1"},
+            {"start_time": "2025-01-01T10:15:00+08:00", "end_time": "2025-01-01T10:45:00+08:00", "event_id": "1", "user_uuid": "1"},
+            {"start_time": "2025-01-01T10:30:00+08:00", "end_time": "2025-01-01T11:00:00+08:00", "event_id": "1", "user_uuid": "1"},
+        ]
+        matrix = AvailabilityMatrix.from_availability_blocks(availability_blocks)
+        self.assertFalse(is_aligned(matrix))
+        self.assertEqual(find_windows(matrix, 1, 2, 4), list(matrix.iter_windows(1, 2, 4)))
+
+    def test_weighted_window_counts(self):
+        for seed, users, density in [(1, 5, 0.7), (2, 40, 0.5)]:
+            availability_blocks = generate_availability_blocks(seed, users, 96, density)
+            matrix = AvailabilityMatrix.from_availability_blocks(availability_blocks)
+            windows = find_windows(matrix, 2, 1, 8)
+            # without weights every participant counts once per slot
+            self.assertEqual(weighted_window_counts(matrix, windows), [mask.bit_count() * length for start, length, mask in windows])
+            matrix = AvailabilityMatrix.from_availability_blocks(prefer_availability_blocks(seed, availability_blocks, 0.3))
+            self.assertEqual(weighted_window_counts(matrix, windows), [matrix.get_weighted_count(start, length, mask) for start, length, mask in windows])
+        self.assertEqual(weighted_window_counts(matrix, []), [])
+
+    def test_numpy_backend(self):
+        availability_blocks = generate_availability_blocks(4, 30, 200, 0.6)
+        bitset_algo = BestTimeAlgo(min_participants=5, min_block_size=2, max_block_size=16, backend=BITSET_BACKEND)
+        numpy_algo = BestTimeAlgo(min_participants=5, min_block_size=2, max_block_size=16, backend=NUMPY_BACKEND)
+        self.assertEqual(bitset_algo._process_availability_blocks(availability_blocks), numpy_algo._process_availability_blocks(availability_blocks))
+
+if __name__ == "__main__":
+    unittest.main()
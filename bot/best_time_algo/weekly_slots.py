@@ -0,0 +1,97 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Dict
+import numpy as np
+import pytz
+
+# Import from best time algo
+from best_time_algo.availability_matrix import AvailabilityMatrix
+from best_time_algo.sleep_masks import MINUTES_PER_DAY, SLOT_OF_DAY_CACHE_SIZE
+from best_time_algo.vectorized_windows import unpack_masks, unpack_slot_masks, pack_participant_masks
+
+"""
+Availability folded onto the slots of a week
+
+For recurring events the best time is a slot of the week rather than a date. Every slot of the event
+is mapped to its (weekday, slot of the day) in the event timezone, and the availability matrix is
+folded onto the 7 x slots_per_day slots of a week in one pass that adds up, for every participant,
+the weeks they are available at each slot of the week. A participant is available at a slot of the
+week if they are available at it in every week of the event (every date of its weekday from the first
+to the last date of the event), with a weight other than the default if they have it in every week.
+The fold is a matrix over a single week, starting Monday 00:00, so
+windows are found and scored as for one-off events and never wrap from Sunday to Monday.
+"""
+
+DAYS_PER_WEEK = 7
+
+
+@lru_cache(maxsize=SLOT_OF_DAY_CACHE_SIZE)
+def get_slot_of_week(minute: int, timezone_name: str, slot_size: int) -> int:
+    """
+    Get the slot of the week (from Monday 00:00) of an epoch minute in the given timezone
+    """
+    local = datetime.fromtimestamp(minute * 60, pytz.timezone(timezone_name))
+    return (local.weekday() * MINUTES_PER_DAY + local.hour * 60 + local.minute) // slot_size
+
+
+class WeeklyFold:
+    """
+    Participants available at every slot of the week, with the number of weeks each was available
+    """
+    def __init__(self, matrix: AvailabilityMatrix, timezone_name: str):
+        self.slot_size = matrix.slot_size
+        self.slots_per_day = MINUTES_PER_DAY // matrix.slot_size
+        self.participants = list(matrix.participants)
+        slots_per_week = DAYS_PER_WEEK * self.slots_per_day
+        self.hits = np.zeros((slots_per_week, len(self.participants)), dtype=np.int64)  # slot of the week x participant -> weeks available
+        self.weeks = np.zeros(slots_per_week, dtype=np.int64)  # slot of the week -> weeks of the event it occurs in
+        self.occupied = np.zeros(slots_per_week, dtype=bool)  # slots of the week with availability in any week
+        self.masks: List[int] = [0] * slots_per_week  # slot of the week -> participants available every week
+        self.weight_masks: Dict[int, List[int]] = {}  # weight other than the default -> slot of the week -> participants with it every week
+        if matrix.get_slot_count() == 0:
+            return
+
+        slots_of_week = np.array([get_slot_of_week(minute, timezone_name, self.slot_size) for minute in matrix.slot_minutes], dtype=np.int64)
+        available = unpack_slot_masks(matrix)
+        np.add.at(self.hits, slots_of_week, available)
+
+        timezone = pytz.timezone(timezone_name)
+        first_date = datetime.fromtimestamp(matrix.slot_minutes[0] * 60, timezone).date()
+        last_date = datetime.fromtimestamp(matrix.slot_minutes[-1] * 60, timezone).date()
+        day_count = (last_date - first_date).days + 1
+        for weekday in range(DAYS_PER_WEEK):
+            # dates of the weekday from the first to the last date
+            weeks = day_count // DAYS_PER_WEEK + ((weekday - first_date.weekday()) % DAYS_PER_WEEK < day_count % DAYS_PER_WEEK)
+            self.weeks[weekday * self.slots_per_day:(weekday + 1) * self.slots_per_day] = weeks
+
+        self.masks = pack_participant_masks(self.hits >= self.weeks[:, None])
+        for weight, masks in matrix.weight_masks.items():
+            # weights only count where participants are available, every week here
+            weight_hits = np.zeros_like(self.hits)
+            np.add.at(weight_hits, slots_of_week, unpack_masks(masks, len(self.participants)) & available)
+            self.weight_masks[weight] = pack_participant_masks(weight_hits >= self.weeks[:, None])
+        self.occupied[np.unique(slots_of_week)] = True
+
+    def get_counts(self) -> np.ndarray:
+        """
+        Number of participants available every week at each slot, as a days x slots_per_day array
+        """
+        return np.array([mask.bit_count() for mask in self.masks], dtype=np.int64).reshape(DAYS_PER_WEEK, self.slots_per_day)
+
+    def to_matrix(self) -> AvailabilityMatrix:
+        """
+        Availability matrix over a single week, slot minutes counted from Monday 00:00 in the event timezone
+        Slots of the week without availability in any week are left out, as slots without availability are.
+        """
+        matrix = AvailabilityMatrix(self.slot_size)
+        for user_uuid in self.participants:
+            matrix._add_participant(user_uuid)
+        slots = [int(slot) for slot in np.nonzero(self.occupied)[0]]
+        for slot in slots:
+            minute = slot * self.slot_size
+            matrix.slot_index[minute] = len(matrix.slot_minutes)
+            matrix.slot_minutes.append(minute)
+            matrix.slot_offsets.append(0)
+            matrix.slot_masks.append(self.masks[slot])
+        matrix.weight_masks = {weight: [masks[slot] for slot in slots] for weight, masks in self.weight_masks.items()}
+        return matrix
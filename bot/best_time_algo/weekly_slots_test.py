@@ -0,0 +1,84 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from best_time_algo.weekly_slots import WeeklyFold, get_slot_of_week
+from best_time_algo.availability_matrix import AvailabilityMatrix
+from best_time_algo.best_time_algo import BestTimeAlgo, TIMING_WEIGHTS
+from best_time_algo.testing import generate_availability_blocks
+
+SGT = timezone(timedelta(hours=8))
+MONDAY = datetime(2025, 1, 6, tzinfo=SGT)
+
+def make_weekly_blocks(user_uuid: str, weeks: list, day: int, slots: list):
+    """Blocks of a user on a day of the given weeks, slots counted in 30 minutes from midnight"""
+    blocks = []
+    for week in weeks:
+        for slot in slots:
+            start = MONDAY + timedelta(days=7 * week + day, minutes=30 * slot)
+            blocks.append({
+                "start_time": start.isoformat(),
+                "end_time": (start + timedelta(minutes=30)).isoformat(),
+                "event_id": "1",
+                "user_uuid": user_uuid
+            })
+    return blocks
+
+class WeeklySlotsTest(unittest.TestCase):
+    def test_get_slot_of_week(self):
+        self.assertEqual(get_slot_of_week(int(MONDAY.timestamp()) // 60, "Asia/Singapore", 30), 0)
+        self.assertEqual(get_slot_of_week(int((MONDAY + timedelta(days=9, hours=13)).timestamp()) // 60, "Asia/Singapore", 30), 2 * 48 + 26)
+        # 00:00 on Monday in Singapore is still Sunday in London
+        self.assertEqual(get_slot_of_week(int(MONDAY.timestamp()) // 60, "Europe/London", 30), 6 * 48 + 32)
+
+    def test_fold(self):
+        # two weeks from Monday to the second Sunday, user 2 misses the second Tuesday
+        availability_blocks = (
+            make_weekly_blocks("1", [0, 1], 1, [20, 21]) + make_weekly_blocks("2", [0], 1, [20, 21])
+            + make_weekly_blocks("1", [0], 0, [0]) + make_weekly_blocks("1", [1], 6, [47])
+        )
+        fold = WeeklyFold(AvailabilityMatrix.from_availability_blocks(availability_blocks), "Asia/Singapore")
+        self.assertEqual(fold.weeks.tolist(), [2] * 7 * 48)
+        self.assertEqual(fold.hits[48 + 20].tolist(), [2, 1])
+        self.assertEqual(fold.masks[48 + 20], 0b01)
+        counts = fold.get_counts()
+        self.assertEqual(counts.shape, (7, 48))
+        self.assertEqual(counts.sum(), 2)
+        matrix = fold.to_matrix()
+        self.assertEqual(matrix.slot_minutes, [0, (48 + 20) * 30, (48 + 21) * 30, (6 * 48 + 47) * 30])
+        self.assertEqual(matrix.slot_masks, [0, 0b01, 0b01, 0])
+
+    def test_partial_weeks(self):
+        # from a Wednesday to the Monday 12 days later, every weekday but Tuesday occurs twice
+        availability_blocks = make_weekly_blocks("1", [0], 2, [0]) + make_weekly_blocks("1", [2], 0, [0])
+        fold = WeeklyFold(AvailabilityMatrix.from_availability_blocks(availability_blocks), "Asia/Singapore")
+        self.assertEqual([int(fold.weeks[day * 48]) for day in range(7)], [2, 1, 2, 2, 2, 2, 2])
+
+    def test_best_weekly_times(self):
+        # users 1 to 3 meet on Tuesday evenings every week, user 4 only in the first week
+        availability_blocks = (
+            make_weekly_blocks("1", [0, 1, 2], 1, [36, 37, 38]) + make_weekly_blocks("2", [0, 1, 2], 1, [36, 37, 38])
+            + make_weekly_blocks("3", [0, 1, 2], 1, [36, 37]) + make_weekly_blocks("4", [0], 1, [36, 37, 38])
+            + make_weekly_blocks("1", [0, 1, 2], 5, [20, 21]) + make_weekly_blocks("2", [0, 1, 2], 5, [20, 21])
+        )
+        scheduler = BestTimeAlgo(min_participants=2, min_block_size=2, max_block_size=4)
+        best_times = scheduler.get_best_weekly_times(availability_blocks, 2)
+        self.assertEqual([(block["weekday"], block["start_time"], block["end_time"], block["participants"]) for block in best_times], [
+            (1, "18:00", "19:30", ["1", "2"]),
+            (1, "18:30", "19:30", ["1", "2"]),
+        ])
+        self.assertEqual(best_times[0]["score"], scheduler._score_weight(TIMING_WEIGHTS[18], 2 * 3))
+        self.assertEqual(scheduler.get_best_weekly_times(availability_blocks, 0), [])
+
+    def test_matches_one_week(self):
+        # 09:00 on a Wednesday to 08:30 on the Tuesday after, every date once, so the week folds onto itself
+        availability_blocks = generate_availability_blocks(1, 8, 6 * 48, 0.6)
+        for backend in ["bitset", "numpy"]:
+            scheduler = BestTimeAlgo(min_participants=3, min_block_size=2, max_block_size=4, backend=backend)
+            ranked_times = scheduler.get_best_meeting_times(availability_blocks, 1000)
+            weekly_times = scheduler.get_best_weekly_times(availability_blocks, 1000)
+            self.assertEqual(
+                sorted((block["score"], block["participants"], block["duration"]) for block in weekly_times),
+                sorted((block["score"], block["participants"], block["duration"]) for block in ranked_times)
+            )
+
+if __name__ == "__main__":
+    unittest.main()
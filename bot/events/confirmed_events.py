@@ -3,7 +3,8 @@ from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 
 # Import from services
-from services.database_service import getEntry, setEntry, getEntries, deleteEntry, supabase
+from services.database_service import getEntry, setEntry, getEntries, deleteEntry, get_supabase_client
+from services.event_service import set_busy_event_time, add_busy_member, remove_busy_member
 
 # Import from utils
 from utils.date_utils import parse_date, format_date_month_day, format_time_from_iso_am_pm
@@ -101,6 +102,8 @@ class ConfirmedEvent(Event):
         isConfirmed = getEntry("confirmed_events", "event_id", event.event_id)
         if not isConfirmed:
             isConfirmed = setEntry("confirmed_events", event.event_id, confirmed_event_data)
+            if isConfirmed:
+                set_busy_event_time(event.event_id, confirmed_event.confirmed_start_time, confirmed_event.confirmed_end_time)
         
         if not isConfirmed:
             raise Exception("Failed to confirm event")
@@ -128,6 +131,18 @@ class ConfirmedEvent(Event):
     
     def get_confirmed_end_time(self) -> str:
         return self.confirmed_end_time
+
+    """
+    Get the participants available for the confirmed time, from the scheduling session of the event
+    """
+    def _get_confirmed_participants(self):
+        session = self._get_scheduling_session()
+        if not session:
+            return []
+        return session.get_event_participants(self.confirmed_start_time, self.confirmed_end_time)
+
+    def get_confirmed_participants(self):
+        return self._get_confirmed_participants()
     
     """
     Handle user joining event
@@ -146,6 +161,7 @@ class ConfirmedEvent(Event):
         success = setEntry("membership", self.event_id, membership_data)
         if not success:
             return False
+        add_busy_member(self.event_id, user_uuid)
         return True
     
     """
@@ -155,13 +171,14 @@ class ConfirmedEvent(Event):
         success = deleteEntry("membership", "event_id", self.event_id, "user_uuid", user_uuid)
         if not success:
             return False
+        remove_busy_member(self.event_id, user_uuid)
         return True
     
     """
     Get all users from membership table for given event
     """
     def _get_all_users_for_event(self):
-        response = supabase.rpc("get_event_members", { "p_event_id": self.event_id }).execute()
+        response = get_supabase_client().rpc("get_event_members", { "p_event_id": self.event_id }).execute()
         return response.data
 
     """
@@ -5,11 +5,13 @@ from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
 # Import from config
 from telegram.config.config import bot
 
-# Import from best time algo
-from best_time_algo.best_time_algo import BestTimeAlgo
-
 # Import from services
-from services.database_service import getEntry, setEntry, getEntries
+from services.database_service import getEntry, getEntries
+from services.async_database_service import AsyncDatabaseService
+from services.event_service import get_event_best_time, get_event_session
+
+# Import from best time algo
+from best_time_algo.scheduling_session import SchedulingSession
 
 # Import from utils
 from utils.date_utils import parse_date, format_date_month_day
@@ -39,6 +41,10 @@ Database schema for reference:
                     ON DELETE RESTRICT,
   created_at      TIMESTAMPTZ       NOT NULL DEFAULT NOW()
 """
+
+# Database access for the coroutines of the class, which run on the event loop of the API
+database = AsyncDatabaseService()
+
 class Event:
     def __init__(self, 
                  event_id: str, 
@@ -182,7 +188,8 @@ class Event:
             "timezone": timezone
         }
 
-        success = setEntry("events", event_id, event_data)
+        # awaited by the API, so the insert must not block the event loop
+        success = await database.setEntry("events", event_id, event_data)
         if not success:
             return None
 
@@ -204,12 +211,18 @@ class Event:
     Get best time for event
     """
     def _get_best_time_for_event(self):
-        best_time_algo = BestTimeAlgo(min_participants=self.min_participants, min_block_size=self.min_duration, max_block_size=self.max_duration)
-        availability_blocks = self._get_availability_blocks_for_event()
-        if not availability_blocks:
+        # served from the versioned results cache of the event service
+        best_time = get_event_best_time(self.event_id)
+        if not best_time:
             return None
-        best_time_algo._process_availability_blocks(availability_blocks)
-        return best_time_algo._get_best_event_block(availability_blocks)
+        return best_time
+
+    """
+    Get the scheduling session of the event from the event service, synced with its availability
+    The event keeps no reference to it, as the service may evict it and build another one
+    """
+    def _get_scheduling_session(self) -> Optional[SchedulingSession]:
+        return get_event_session(self.event_id)
 
     """
     Get event from database
@@ -281,6 +294,12 @@ class Event:
     """
     def get_best_time_for_event(self):
         return self._get_best_time_for_event()
+
+    """
+    Get the scheduling session of the event
+    """
+    def get_scheduling_session(self) -> Optional[SchedulingSession]:
+        return self._get_scheduling_session()
     
     """
     Get all chats for event
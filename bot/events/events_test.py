@@ -0,0 +1,32 @@
+import os
+import unittest
+
+# the bot is created on import, with a token from the environment
+os.environ.setdefault("TOKEN", "123:test")
+
+from events.events import Event
+from services import event_service
+from services.event_service_test import EventServiceTestCase
+from best_time_algo.testing import make_blocks
+
+class EventSessionTest(EventServiceTestCase):
+    def test_session_evicted_then_availability_changed(self):
+        event = Event.from_database("1")
+        best_time = event.get_best_time_for_event()
+        session = event.get_scheduling_session()
+        self.assertIs(event.get_scheduling_session(), session)
+
+        # the service drops the session, then the availability changes with no session to update
+        event_service.sessions.clear()
+        self.assertTrue(event_service.updateUserAvailability("tele-2", "1", make_blocks("2", [0, 1])))
+        self.assertIsNot(event.get_scheduling_session(), session)
+        self.assertIs(event.get_scheduling_session(), event_service.sessions.get("1"))
+
+        changed_best_time = event.get_best_time_for_event()
+        self.assertNotEqual(changed_best_time, best_time)
+        event_service.results_cache.clear()
+        event_service.sessions.clear()
+        self.assertEqual(event_service.get_event_best_time("1"), changed_best_time)
+
+if __name__ == "__main__":
+    unittest.main()
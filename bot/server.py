@@ -5,20 +5,25 @@ from dotenv import load_dotenv
 import os
 import json
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 
 # Import events
 from events.events import Event
 
+# Import from best time algo
+from best_time_algo.best_time_algo import DEFAULT_TOP_K
+
 # Import handlers
 from telegram.handlers.event_handlers import handle_event_confirmation
 
 # Import services
-from services.event_service import get_event_best_time, getEvent, getConfirmedEvent, generate_confirmed_event_description, generate_event_description
+from services.event_service import get_event_best_time, get_event_best_time_within, get_event_ranked_times, get_event_heatmap, getConfirmedEvent, generate_confirmed_event_description, generate_event_description
 from services.reminder_service import send_daily_availability_reminders, send_daily_event_reminders, send_upcoming_event_reminders
-from services.share_service import get_ctx, handle_share_event, set_chat
-from services.user_service import getUser
+from services.share_service import handle_share_event, set_chat
+from services.database_service import get_entry_cache_stats
+from services.async_database_service import AsyncDatabaseService
 
 from telebot.types import Update
 
@@ -39,6 +44,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Database reads of the endpoints, awaited so that one slow query does not block the other requests
+database = AsyncDatabaseService()
+
+async def get_share_ctx(token: str) -> dict:
+    """Get and use the chat details of a share token"""
+    ctx = await database.rpc("get_and_use_share_token", {"p_token": token})
+    return ctx[0] if ctx else None
+
 # FastAPI models for API endpoints
 class AvailabilityRequest(BaseModel):
     tele_id: str
@@ -74,8 +87,8 @@ async def telegram_webhook(request: Request):
 # Health check endpoint
 @app.get("/webhook/health")
 async def health_check():
-    """Health check endpoint for the webhook"""
-    return {"status": "healthy"}
+    """Health check endpoint for the webhook, with the hits and misses of the entry cache"""
+    return {"status": "healthy", "entry_cache": get_entry_cache_stats()}
 
 
 @app.post("/api/share")
@@ -86,17 +99,17 @@ async def share_event(request: Request):
     event_id = data["event_id"]
 
     # get the event
-    event = getEvent(event_id)
+    event = await database.getEntry("events", "event_id", event_id)
     if not event:
         return JSONResponse(status_code=400, content=jsonable_encoder({"error": "Event not found"}))
 
     # get the event chat details
-    ctx = get_ctx(token)
+    ctx = await get_share_ctx(token)
     if not ctx:
         return JSONResponse(status_code=400, content=jsonable_encoder({"error": "Invalid token"}))
     print("ctx", ctx)
     # edit the message
-    success = handle_share_event(event_id, ctx["tele_id"], ctx["chat_id"], ctx["message_id"], ctx["thread_id"])
+    success = await run_in_threadpool(handle_share_event, event_id, ctx["tele_id"], ctx["chat_id"], ctx["message_id"], ctx["thread_id"])
     if not success:
         return JSONResponse(status_code=400, content=jsonable_encoder({"error": "Failed to handle share event"}))
     
@@ -111,7 +124,7 @@ async def create_event(request: Request):
     # get token details 
     token = data["token"]
 
-    ctx = get_ctx(token)
+    ctx = await get_share_ctx(token)
     if not ctx:
         return JSONResponse(status_code=400, content=jsonable_encoder({"error": "Invalid token"})) 
     
@@ -124,7 +137,7 @@ async def create_event(request: Request):
     end_date = data["end"]
     creator_tele_id = data["creator"]
 
-    creator = getUser(creator_tele_id)
+    creator = await database.getEntry("users", "tele_id", creator_tele_id, columns=["uuid"])
     if not creator:
         return JSONResponse(status_code=400, content=jsonable_encoder({"error": "Creator not found"}))
     creator_uuid = creator["uuid"]
@@ -156,7 +169,7 @@ async def create_event(request: Request):
         return JSONResponse(status_code=400, content=jsonable_encoder({"error": "Failed to create event"}))
     
     # Share event
-    success = handle_share_event(event_id, ctx["tele_id"], ctx["chat_id"], ctx["message_id"], ctx["thread_id"])
+    success = await run_in_threadpool(handle_share_event, event_id, ctx["tele_id"], ctx["chat_id"], ctx["message_id"], ctx["thread_id"])
     if not success:
         return JSONResponse(status_code=400, content={"error": "Failed to share event"})
     
@@ -172,18 +185,42 @@ async def confirm_event(request: Request):
     best_end_time = data["best_end_time"]
 
     # process confirm event
-    success = handle_event_confirmation(event_id, best_start_time, best_end_time)
+    success = await run_in_threadpool(handle_event_confirmation, event_id, best_start_time, best_end_time)
     return JSONResponse(status_code=200, content=jsonable_encoder({"success": success}))
 
 @app.post("/api/event/get-best-time")
 async def get_best_time(request: Request):
-    """Get the best time for an event"""
+    """Get the best time for an event, within time_budget_ms if given"""
     data = await request.json()
     event_id = data["event_id"]
-    best_time = get_event_best_time(event_id)
+    if data.get("time_budget_ms") is not None:
+        best_time, complete = await run_in_threadpool(get_event_best_time_within, event_id, float(data["time_budget_ms"]) / 1000)
+        return JSONResponse(status_code=200, content=jsonable_encoder({"data": best_time, "complete": complete}))
+    best_time = await run_in_threadpool(get_event_best_time, event_id)
     print("best_time", best_time)
     return JSONResponse(status_code=200, content=jsonable_encoder({"data": best_time}))
 
+@app.post("/api/event/get-ranked-times")
+async def get_ranked_times(request: Request):
+    """Get the top k times for an event, best first, with their scores, within time_budget_ms if given"""
+    data = await request.json()
+    event_id = data["event_id"]
+    k = int(data.get("k", DEFAULT_TOP_K))
+    if data.get("time_budget_ms") is not None:
+        ranked_times, complete = await run_in_threadpool(get_event_best_time_within, event_id, float(data["time_budget_ms"]) / 1000, k)
+        return JSONResponse(status_code=200, content=jsonable_encoder({"data": ranked_times, "complete": complete}))
+    ranked_times = await run_in_threadpool(get_event_ranked_times, event_id, k)
+    return JSONResponse(status_code=200, content=jsonable_encoder({"data": ranked_times}))
+
+@app.post("/api/event/heatmap")
+async def get_heatmap(request: Request):
+    """Get the number of participants available at each slot of an event, with participant bitmaps if requested"""
+    data = await request.json()
+    event_id = data["event_id"]
+    include_bitmaps = bool(data.get("include_bitmaps", False))
+    heatmap = await run_in_threadpool(get_event_heatmap, event_id, include_bitmaps)
+    return JSONResponse(status_code=200, content=jsonable_encoder({"data": heatmap}))
+
 @app.post("/api/reminders")
 async def send_reminders(api_key: str = Header(...)):
     """Send reminders for all events"""
@@ -194,9 +231,9 @@ async def send_reminders(api_key: str = Header(...)):
             detail="Invalid API Key"
         )
 
-    send_daily_availability_reminders()
-    send_daily_event_reminders()
-    send_upcoming_event_reminders()
+    await run_in_threadpool(send_daily_availability_reminders)
+    await run_in_threadpool(send_daily_event_reminders)
+    await run_in_threadpool(send_upcoming_event_reminders)
 
     return JSONResponse(status_code=200, content=jsonable_encoder({"success": True}))
 
@@ -0,0 +1,31 @@
+import os
+import unittest
+from fastapi.testclient import TestClient
+
+# the bot is created on import, with a token from the environment
+os.environ.setdefault("TOKEN", "123:test")
+
+from server import app
+from services.event_service_test import EventServiceTestCase, HEATMAP, HEATMAP_PARTICIPANTS, HEATMAP_BITMAPS
+
+class HeatmapEndpointTest(EventServiceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.api = TestClient(app)
+
+    def test_heatmap(self):
+        response = self.api.post("/api/event/heatmap", json={"event_id": "1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"data": HEATMAP})
+
+    def test_bitmaps(self):
+        heatmap = self.api.post("/api/event/heatmap", json={"event_id": "1", "include_bitmaps": True}).json()["data"]
+        self.assertEqual(heatmap, {**HEATMAP, "participants": HEATMAP_PARTICIPANTS, "bitmaps": HEATMAP_BITMAPS})
+
+    def test_missing_event(self):
+        response = self.api.post("/api/event/heatmap", json={"event_id": "2"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"data": {}})
+
+if __name__ == "__main__":
+    unittest.main()
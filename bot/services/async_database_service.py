@@ -0,0 +1,108 @@
+from typing import Any, Dict, Optional
+from supabase import AsyncClient
+
+# Import from utils
+from utils.supabase_client import get_async_supabase_client, select_columns, chunk_values
+
+class AsyncDatabaseService:
+    """Database service for direct database operations that do not block the event loop"""
+
+    async def _client(self) -> AsyncClient:
+        # Every instance shares the pooled async client of the process
+        return await get_async_supabase_client()
+
+    async def getEntry(self, table: str, key_field: str, key_value: str, columns: list[str] = None):
+        """Get an entry from a table by a key field, with only the given columns if any"""
+        try:
+            client = await self._client()
+            response = await client.table(table).select(select_columns(columns)).eq(key_field, key_value).limit(1).execute()
+            if response.data and len(response.data) > 0:
+                return response.data[0]
+            return None
+        except Exception as e:
+            print(f"Error getting entry from {table}: {e}")
+            return None
+
+    async def getEntries(self, table: str, key_field: str, key_value: str, columns: list[str] = None):
+        """Get multiple entries from a table by a key field, with only the given columns if any"""
+        try:
+            client = await self._client()
+            response = await client.table(table).select(select_columns(columns)).eq(key_field, key_value).execute()
+            return response.data
+        except Exception as e:
+            print(f"Error getting entries from {table}: {e}")
+            return None
+
+    async def getEntriesIn(self, table: str, key_field: str, key_values: list[str], columns: list[str] = None):
+        """Get the entries of a table whose key field is any of the given values, with only the given columns if any"""
+        try:
+            client = await self._client()
+            entries = []
+            # one request per chunk of values rather than one per value
+            for chunk in chunk_values(key_values):
+                response = await client.table(table).select(select_columns(columns)).in_(key_field, chunk).execute()
+                entries.extend(response.data or [])
+            return entries
+        except Exception as e:
+            print(f"Error getting entries from {table}: {e}")
+            return None
+
+    async def setEntry(self, table: str, id: str, data: dict) -> bool:
+        """Set an entry in a table with the given ID"""
+        try:
+            client = await self._client()
+            response = await client.table(table).insert(data).execute()
+            return True if response.data else False
+        except Exception as e:
+            print(f"Error setting entry in {table}: {e}")
+            return False
+
+    async def setEntries(self, table: str, data: list[dict]) -> bool:
+        """Set multiple entries in a table"""
+        try:
+            client = await self._client()
+            response = await client.table(table).insert(data).execute()
+            return True if response.data else False
+        except Exception as e:
+            print(f"Error setting entries in {table}: {e}")
+            return False
+
+    async def updateEntry(self, table: str, id: str, data: dict) -> bool:
+        """Update an entry in a table with the given ID"""
+        try:
+            client = await self._client()
+            response = await client.table(table).update(data).eq("event_id", id).execute()
+            return True if response.data else False
+        except Exception as e:
+            print(f"Error updating entry in {table}: {e}")
+            return False
+
+    async def deleteEntry(self, table: str, id_field: str, id: str, key_field: str, key_value: str) -> bool:
+        """Delete an entry from a table with the given ID"""
+        try:
+            client = await self._client()
+            response = await client.table(table).delete().eq(id_field, id).eq(key_field, key_value).execute()
+            return True if response.data else False
+        except Exception as e:
+            print(f"Error deleting entry from {table}: {e}")
+            return False
+
+    async def deleteEntries(self, table: str, id_field: str, id: str, key_field: str, key_values: list[str]) -> bool:
+        """Delete multiple entries from a table"""
+        try:
+            client = await self._client()
+            await client.table(table).delete().eq(id_field, id).in_(key_field, key_values).execute()
+            return True
+        except Exception as e:
+            print(f"Error deleting entries from {table}: {e}")
+            return False
+
+    async def rpc(self, function: str, params: Optional[Dict[str, Any]] = None):
+        """Call a database function and get the rows it returns"""
+        try:
+            client = await self._client()
+            response = await client.rpc(function, params or {}).execute()
+            return response.data
+        except Exception as e:
+            print(f"Error calling {function}: {e}")
+            return None
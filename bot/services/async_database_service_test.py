@@ -0,0 +1,80 @@
+import unittest
+from unittest import mock
+from services import async_database_service
+from services.async_database_service import AsyncDatabaseService
+from services.testing import AsyncFakeClient
+from utils.supabase_client import IN_CHUNK_SIZE
+
+class AsyncDatabaseServiceTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.client = AsyncFakeClient({
+            "events": [{"event_id": "1", "name": "a"}, {"event_id": "2", "name": "b"}],
+            "membership": [{"event_id": "1", "user_uuid": "1"}, {"event_id": "1", "user_uuid": "2"}],
+        }, {"get_members": lambda params: [{"user_uuid": "1"}] if params.get("event_id") == "1" else []})
+        self.get_client = mock.AsyncMock(return_value=self.client)
+        patcher = mock.patch.object(async_database_service, "get_async_supabase_client", self.get_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.database = AsyncDatabaseService()
+
+    async def test_reads(self):
+        self.assertEqual(await self.database.getEntry("events", "event_id", "2"), {"event_id": "2", "name": "b"})
+        self.assertIsNone(await self.database.getEntry("events", "event_id", "3"))
+        self.assertEqual(await self.database.getEntries("membership", "event_id", "1"), self.client.tables["membership"])
+        self.assertEqual(await self.database.getEntries("membership", "event_id", "2"), [])
+        self.assertEqual(await self.database.rpc("get_members", {"event_id": "1"}), [{"user_uuid": "1"}])
+        self.assertEqual(await self.database.rpc("get_members"), [])
+
+    async def test_projection(self):
+        self.client.tables["events"].append({"event_id": "2", "name": "c"})
+        self.assertEqual(await self.database.getEntry("events", "event_id", "2", columns=["name"]), {"name": "b"})
+        self.assertEqual(self.client.queries[-1].action, ("select", "name"))
+        self.assertEqual(self.client.queries[-1].count, 1)
+        self.assertEqual(await self.database.getEntries("events", "event_id", "2", columns=["name"]), [{"name": "b"}, {"name": "c"}])
+        self.assertEqual(self.client.queries[-1].action, ("select", "name"))
+        self.assertIsNone(self.client.queries[-1].count)
+
+    async def test_getEntriesIn_chunks(self):
+        # 2.5 chunks of distinct users, each asked for twice
+        user_uuids = [str(user) for user in range(IN_CHUNK_SIZE * 5 // 2)]
+        self.client.tables["membership"] = [{"event_id": "1", "user_uuid": user_uuid} for user_uuid in user_uuids]
+        entries = await self.database.getEntriesIn("membership", "user_uuid", user_uuids + user_uuids[::-1], columns=["user_uuid"])
+        self.assertEqual(entries, [{"user_uuid": user_uuid} for user_uuid in user_uuids])
+        # one request per chunk, without the duplicates
+        self.assertEqual(self.client.requests, 3)
+        self.assertEqual([query.in_values for query in self.client.queries], [user_uuids[:IN_CHUNK_SIZE], user_uuids[IN_CHUNK_SIZE:2 * IN_CHUNK_SIZE], user_uuids[2 * IN_CHUNK_SIZE:]])
+        self.assertEqual(await self.database.getEntriesIn("membership", "user_uuid", []), [])
+        self.assertEqual(self.client.requests, 3)
+
+    async def test_writes(self):
+        self.assertTrue(await self.database.setEntry("events", "3", {"event_id": "3", "name": "c"}))
+        self.assertTrue(await self.database.setEntries("membership", [{"event_id": "3", "user_uuid": "1"}, {"event_id": "3", "user_uuid": "2"}]))
+        self.assertTrue(await self.database.updateEntry("events", "3", {"name": "d"}))
+        self.assertFalse(await self.database.updateEntry("events", "4", {"name": "d"}))
+        self.assertEqual(await self.database.getEntry("events", "event_id", "3"), {"event_id": "3", "name": "d"})
+
+        self.assertTrue(await self.database.deleteEntry("membership", "event_id", "3", "user_uuid", "1"))
+        self.assertFalse(await self.database.deleteEntry("membership", "event_id", "3", "user_uuid", "1"))
+        self.assertTrue(await self.database.deleteEntries("membership", "event_id", "1", "user_uuid", ["1", "2"]))
+        self.assertEqual(self.client.tables["membership"], [{"event_id": "3", "user_uuid": "2"}])
+
+    async def test_shared_client(self):
+        # every call and every instance goes through the pooled client of the process
+        await self.database.getEntry("events", "event_id", "1")
+        await AsyncDatabaseService().getEntries("events", "event_id", "1")
+        self.assertEqual(self.get_client.await_count, 2)
+        self.assertEqual(self.client.requests, 2)
+
+    async def test_errors(self):
+        self.get_client.side_effect = RuntimeError("unreachable")
+        with mock.patch("builtins.print"):
+            self.assertIsNone(await self.database.getEntry("events", "event_id", "1"))
+            self.assertIsNone(await self.database.getEntries("events", "event_id", "1"))
+            self.assertIsNone(await self.database.getEntriesIn("events", "event_id", ["1"]))
+            self.assertFalse(await self.database.setEntry("events", "3", {"event_id": "3"}))
+            self.assertFalse(await self.database.updateEntry("events", "1", {"name": "c"}))
+            self.assertFalse(await self.database.deleteEntries("events", "event_id", "1", "name", ["a"]))
+            self.assertIsNone(await self.database.rpc("get_members"))
+
+if __name__ == "__main__":
+    unittest.main()
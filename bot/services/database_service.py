@@ -1,20 +1,69 @@
-import os
-from supabase import create_client, Client
-from dotenv import load_dotenv
+# Import from utils
+from utils.supabase_client import get_supabase_client, select_columns, chunk_values
+from utils.ttl_cache import TTLCache
 
-# Load environment variables
-load_dotenv()
+"""
+Rows of the users, events and confirmed events are looked up several times per update, so getEntry
+reads them through a process-local cache, which getEntriesIn also fills with the rows it fetches.
+Writes through these helpers drop the cached rows of the table they were looked up by any (field, value)
+pair of the write, and every row expires after ENTRY_CACHE_TTL seconds.
 
-# Initialize Supabase client
-supabase: Client = create_client(
-    os.getenv('SUPABASE_URL'),
-    os.getenv('SUPABASE_KEY')
-)
+Writes made elsewhere (e.g. the webapp writing to the database directly) do not go through these helpers
+and invalidate nothing, so a row they change can be served stale for up to ENTRY_CACHE_TTL seconds.
+"""
 
-def getEntry(table: str, key_field: str, key_value: str):
-    """Get an entry from a table by a key field"""
+CACHED_TABLES = frozenset({"users", "events", "confirmed_events"})  # Tables read through the entry cache
+ENTRY_CACHE_SIZE = 4096  # Rows kept in the entry cache
+ENTRY_CACHE_TTL = 60  # Seconds a cached row is used for
+
+_MISSING = object()
+# (table, key field, key value, columns) -> row
+entry_cache = TTLCache(ENTRY_CACHE_SIZE, ENTRY_CACHE_TTL)
+
+def get_entry_cache_stats() -> dict:
+    """Get the hits, misses and size of the entry cache"""
+    return entry_cache.get_stats()
+
+def _cache_entries(table: str, key_field: str, columns: list[str], entries: list[dict]):
+    """Cache the rows of a table under their key field, for the key values only one of the rows has"""
+    if table not in CACHED_TABLES:
+        return
+    rows = {}
+    for entry in entries:
+        if key_field in entry:
+            key_value = str(entry[key_field])
+            # getEntry reads the first row of several, which a batch cannot tell apart
+            rows[key_value] = _MISSING if key_value in rows else entry
+    columns_key = tuple(columns) if columns else None
+    for key_value, entry in rows.items():
+        if entry is not _MISSING:
+            entry_cache.set((table, key_field, key_value, columns_key), dict(entry))
+
+def _invalidate_entries(table: str, fields: list[tuple]):
+    """Drop the cached rows of a table looked up by any of the (field, value) pairs"""
+    if table not in CACHED_TABLES:
+        return
+    keys = {(field, str(value)) for field, value in fields}
+    entry_cache.invalidate(lambda key: key[0] == table and (key[1], key[2]) in keys)
+
+def getEntry(table: str, key_field: str, key_value: str, columns: list[str] = None):
+    """Get an entry from a table by a key field, with only the given columns if any"""
+    if table not in CACHED_TABLES:
+        return _fetchEntry(table, key_field, key_value, columns)
+    key = (table, key_field, str(key_value), tuple(columns) if columns else None)
+    entry = entry_cache.get(key, _MISSING)
+    if entry is _MISSING:
+        entry = _fetchEntry(table, key_field, key_value, columns)
+        if entry is None:
+            # missing rows and errors are not cached
+            return None
+        entry_cache.set(key, entry)
+    # a copy, so that callers changing the row do not change the cached one
+    return dict(entry)
+
+def _fetchEntry(table: str, key_field: str, key_value: str, columns: list[str] = None):
     try:
-        response = supabase.table(table).select("*").eq(key_field, key_value).execute()
+        response = get_supabase_client().table(table).select(select_columns(columns)).eq(key_field, key_value).limit(1).execute()
         if response.data and len(response.data) > 0:
             return response.data[0]
         return None
@@ -22,56 +71,80 @@ def getEntry(table: str, key_field: str, key_value: str):
         print(f"Error getting entry from {table}: {e}")
         return None
 
-def getEntries(table: str, key_field: str, key_value: str):
-    """Get multiple entries from a table by a key field"""
+def getEntries(table: str, key_field: str, key_value: str, columns: list[str] = None):
+    """Get multiple entries from a table by a key field, with only the given columns if any"""
     try:
-        response = supabase.table(table).select("*").eq(key_field, key_value).execute()
+        response = get_supabase_client().table(table).select(select_columns(columns)).eq(key_field, key_value).execute()
         return response.data
     except Exception as e:
         print(f"Error getting entries from {table}: {e}")
         return None
 
+def getEntriesIn(table: str, key_field: str, key_values: list[str], columns: list[str] = None):
+    """Get the entries of a table whose key field is any of the given values, with only the given columns if any"""
+    try:
+        entries = []
+        # one request per chunk of values rather than one per value
+        for chunk in chunk_values(key_values):
+            response = get_supabase_client().table(table).select(select_columns(columns)).in_(key_field, chunk).execute()
+            entries.extend(response.data or [])
+        _cache_entries(table, key_field, columns, entries)
+        return entries
+    except Exception as e:
+        print(f"Error getting entries from {table}: {e}")
+        return None
+
 def setEntry(table: str, id: str, data: dict) -> bool:
     """Set an entry in a table with the given ID"""
     try:
-        response = supabase.table(table).insert(data).execute()
+        response = get_supabase_client().table(table).insert(data).execute()
         return True if response.data else False
     except Exception as e:
         print(f"Error setting entry in {table}: {e}")
         return False
+    finally:
+        _invalidate_entries(table, data.items())
 
 def setEntries(table: str, data: list[dict]) -> bool:
     """Set multiple entries in a table"""
     try:
-        response = supabase.table(table).insert(data).execute()
+        response = get_supabase_client().table(table).insert(data).execute()
         return True if response.data else False
     except Exception as e:
         print(f"Error setting entries in {table}: {e}")
         return False
+    finally:
+        _invalidate_entries(table, [field for row in data for field in row.items()])
 
 def updateEntry(table: str, id: str, data: dict) -> bool:
     """Update an entry in a table with the given ID"""
     try:
-        response = supabase.table(table).update(data).eq("event_id", id).execute()
+        response = get_supabase_client().table(table).update(data).eq("event_id", id).execute()
         return True if response.data else False
     except Exception as e:
         print(f"Error updating entry in {table}: {e}")
-        return False 
+        return False
+    finally:
+        _invalidate_entries(table, [("event_id", id), *data.items()])
 
 def deleteEntry(table: str, id_field: str, id: str, key_field: str, key_value: str) -> bool:
     """Delete an entry from a table with the given ID"""
     try:
-        response = supabase.table(table).delete().eq(id_field, id).eq(key_field, key_value).execute()
+        response = get_supabase_client().table(table).delete().eq(id_field, id).eq(key_field, key_value).execute()
         return True if response.data else False
     except Exception as e:
         print(f"Error deleting entry from {table}: {e}")
         return False
+    finally:
+        _invalidate_entries(table, [(id_field, id), (key_field, key_value)])
     
 def deleteEntries(table: str, id_field: str, id: str, key_field: str, key_values: list[str]) -> bool:
     """Delete multiple entries from a table"""
     try:
-        response = supabase.table(table).delete().eq(id_field, id).in_(key_field, key_values).execute()
+        response = get_supabase_client().table(table).delete().eq(id_field, id).in_(key_field, key_values).execute()
         return True
     except Exception as e:
         print(f"Error deleting entries from {table}: {e}")
         return False
+    finally:
+        _invalidate_entries(table, [(id_field, id), *((key_field, key_value) for key_value in key_values)])
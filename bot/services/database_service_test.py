@@ -0,0 +1,119 @@
+import unittest
+from unittest import mock
+from services import database_service
+from services.testing import FakeClient
+from utils.supabase_client import IN_CHUNK_SIZE
+
+class DatabaseServiceTestCase(unittest.TestCase):
+    """
+    Rows "1" and "2" in the cached tables and membership of a fake database
+    """
+    def setUp(self):
+        self.client = FakeClient({
+            table: [{"event_id": "1", "uuid": "1", "name": "a"}, {"event_id": "2", "uuid": "2", "name": "b"}]
+            for table in ["users", "events", "confirmed_events", "membership"]
+        })
+        patcher = mock.patch.object(database_service, "get_supabase_client", return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        database_service.entry_cache.clear()
+        self.addCleanup(database_service.entry_cache.clear)
+
+class EntryCacheTest(DatabaseServiceTestCase):
+    def test_getEntry_is_cached(self):
+        entry = database_service.getEntry("users", "uuid", "1")
+        entry["name"] = "changed"
+        self.assertEqual(database_service.getEntry("users", "uuid", "1"), {"event_id": "1", "uuid": "1", "name": "a"})
+        self.assertEqual(self.client.requests, 1)
+        # projected rows are cached apart from full rows
+        self.assertEqual(database_service.getEntry("users", "uuid", "1", columns=["name"]), {"name": "a"})
+        self.assertEqual(self.client.requests, 2)
+        # missing rows are not cached
+        self.assertIsNone(database_service.getEntry("users", "uuid", "3"))
+        self.assertIsNone(database_service.getEntry("users", "uuid", "3"))
+        self.assertEqual(self.client.requests, 4)
+
+    def test_writes_invalidate(self):
+        for table in sorted(database_service.CACHED_TABLES):
+            with self.subTest(table=table):
+                database_service.getEntry(table, "event_id", "1")
+                self.assertTrue(database_service.updateEntry(table, "1", {"name": "c"}))
+                self.assertEqual(len(database_service.entry_cache), 0)
+                self.assertEqual(database_service.getEntry(table, "event_id", "1")["name"], "c")
+
+                self.assertTrue(database_service.deleteEntry(table, "event_id", "1", "name", "c"))
+                self.assertEqual(len(database_service.entry_cache), 0)
+                self.assertIsNone(database_service.getEntry(table, "event_id", "1"))
+
+                database_service.getEntry(table, "event_id", "2")
+                self.assertTrue(database_service.setEntry(table, "2", {"event_id": "2", "uuid": "3", "name": "d"}))
+                self.assertEqual(len(database_service.entry_cache), 0)
+
+    def test_writes_keep_other_entries(self):
+        database_service.getEntry("events", "event_id", "1")
+        database_service.getEntry("events", "event_id", "2")
+        database_service.getEntry("users", "event_id", "1")
+        database_service.updateEntry("events", "1", {"name": "c"})
+        self.assertEqual(len(database_service.entry_cache), 2)
+        requests = self.client.requests
+        self.assertEqual(database_service.getEntry("events", "event_id", "2")["name"], "b")
+        self.assertEqual(self.client.requests, requests)
+
+    def test_getEntriesIn_fills_cache(self):
+        entries = database_service.getEntriesIn("users", "uuid", ["1", "2"], columns=["uuid", "name"])
+        self.assertEqual(entries, [{"uuid": "1", "name": "a"}, {"uuid": "2", "name": "b"}])
+        self.assertEqual(self.client.requests, 1)
+        self.assertEqual(database_service.getEntry("users", "uuid", "2", columns=["uuid", "name"]), {"uuid": "2", "name": "b"})
+        self.assertEqual(self.client.requests, 1)
+        # other columns are fetched
+        database_service.getEntry("users", "uuid", "2")
+        self.assertEqual(self.client.requests, 2)
+
+    def test_getEntriesIn_skips_shared_key_values(self):
+        self.client.tables["events"].append({"event_id": "1", "uuid": "3", "name": "c"})
+        database_service.getEntriesIn("events", "event_id", ["1", "2"])
+        self.assertEqual(len(database_service.entry_cache), 1)
+        self.assertEqual(database_service.getEntry("events", "event_id", "1")["name"], "a")
+        self.assertEqual(self.client.requests, 2)
+
+    def test_uncached_tables_bypass(self):
+        database_service.getEntry("membership", "event_id", "1")
+        database_service.getEntry("membership", "event_id", "1")
+        database_service.getEntriesIn("membership", "event_id", ["1", "2"])
+        self.assertEqual(self.client.requests, 3)
+        self.assertEqual(len(database_service.entry_cache), 0)
+
+class ProjectionTest(DatabaseServiceTestCase):
+    def test_getEntry_fetches_one_row(self):
+        self.client.tables["users"].append({"event_id": "1", "uuid": "1", "name": "c"})
+        self.assertEqual(database_service.getEntry("users", "uuid", "1", columns=["uuid", "name"]), {"uuid": "1", "name": "a"})
+        self.assertEqual(self.client.queries[-1].action, ("select", "uuid,name"))
+        self.assertEqual(self.client.queries[-1].count, 1)
+        database_service.getEntry("membership", "uuid", "1")
+        self.assertEqual(self.client.queries[-1].action, ("select", "*"))
+        self.assertEqual(self.client.queries[-1].count, 1)
+
+    def test_getEntries_projects_columns(self):
+        self.assertEqual(database_service.getEntries("events", "event_id", "2", columns=["name"]), [{"name": "b"}])
+        self.assertEqual(self.client.queries[-1].action, ("select", "name"))
+        self.assertIsNone(self.client.queries[-1].count)
+        self.assertEqual(database_service.getEntries("events", "event_id", "2"), [{"event_id": "2", "uuid": "2", "name": "b"}])
+        self.assertEqual(self.client.queries[-1].action, ("select", "*"))
+
+class GetEntriesInTest(DatabaseServiceTestCase):
+    def test_chunks(self):
+        # 2.5 chunks of distinct users, each asked for twice
+        user_uuids = [str(user) for user in range(IN_CHUNK_SIZE * 5 // 2)]
+        self.client.tables["membership"] = [{"event_id": "1", "user_uuid": user_uuid} for user_uuid in user_uuids]
+        entries = database_service.getEntriesIn("membership", "user_uuid", user_uuids + user_uuids[::-1])
+        self.assertEqual(entries, self.client.tables["membership"])
+        # one request per chunk, without the duplicates
+        self.assertEqual(self.client.requests, 3)
+        self.assertEqual([query.in_values for query in self.client.queries], [user_uuids[:IN_CHUNK_SIZE], user_uuids[IN_CHUNK_SIZE:2 * IN_CHUNK_SIZE], user_uuids[2 * IN_CHUNK_SIZE:]])
+
+    def test_no_values(self):
+        self.assertEqual(database_service.getEntriesIn("membership", "user_uuid", []), [])
+        self.assertEqual(self.client.requests, 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,19 +1,27 @@
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 # Import from best time algo
-from best_time_algo.best_time_algo import BestTimeAlgo
+from best_time_algo.best_time_algo import BestTimeAlgo, DEFAULT_TOP_K, DEFAULT_TIMEZONE, TIME_SLOT_SIZE, DEFAULT_SESSION_COUNT
+from best_time_algo.scheduling_session import SchedulingSession
+from best_time_algo.parallel_solver import ParallelSolver
+from best_time_algo.sleep_masks import get_sleep_hours
+from best_time_algo.busy_intervals import BusyIntervals
+from best_time_algo.deadline import Deadline, DeadlineExceeded
 
 # Import from services
-from .database_service import getEntry, setEntry, updateEntry, getEntries, deleteEntries, setEntries, deleteEntry
+from .database_service import getEntry, setEntry, updateEntry, getEntries, getEntriesIn, deleteEntries, setEntries, deleteEntry
 from .user_service import getUser
 
 # Import from utils
+from utils.ttl_cache import TTLCache
 from utils.date_utils import format_date_for_message, format_time_from_iso, parse_date, parse_time, format_time, format_date_month_day, format_time_from_iso_am_pm
 
 # Import from other
 import uuid
+import copy
+import os
 
 def getEvent(event_id: str) -> Optional[Dict]:
     """Get event details by ID"""
@@ -64,6 +72,7 @@ def join_event_by_uuid(event_id: str, user_uuid: str) -> bool:
     success = setEntry("membership", event_id, membership_data)
     if not success:
         return False
+    add_busy_member(event_id, user_uuid)
     return True
 
 def join_event(event_id: str, tele_id: str) -> bool:
@@ -86,6 +95,7 @@ def join_event(event_id: str, tele_id: str) -> bool:
     success = setEntry("membership", event_id, membership_data)
     if not success:
         return False
+    add_busy_member(event_id, user_uuid)
     return True
 
 def leave_event(event_id: str, tele_id: str) -> bool:
@@ -100,11 +110,12 @@ def leave_event(event_id: str, tele_id: str) -> bool:
     success = deleteEntry("membership", "event_id", event_id, "user_uuid", user_uuid)
     if not success:
         return False
+    remove_busy_member(event_id, user_uuid)
     return True
 
 def get_event_chat(event_id: str) -> Tuple[int, int]:
     """Get a chat for an event"""
-    event_chat = getEntry("event_chats", "event_id", event_id)
+    event_chat = getEntry("event_chats", "event_id", event_id, columns=["chat_id", "thread_id"])
     print("event_chat", event_chat)
     if not event_chat:
         return None, None
@@ -112,11 +123,11 @@ def get_event_chat(event_id: str) -> Tuple[int, int]:
 
 def check_ownership(event_id: str, tele_id: str) -> bool:
     """Check if a user is the owner of an event"""
-    event = getEvent(event_id)
+    event = getEntry("events", "event_id", event_id, columns=["creator"])
     if not event:
         return False
     creator_uuid = event["creator"]
-    user = getUser(tele_id)
+    user = getEntry("users", "tele_id", tele_id, columns=["uuid"])
     if not user:
         return False
     user_uuid = user["uuid"]
@@ -124,33 +135,32 @@ def check_ownership(event_id: str, tele_id: str) -> bool:
 
 def check_membership(event_id: str, tele_id: str) -> bool:
     """Check if a user is a member of an event"""
-    event = getConfirmedEvent(event_id)
+    event = getEntry("confirmed_events", "event_id", event_id, columns=["event_id"])
     if not event:
         return False
-    user = getUser(tele_id)
+    user = getEntry("users", "tele_id", tele_id, columns=["uuid"])
     if not user:
         return False
     user_uuid = user["uuid"]
-    membership = getEntries("membership", "event_id", event_id)
+    membership = getEntries("membership", "event_id", event_id, columns=["user_uuid"])
     for member in membership:
         if member["user_uuid"] == user_uuid:
             return True
     return False
 
-def getEventSleepPreferences(event_id: str) -> Dict[str, Dict[str, int]]:
+def getEventSleepPreferences(event_id: str, user_uuids: List[str] = None) -> Dict[str, Dict[str, int]]:
     """Get sleep preferences for all participants in an event"""
-    event = getEntry("events", "event_id", event_id)
-    if not event:
-        return {}
+    if user_uuids is None:
+        # participants are the users that have given availability for the event
+        availability = get_event_availability(event_id) or []
+        user_uuids = sorted({block["user_uuid"] for block in availability})
     
     sleep_prefs = {}
-    for user_id in event.get("participants", []):
-        user = getEntry("users", "uuid", user_id)
-        if user and "sleep_start" in user and "sleep_end" in user:
-            sleep_prefs[user_id] = {
-                "start": user["sleep_start"],
-                "end": user["sleep_end"]
-            }
+    users = getEntriesIn("users", "uuid", user_uuids, columns=["uuid", "sleep_start_time", "sleep_end_time"]) or []
+    for user in users:
+        sleep_hours = get_sleep_hours(user)
+        if sleep_hours:
+            sleep_prefs[user["uuid"]] = sleep_hours
     
     return sleep_prefs
 
@@ -185,18 +195,232 @@ def updateUserAvailability(tele_id: str, event_id: str, availability_data: List[
     if not user_uuid:
         return False
 
+    # read before writing, to tell the session whether it is still in line with the database after the write
+    availability_version = get_availability_version(event_id)
+
     # delete all availability blocks for the user for the event previously, if any
     successful_delete = deleteEntries("availability_blocks", "event_id", event_id, "user_uuid", [user_uuid])
     if not successful_delete:
         return False
 
     if not availability_data: # no need to set if no availability data
+        _update_session(event_id, user_uuid, [], availability_version)
         return True
     successful_set = setEntries("availability_blocks", availability_data)
     if not successful_set:
         return False
+    _update_session(event_id, user_uuid, availability_data, availability_version)
     return True
-    
+
+# Results computed for each event, keyed by (event_id, availability version, busy intervals version, solver parameters, sleep hours, query)
+# as its session was synced with. The availability version is kept by the database, so writes from the webapp change it as
+# well as writes from the bot, and sleep hours are read again on every sync, so a /sleep change moves the key too
+RESULT_CACHE_SIZE = 256
+RESULT_CACHE_TTL = 30  # seconds
+results_cache = TTLCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL)
+
+def get_availability_version(event_id: str) -> Optional[int]:
+    """
+    Version of the availability of an event, None if it cannot be read
+    A trigger bumps it on every write to the availability blocks of the event, whoever makes it. It is
+    read with getEntries, past the entry cache, as a cached event row can be older than its availability.
+    """
+    events = getEntries("events", "event_id", event_id, columns=["availability_version"])
+    if not events:
+        return None
+    return events[0].get("availability_version")
+
+def _get_result_key(event: Dict, session: Optional[SchedulingSession], query: Tuple) -> Optional[Tuple]:
+    """Key of a result for an event in the results cache, from what its session was synced with, None without a session or availability version"""
+    if session is None or session.availability_version is None:
+        return None
+    return (event["event_id"], session.availability_version, session.busy_intervals_version, _get_solver_parameters(event), session.get_sleep_key(), query)
+
+def _get_required_participants(event: Dict) -> Tuple[str, ...]:
+    """Participants every best time of an event must include: the creator and those listed as required"""
+    required_participants = set(event.get("required_participants") or [])
+    if event.get("creator"):
+        required_participants.add(event["creator"])
+    return tuple(sorted(required_participants))
+
+def _get_solver_parameters(event: Dict) -> Tuple:
+    """Parameters of an event that change the results of the best time algo"""
+    return (event.get("min_participants", 2), event.get("min_duration", 2), event.get("max_duration", 4), event.get("timezone") or DEFAULT_TIMEZONE, _get_required_participants(event))
+
+def _get_cached_result(event: Dict, query: Tuple, compute: Callable[[Optional[SchedulingSession]], Any]) -> Any:
+    """
+    Get a result for an event from the results cache, computing it from the synced session of the event and caching it on a miss
+    The session is synced first and the result cached under the versions it was synced with, read before the availability,
+    so a write during the sync is never hidden behind it. Without a version nothing is cached.
+    Results are copied in and out of the cache, so callers can change them without changing the cache.
+    """
+    session = _get_session(event)
+    key = _get_result_key(event, session, query)
+    if key is None:
+        return compute(session)
+    result = results_cache.get(key)
+    if result is None:
+        result = compute(session)
+        results_cache.set(key, copy.deepcopy(result))
+        return result
+    return copy.deepcopy(result)
+
+# Busy intervals of the users loaded so far, from the confirmed events they are members of
+busy_intervals = BusyIntervals()
+
+def _load_busy_intervals(user_uuids: List[str]):
+    """Load the confirmed events of the users not in the busy intervals yet, or loaded longer ago than its reload TTL"""
+    new_user_uuids = [user_uuid for user_uuid in user_uuids if busy_intervals.needs_load(user_uuid)]
+    if not new_user_uuids:
+        return
+    memberships = getEntriesIn("membership", "user_uuid", new_user_uuids, columns=["user_uuid", "event_id"])
+    if memberships is None:
+        # not loaded, retried on the next call
+        return
+    event_ids = [membership["event_id"] for membership in memberships]
+    confirmed_events = getEntriesIn("confirmed_events", "event_id", event_ids, columns=["event_id", "confirmed_start_time", "confirmed_end_time"])
+    if confirmed_events is None:
+        return
+    confirmed_times = {event["event_id"]: (event.get("confirmed_start_time"), event.get("confirmed_end_time")) for event in confirmed_events}
+    events = {user_uuid: [] for user_uuid in new_user_uuids}
+    for membership in memberships:
+        events[membership["user_uuid"]].append((membership["event_id"], *confirmed_times.get(membership["event_id"], (None, None))))
+    for user_uuid, user_events in events.items():
+        busy_intervals.load_user(user_uuid, user_events)
+
+def set_busy_event_time(event_id: str, start_time: str, end_time: str):
+    """Record the confirmed time of an event, making its members busy then in their other events"""
+    busy_intervals.set_event_time(event_id, start_time, end_time)
+
+def add_busy_member(event_id: str, user_uuid: str):
+    """Record a user joining a confirmed event"""
+    if busy_intervals.is_loaded(user_uuid):
+        busy_intervals.add_member(event_id, user_uuid)
+        if event_id not in busy_intervals.event_times:
+            confirmed_event = getConfirmedEvent(event_id) or {}
+            busy_intervals.set_event_time(event_id, confirmed_event.get("confirmed_start_time"), confirmed_event.get("confirmed_end_time"))
+
+def remove_busy_member(event_id: str, user_uuid: str):
+    """Record a user leaving a confirmed event"""
+    if busy_intervals.is_loaded(user_uuid):
+        busy_intervals.remove_member(event_id, user_uuid)
+
+def _get_free_availability(event_id: str, availability_blocks: List[Dict]) -> List[Dict]:
+    """Remove the availability blocks of an event during the confirmed events its users are members of"""
+    if not availability_blocks:
+        return availability_blocks
+    _load_busy_intervals(sorted({block["user_uuid"] for block in availability_blocks}))
+    return busy_intervals.filter_blocks(availability_blocks, event_id)
+
+def get_event_heatmap(event_id: str, include_bitmaps: bool = False) -> Dict:
+    """Get the number of participants available at each slot of an event, and optionally who they are"""
+    event = getEntry("events", "event_id", event_id)
+    if not event:
+        return {}
+
+    def compute(session: Optional[SchedulingSession]) -> Dict:
+        return session.get_heatmap(include_bitmaps=True) if session else {"slot_size": TIME_SLOT_SIZE, "start_times": [], "counts": [], "participants": [], "bitmaps": []}
+
+    heatmap = _get_cached_result(event, ("heatmap",), compute)
+    if include_bitmaps:
+        return heatmap
+    return {key: value for key, value in heatmap.items() if key not in ("participants", "bitmaps")}
+
+# Scheduling session of each event, kept in line with availability updates
+# Every session holds the matrix and solver state of its event, so only the most recently used events keep
+# one, and a session not used for SESSION_CACHE_TTL is dropped (it is rebuilt from the database when needed)
+SESSION_CACHE_SIZE = 64
+SESSION_CACHE_TTL = 30 * 60  # seconds
+sessions = TTLCache(SESSION_CACHE_SIZE, SESSION_CACHE_TTL)
+
+# Large events are solved in worker processes when PARALLEL_SOLVING is enabled, the pool is started on first use
+parallel_solver = ParallelSolver() if os.getenv("PARALLEL_SOLVING", "false").lower() == "true" else None
+
+def _create_best_time_algo(event: Dict, participant_sleep_hours: Dict[str, Dict[str, int]] = None) -> BestTimeAlgo:
+    """Create the best time algo with the parameters of an event"""
+    min_participants, min_duration_blocks, max_duration_blocks, event_timezone, required_participants = _get_solver_parameters(event)
+
+    return BestTimeAlgo(min_participants=min_participants, min_block_size=min_duration_blocks, max_block_size=max_duration_blocks, participant_sleep_hours=participant_sleep_hours, timezone=event_timezone, required_participants=list(required_participants))
+
+def _check_deadline(deadline: Optional[Deadline]):
+    """Raise DeadlineExceeded if there is a deadline and it has passed"""
+    if deadline is not None:
+        deadline.check()
+
+def _get_session(event: Dict, deadline: Optional[Deadline] = None) -> Optional[SchedulingSession]:
+    """
+    Get the scheduling session of an event, synced with the availability blocks in the database
+    A session synced with the current availability version of the event and busy intervals is used as is,
+    without fetching the availability again. Otherwise only users whose availability or sleep hours changed
+    since the last sync are re-indexed.
+    With a deadline, DeadlineExceeded is raised between the reads and the sync once it has passed.
+    """
+    event_id = event["event_id"]
+    # read before the availability, so a write while it is fetched makes the next call sync again
+    availability_version = get_availability_version(event_id)
+    session = sessions.get(event_id)
+    if session is not None and session.get_parameters() != _get_solver_parameters(event):
+        session = None
+    if session is not None and availability_version is not None and session.availability_version == availability_version:
+        user_uuids = session.get_user_uuids()
+        _load_busy_intervals(user_uuids)
+        if session.busy_intervals_version == busy_intervals.version:
+            _check_deadline(deadline)
+            session.update_sleep_hours(getEventSleepPreferences(event_id, user_uuids))
+            # set on every use, so that sessions in use do not expire
+            sessions.set(event_id, session)
+            return session
+    _check_deadline(deadline)
+
+    availability_blocks = get_event_availability(event_id)
+    _check_deadline(deadline)
+    availability_blocks = _get_free_availability(event_id, availability_blocks)
+    if not availability_blocks:
+        sessions.pop(event_id, None)
+        return None
+    _check_deadline(deadline)
+
+    user_uuids = sorted({block["user_uuid"] for block in availability_blocks})
+    participant_sleep_hours = getEventSleepPreferences(event_id, user_uuids)
+    _check_deadline(deadline)
+    if session is None:
+        session = SchedulingSession(_create_best_time_algo(event, participant_sleep_hours), availability_blocks, parallel_solver)
+    else:
+        # availability changed outside the bot (e.g. from the webapp) is synced here
+        session.sync(availability_blocks)
+        session.update_sleep_hours(participant_sleep_hours)
+    session.availability_version = availability_version
+    session.busy_intervals_version = busy_intervals.version
+    # set on every use, so that sessions in use do not expire
+    sessions.set(event_id, session)
+    return session
+
+def get_event_session(event_id: str) -> Optional[SchedulingSession]:
+    """Get the scheduling session of an event, None if the event does not exist or has no availability"""
+    event = getEntry("events", "event_id", event_id)
+    if not event:
+        return None
+    return _get_session(event)
+
+def _update_session(event_id: str, user_uuid: str, availability_data: List[Dict], availability_version: Optional[int]):
+    """
+    Apply a user's new availability to the scheduling session of the event, if there is one
+    availability_version is the version read before the user's blocks were replaced. If the session was
+    synced with it and the version only moved by the writes of this replacement (one for deleting the user's
+    old blocks, if they had any, and one for inserting the new ones), the session stays in line with the
+    database and is not synced again. Any other write in between makes the next read sync it.
+    """
+    session = sessions.get(event_id)
+    if session is None:
+        return
+    had_blocks = user_uuid in session.get_user_uuids()
+    user_blocks = [block for block in availability_data if block.get("user_uuid", user_uuid) == user_uuid]
+    session.replace_user_slots(user_uuid, _get_free_availability(event_id, user_blocks))
+    if availability_version is None or session.availability_version != availability_version:
+        return
+    expected_version = availability_version + int(had_blocks) + int(bool(availability_data))
+    session.availability_version = expected_version if get_availability_version(event_id) == expected_version else None
+
 def get_event_best_time(event_id: str) -> List[Dict]:
     """Get the best time for an event"""
 
@@ -204,20 +428,101 @@ def get_event_best_time(event_id: str) -> List[Dict]:
     event = getEntry("events", "event_id", event_id)
     if not event:
         return []
-    
-    min_participants = event.get("min_participants", 2)
-    min_duration_blocks = event.get("min_duration", 2)
-    max_duration_blocks = event.get("max_duration", 4)
 
-    best_time_algo = BestTimeAlgo(min_participants=min_participants, min_block_size=min_duration_blocks, max_block_size=max_duration_blocks)
+    def compute(session: Optional[SchedulingSession]) -> List[Dict]:
+        return session.get_best_event_blocks() if session else []
 
-    availability_blocks = get_event_availability(event_id)
-    if not availability_blocks:
+    return _get_cached_result(event, ("best_time",), compute)
+
+def get_event_ranked_times(event_id: str, k: int = DEFAULT_TOP_K) -> List[Dict]:
+    """Get the top k times for an event ranked by score, best first"""
+
+    # get event data
+    event = getEntry("events", "event_id", event_id)
+    if not event:
         return []
-    
-    best_event_blocks = best_time_algo._process_availability_blocks(availability_blocks)
 
-    return best_event_blocks
+    def compute(session: Optional[SchedulingSession]) -> List[Dict]:
+        return session.get_best_meeting_times(k) if session else []
+
+    return _get_cached_result(event, ("ranked_times", k), compute)
+
+def get_event_sessions(event_id: str, k: int = DEFAULT_SESSION_COUNT) -> List[Dict]:
+    """Get up to k non-overlapping times for an event run as several sessions, together covering the most participants"""
+
+    # get event data
+    event = getEntry("events", "event_id", event_id)
+    if not event:
+        return []
+
+    def compute(session: Optional[SchedulingSession]) -> List[Dict]:
+        return session.get_covering_sessions(k) if session else []
+
+    return _get_cached_result(event, ("sessions", k), compute)
+
+def get_event_weekly_times(event_id: str, k: int = DEFAULT_TOP_K) -> List[Dict]:
+    """Get the top k recurring weekly times for an event ranked by score, best first"""
+
+    # get event data
+    event = getEntry("events", "event_id", event_id)
+    if not event:
+        return []
+
+    def compute(session: Optional[SchedulingSession]) -> List[Dict]:
+        return session.get_best_weekly_times(k) if session else []
+
+    return _get_cached_result(event, ("weekly_times", k), compute)
+
+def get_event_best_time_within(event_id: str, time_budget: float, k: Optional[int] = None) -> Tuple[List[Dict], bool]:
+    """
+    Get the best times for an event found within a time budget (in seconds), and whether the search completed
+    With k None these are the best event blocks, otherwise the top k ranked by score
+    The whole call is charged to the budget, from reading the event to the search.
+    """
+    deadline = Deadline(time_budget)
+    try:
+        return _get_event_best_time_until(event_id, deadline, k)
+    except DeadlineExceeded:
+        # the budget ran out before the search started, so nothing was found
+        return [], False
+
+def _get_event_best_time_until(event_id: str, deadline: Deadline, k: Optional[int]) -> Tuple[List[Dict], bool]:
+    """Get the best times for an event found before a deadline, raising DeadlineExceeded if it passes before the search"""
+    # get event data
+    event = getEntry("events", "event_id", event_id)
+    if not event:
+        return [], True
+    deadline.check()
+
+    session = _get_session(event, deadline)
+    if not session:
+        return [], True
+    query = ("best_time",) if k is None else ("ranked_times", k)
+    key = _get_result_key(event, session, query)
+    cached = results_cache.get(key) if key is not None else None
+    if cached is not None:
+        return copy.deepcopy(cached), True
+    if session.has_solver_state():
+        # an existing solver state is synced incrementally and reading it does not rescan the windows
+        deadline.check()
+        return (session.get_best_event_blocks() if k is None else session.get_best_meeting_times(k)), True
+
+    results, complete = session.best_time_algo.get_best_times_until(session.availability_blocks, deadline, k)
+    if complete and key is not None:
+        # only complete results are exact, incomplete ones are never served from the cache
+        results_cache.set(key, copy.deepcopy(results))
+    return results, complete
+
+def get_event_participants(event_id: str, best_start_time: str, best_end_time: str) -> List[str]:
+    """Get the participants available from the best start to the best end time of an event"""
+    event = getEntry("events", "event_id", event_id)
+    if not event:
+        return []
+
+    def compute(session: Optional[SchedulingSession]) -> List[str]:
+        return session.get_event_participants(best_start_time, best_end_time) if session else []
+
+    return _get_cached_result(event, ("participants", best_start_time, best_end_time), compute)
 
 def confirmEvent(event_id: str, best_start_time: str, best_end_time: str) -> bool:
     """Confirm an event"""
@@ -237,6 +542,7 @@ def confirmEvent(event_id: str, best_start_time: str, best_end_time: str) -> boo
     success = setEntry("confirmed_events", event_id, confirmed_event_data)
     if not success:
         return False
+    set_busy_event_time(event_id, best_start_time, best_end_time)
     return True
 
 def getConfirmedEvent(event_id: str) -> Dict:
@@ -279,10 +585,11 @@ def generate_confirmed_event_participants_list(event_id: str) -> str:
     if not participants:
         return description
     description = ""
+    users = getEntriesIn("users", "uuid", [participant["user_uuid"] for participant in participants], columns=["uuid", "tele_user"]) or []
+    tele_users = {user["uuid"]: user["tele_user"] for user in users}
     for participant in participants:
-        user_data = getEntry("users", "uuid", participant["user_uuid"])
-        if user_data:
-            description += f"@{user_data['tele_user']}\n"
+        if participant["user_uuid"] in tele_users:
+            description += f"@{tele_users[participant['user_uuid']]}\n"
     return description
 
 def generate_event_description(event: dict) -> str:
@@ -0,0 +1,152 @@
+import copy
+import functools
+import unittest
+from unittest import mock
+from services import database_service, event_service
+from services.testing import FakeClient
+from best_time_algo.busy_intervals import BusyIntervals
+from best_time_algo.deadline import Deadline
+from best_time_algo.testing import make_blocks, StepClock
+
+class EventServiceTestCase(unittest.TestCase):
+    """
+    Event "1" created by user "1", with the availability of users "1" to "3" in a fake database
+    """
+    def setUp(self):
+        self.client = FakeClient({
+            "users": [{"uuid": user_uuid, "tele_id": f"tele-{user_uuid}"} for user_uuid in ["1", "2", "3"]],
+            "events": [{"event_id": "1", "event_name": "Event", "creator": "1", "min_participants": 2, "min_duration": 2, "max_duration": 4, "timezone": "Asia/Singapore", "availability_version": 0}],
+            "availability_blocks": make_blocks("1", range(0, 8)) + make_blocks("2", range(2, 8)) + make_blocks("3", range(4, 10)),
+            "membership": [],
+            "confirmed_events": [],
+        })
+        patchers = [
+            mock.patch.object(database_service, "get_supabase_client", return_value=self.client),
+            mock.patch.object(event_service, "busy_intervals", BusyIntervals()),
+            mock.patch.object(event_service, "parallel_solver", None),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        for cache in [database_service.entry_cache, event_service.results_cache, event_service.sessions]:
+            cache.clear()
+            self.addCleanup(cache.clear)
+
+class BestTimeWithinTest(EventServiceTestCase):
+    def within(self, time_budget: float):
+        # every deadline check reads the step clock once, so a budget of n seconds allows n - 1 checks
+        with mock.patch.object(event_service, "Deadline", functools.partial(Deadline, clock=StepClock())):
+            return event_service.get_event_best_time_within("1", time_budget)
+
+    def test_complete_within_budget(self):
+        results, complete = event_service.get_event_best_time_within("1", 60)
+        self.assertTrue(complete)
+        self.assertEqual(results, event_service.get_event_best_time("1"))
+        self.assertEqual(event_service.get_event_best_time_within("1", 60, 3), (event_service.get_event_ranked_times("1", 3), True))
+
+    def test_reads_are_charged(self):
+        # the deadline passes while the event, its availability and the sleep preferences are read
+        for time_budget in range(0, 6):
+            self.assertEqual(self.within(time_budget), ([], False))
+        self.assertEqual(self.within(1000), (event_service.get_event_best_time("1"), True))
+
+    def test_solver_state_is_charged(self):
+        # build the solver state, and drop the cached result so that the state is read
+        best_times = event_service.get_event_best_time("1")
+        self.assertTrue(event_service.sessions.get("1").has_solver_state())
+        event_service.results_cache.clear()
+        # the session is at the event's availability version, so it is used without syncing
+        self.assertEqual(self.within(3), ([], False))
+        self.assertEqual(self.within(4), (best_times, True))
+
+class SessionVersionTest(EventServiceTestCase):
+    def test_unchanged_availability_is_not_fetched(self):
+        best_times = event_service.get_event_best_time("1")
+        requests = self.client.table_requests["availability_blocks"]
+        session = event_service.get_event_session("1")
+        self.assertIs(session, event_service.get_event_session("1"))
+        self.assertEqual(self.client.table_requests["availability_blocks"], requests)
+        self.assertEqual(session.get_best_event_blocks(), best_times)
+
+    def test_outside_write_is_synced(self):
+        session = event_service.get_event_session("1")
+        # user 2 adds slots from outside the bot, which bumps the availability version
+        self.client.table("availability_blocks").insert(make_blocks("2", [8, 9])).execute()
+        requests = self.client.table_requests["availability_blocks"]
+        self.assertIs(event_service.get_event_session("1"), session)
+        self.assertEqual(self.client.table_requests["availability_blocks"], requests + 1)
+        self.assertEqual(session.get_event_participants(make_blocks("2", [8])[0]["start_time"], make_blocks("2", [9])[0]["end_time"]), ["2", "3"])
+
+    def test_own_write_keeps_session_in_line(self):
+        session = event_service.get_event_session("1")
+        for availability_data in [make_blocks("2", range(2, 10)), [], make_blocks("2", [0, 1])]:
+            self.assertTrue(event_service.updateUserAvailability("tele-2", "1", availability_data))
+            requests = self.client.table_requests["availability_blocks"]
+            self.assertIs(event_service.get_event_session("1"), session)
+            # the session applied the write itself, so the availability is not fetched again
+            self.assertEqual(self.client.table_requests["availability_blocks"], requests)
+            self.assertEqual(session.availability_version, self.client.tables["events"][0]["availability_version"])
+            self.assertEqual(session.get_best_meeting_times(3), event_service._create_best_time_algo(self.client.tables["events"][0], {}).get_best_meeting_times(self.client.tables["availability_blocks"], 3))
+
+class ResultCacheTest(EventServiceTestCase):
+    def get_fresh_best_time(self):
+        event_service.results_cache.clear()
+        event_service.sessions.clear()
+        return event_service.get_event_best_time("1")
+
+    def test_hit(self):
+        best_time = event_service.get_event_best_time("1")
+        hits = event_service.results_cache.get_stats()["hits"]
+        self.assertEqual(event_service.get_event_best_time("1"), best_time)
+        self.assertEqual(event_service.results_cache.get_stats()["hits"], hits + 1)
+
+    def test_results_are_copies(self):
+        best_time = event_service.get_event_best_time("1")
+        expected = copy.deepcopy(best_time)
+        best_time[0]["participants"].append("4")
+        cached = event_service.get_event_best_time("1")
+        self.assertEqual(cached, expected)
+        cached.clear()
+        self.assertEqual(event_service.get_event_best_time("1"), expected)
+
+    def test_availability_write_invalidates(self):
+        best_time = event_service.get_event_best_time("1")
+        # the creator drops the 11:00 to 13:00 window from outside the bot
+        self.client.table("availability_blocks").delete().in_("start_time", [block["start_time"] for block in make_blocks("1", range(4, 8))]).eq("user_uuid", "1").execute()
+        changed_best_time = event_service.get_event_best_time("1")
+        self.assertNotEqual(changed_best_time, best_time)
+        self.assertEqual(changed_best_time, self.get_fresh_best_time())
+
+    def test_sleep_change_invalidates(self):
+        best_time = event_service.get_event_best_time("1")
+        # user 2 sleeps through 10:00 to 14:00, saved and its cached row dropped as the bot does on writes
+        self.client.table("users").update({"sleep_start_time": "10:00:00+08:00", "sleep_end_time": "14:00:00+08:00"}).eq("uuid", "2").execute()
+        database_service._invalidate_entries("users", [("uuid", "2")])
+        changed_best_time = event_service.get_event_best_time("1")
+        self.assertNotEqual(changed_best_time, best_time)
+        self.assertEqual(changed_best_time, self.get_fresh_best_time())
+
+# heatmap of event "1": slots 0 to 9 from 09:00, with users 1, 2 and 3 from slots 0, 2 and 4
+HEATMAP = {"slot_size": 30, "start_times": [block["start_time"] for block in make_blocks("1", range(0, 10))], "counts": [1, 1, 2, 2, 3, 3, 3, 3, 1, 1]}
+HEATMAP_PARTICIPANTS = ["1", "2", "3"]
+HEATMAP_BITMAPS = ["1", "1", "3", "3", "7", "7", "7", "7", "4", "4"]  # bit i is participants[i]
+
+class HeatmapTest(EventServiceTestCase):
+    def test_counts(self):
+        self.assertEqual(event_service.get_event_heatmap("1"), HEATMAP)
+
+    def test_bitmaps(self):
+        self.assertEqual(event_service.get_event_heatmap("1", include_bitmaps=True), {**HEATMAP, "participants": HEATMAP_PARTICIPANTS, "bitmaps": HEATMAP_BITMAPS})
+        # both are served from the same cached heatmap
+        hits = event_service.results_cache.get_stats()["hits"]
+        self.assertEqual(event_service.get_event_heatmap("1"), HEATMAP)
+        self.assertEqual(event_service.results_cache.get_stats()["hits"], hits + 1)
+
+    def test_empty_event(self):
+        self.client.tables["availability_blocks"].clear()
+        self.assertEqual(event_service.get_event_heatmap("1"), {"slot_size": 30, "start_times": [], "counts": []})
+        self.assertEqual(event_service.get_event_heatmap("1", include_bitmaps=True), {"slot_size": 30, "start_times": [], "counts": [], "participants": [], "bitmaps": []})
+        self.assertEqual(event_service.get_event_heatmap("2"), {})
+
+if __name__ == "__main__":
+    unittest.main()
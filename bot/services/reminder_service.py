@@ -6,7 +6,7 @@ import time
 from telegram.config.config import bot
 
 # Import from services
-from .database_service import setEntry, updateEntry, getEntries, getEntry, supabase
+from .database_service import setEntry, updateEntry, getEntries, getEntry, get_supabase_client
 from .user_service import getUser
 from .event_service import getEvent, check_ownership, generate_confirmed_event_participants_list, getConfirmedEvent
 
@@ -47,7 +47,7 @@ def send_group_message(group_id: str, message_thread_id: str, message: str):
 
 def send_daily_availability_reminders():
     """Send daily availability reminders for all events"""
-    response = supabase.rpc("get_unconfirmed_active_events_at_noon_local_time").execute()
+    response = get_supabase_client().rpc("get_unconfirmed_active_events_at_noon_local_time").execute()
     events = response.data
     print("events", events)
     for event in events:
@@ -64,7 +64,7 @@ def send_daily_availability_reminders():
 
 def send_daily_event_reminders():
     """Send daily reminders for all events"""
-    response = supabase.rpc("get_confirmed_events_at_local_noon").execute()
+    response = get_supabase_client().rpc("get_confirmed_events_at_local_noon").execute()
     events = response.data
     print("events", events)
     for event in events:
@@ -90,7 +90,7 @@ def send_daily_event_reminders():
 
 def send_upcoming_event_reminders():
     """Send upcoming event reminders for all events"""
-    response = supabase.rpc("get_confirmed_events_starting_soon").execute()
+    response = get_supabase_client().rpc("get_confirmed_events_starting_soon").execute()
     events = response.data
     print("events", events)
     for event in events:
@@ -6,7 +6,7 @@ import logging
 
 # import from services
 from services.database_service import getEntry, setEntry, updateEntry, getEntries
-from services.database_service import supabase
+from services.database_service import get_supabase_client
 from services.event_service import getEvent, getConfirmedEvent
 from services.availability_service import ask_join, ask_availability
 
@@ -19,7 +19,7 @@ EXPIRY_TIME = 60 * 15 # 15 minutes
 
 def get_chat(event_id: str, chat_id: int) -> dict:
     """Get a chat for an event"""
-    return supabase.table("event_chats").select("*").eq("event_id", event_id).eq("chat_id", chat_id).execute()
+    return get_supabase_client().table("event_chats").select("*").eq("event_id", event_id).eq("chat_id", chat_id).execute()
 
 def set_chat(event_id: str, chat_id: int, thread_id: int = None) -> bool:
     """Set a chat for an event"""
@@ -53,7 +53,7 @@ def put_ctx(user_id: str, chat_id: str, message_id: str, thread_id: str | None,
     return token
 
 def get_ctx(token: str) -> dict:
-    ctx = supabase.rpc("get_and_use_share_token", {"p_token": token}).execute()
+    ctx = get_supabase_client().rpc("get_and_use_share_token", {"p_token": token}).execute()
     if ctx.data:
         return ctx.data[0]
     else:
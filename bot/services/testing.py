@@ -0,0 +1,127 @@
+from collections import Counter
+from types import SimpleNamespace
+
+"""
+In-memory stand-ins for the Supabase clients, shared by the tests of the services
+
+The tests patch get_supabase_client of the database helpers with a FakeClient (and get_async_supabase_client
+of the async database service with an AsyncFakeClient), so every service runs its real queries against
+tables held in dictionaries, without a database.
+"""
+
+class FakeQuery:
+    """
+    Query on the rows of a FakeClient table, supporting the calls the database helpers make
+    """
+    def __init__(self, client, table: str):
+        self.client = client
+        self.table = table
+        self.action = ("select", "*")
+        self.filters = []
+        self.count = None
+        self.in_values = None
+
+    def select(self, columns: str):
+        self.action = ("select", columns)
+        return self
+
+    def insert(self, data):
+        self.action = ("insert", data)
+        return self
+
+    def update(self, data: dict):
+        self.action = ("update", data)
+        return self
+
+    def delete(self):
+        self.action = ("delete", None)
+        return self
+
+    def eq(self, field: str, value):
+        self.filters.append(lambda row: row.get(field) == value)
+        return self
+
+    def in_(self, field: str, values: list):
+        self.in_values = list(values)
+        self.filters.append(lambda row: row.get(field) in values)
+        return self
+
+    def limit(self, count: int):
+        self.count = count
+        return self
+
+    def execute(self):
+        self.client.requests += 1
+        self.client.table_requests[self.table] += 1
+        self.client.queries.append(self)
+        rows = self.client.tables.setdefault(self.table, [])
+        action, data = self.action
+        if action == "insert":
+            inserted = [dict(row) for row in (data if isinstance(data, list) else [data])]
+            rows.extend(inserted)
+            self.client.changed(self.table, inserted)
+            return SimpleNamespace(data=inserted)
+        matched = [row for row in rows if all(matches(row) for matches in self.filters)]
+        if action == "update":
+            for row in matched:
+                row.update(data)
+            self.client.changed(self.table, matched)
+        elif action == "delete":
+            for row in matched:
+                rows.remove(row)
+            self.client.changed(self.table, matched)
+        else:
+            if self.count is not None:
+                matched = matched[:self.count]
+            if data != "*":
+                matched = [{column: row.get(column) for column in data.split(",")} for row in matched]
+        return SimpleNamespace(data=[dict(row) for row in matched])
+
+class FakeClient:
+    """
+    In-memory stand-in for the Supabase client, counting the requests made to it
+    """
+    def __init__(self, tables: dict):
+        self.tables = tables
+        self.requests = 0
+        self.table_requests = Counter()
+        self.queries = []  # executed queries, to check what was sent
+
+    def table(self, table: str) -> FakeQuery:
+        return FakeQuery(self, table)
+
+    def changed(self, table: str, rows: list):
+        """
+        Bump the availability version of the events whose availability blocks were written, as the
+        triggers of shared/database/triggers.sql do
+        """
+        if table != "availability_blocks" or not rows:
+            return
+        event_ids = {row.get("event_id") for row in rows}
+        for event in self.tables.get("events", []):
+            if event.get("event_id") in event_ids:
+                event["availability_version"] = event.get("availability_version", 0) + 1
+
+class AsyncFakeQuery(FakeQuery):
+    """
+    Query of an AsyncFakeClient, executed with await
+    """
+    async def execute(self):
+        return FakeQuery.execute(self)
+
+class AsyncFakeClient(FakeClient):
+    """
+    In-memory stand-in for the async Supabase client, with database functions given as callables of their params
+    """
+    def __init__(self, tables: dict, functions: dict = None):
+        super().__init__(tables)
+        self.functions = functions or {}
+
+    def table(self, table: str) -> AsyncFakeQuery:
+        return AsyncFakeQuery(self, table)
+
+    def rpc(self, function: str, params: dict):
+        async def execute():
+            self.requests += 1
+            return SimpleNamespace(data=self.functions[function](params))
+        return SimpleNamespace(execute=execute)
@@ -9,9 +9,6 @@ import os
 # Import from config
 from ..config.config import bot
 
-# Import from best time algo
-from best_time_algo.best_time_algo import BestTimeAlgo
-
 # Import from services
 from services.user_service import (
     getUser,
@@ -29,7 +26,7 @@ from services.event_service import (
     join_event_by_uuid, 
     generate_confirmed_event_description, 
     generate_event_description,
-    get_event_availability,
+    get_event_participants,
     getConfirmedEvent, 
     get_event_chat
     )
@@ -176,16 +173,8 @@ def handle_event_confirmation(event_id, best_start_time, best_end_time):
             bot.send_message(chat_id=creator_tele_id, text=f"Event {event['event_name']} is already confirmed.")
             return
         
-        # set up scheduler
-        min_participants = event["min_participants"]
-        min_duration_blocks = event["min_duration"]
-        max_duration_blocks = event["max_duration"]
-        best_time_algo = BestTimeAlgo(min_participants=min_participants, min_block_size=min_duration_blocks, max_block_size=max_duration_blocks)
-
-
         # get participants
-        availability_blocks = get_event_availability(event_id)
-        participants = best_time_algo.get_event_participants(availability_blocks, best_start_time, best_end_time)
+        participants = get_event_participants(event_id, best_start_time, best_end_time)
         print("participants", participants)
         # Confirm the event
         success = confirmEvent(event_id, best_start_time, best_end_time)
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import threading
+from typing import Any, Iterable, Iterator, List, Optional
+import httpx
+from dotenv import load_dotenv
+from supabase import create_client, acreate_client, Client, AsyncClient, ClientOptions, AsyncClientOptions
+
+"""
+Supabase client shared by every service of the process
+
+The client is created on first use rather than at import time, and only once, so every service of the bot
+sends its requests through the same HTTP connection pool and reuses warm keep-alive connections instead of
+opening a new TLS connection per request. The pool and timeouts can be tuned through environment variables.
+
+The async client (for the FastAPI endpoints) is created the same way on its own pool, as it has to run
+on the event loop rather than block it.
+
+This is the only copy of the factory: the bot is deployed with bot/ as its root, where the shared package
+is not available, so the shared services import it from here (shared/utils/supabase_client.py re-exports it).
+"""
+
+MAX_CONNECTIONS = 20  # Most connections open at once (SUPABASE_MAX_CONNECTIONS)
+MAX_KEEPALIVE_CONNECTIONS = 10  # Most idle connections kept open for reuse (SUPABASE_MAX_KEEPALIVE_CONNECTIONS)
+KEEPALIVE_EXPIRY = 30.0  # Seconds an idle connection is kept open (SUPABASE_KEEPALIVE_EXPIRY)
+CONNECT_TIMEOUT = 5.0  # Seconds to open a connection (SUPABASE_CONNECT_TIMEOUT)
+REQUEST_TIMEOUT = 30.0  # Seconds to read, write or wait for a pooled connection (SUPABASE_REQUEST_TIMEOUT)
+IN_CHUNK_SIZE = 100  # Most values per in_ filter, keeping the request URL short
+
+_client: Optional[Client] = None
+_client_lock = threading.Lock()
+_async_client: Optional[AsyncClient] = None
+_async_client_lock: Optional[asyncio.Lock] = None
+
+def select_columns(columns: Optional[List[str]] = None) -> str:
+    """Select clause for the given columns, all columns if none are given"""
+    return ",".join(columns) if columns else "*"
+
+def chunk_values(values: Iterable[Any], size: int = IN_CHUNK_SIZE) -> Iterator[List[Any]]:
+    """Split values, without duplicates, into chunks of at most size values for in_ filters"""
+    unique_values = list(dict.fromkeys(values))
+    for start in range(0, len(unique_values), size):
+        yield unique_values[start:start + size]
+
+def get_http_limits() -> httpx.Limits:
+    """Connection pool limits, from the environment or the defaults"""
+    return httpx.Limits(
+        max_connections=int(os.getenv('SUPABASE_MAX_CONNECTIONS', MAX_CONNECTIONS)),
+        max_keepalive_connections=int(os.getenv('SUPABASE_MAX_KEEPALIVE_CONNECTIONS', MAX_KEEPALIVE_CONNECTIONS)),
+        keepalive_expiry=float(os.getenv('SUPABASE_KEEPALIVE_EXPIRY', KEEPALIVE_EXPIRY)),
+    )
+
+def get_http_timeout() -> httpx.Timeout:
+    """Request timeouts, from the environment or the defaults"""
+    return httpx.Timeout(
+        float(os.getenv('SUPABASE_REQUEST_TIMEOUT', REQUEST_TIMEOUT)),
+        connect=float(os.getenv('SUPABASE_CONNECT_TIMEOUT', CONNECT_TIMEOUT)),
+    )
+
+def get_supabase_client() -> Client:
+    """Get the Supabase client of the process, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # Load environment variables
+                load_dotenv()
+                timeout = get_http_timeout()
+                http_client = httpx.Client(limits=get_http_limits(), timeout=timeout)
+                _client = create_client(
+                    os.getenv('SUPABASE_URL'),
+                    os.getenv('SUPABASE_KEY'),
+                    options=ClientOptions(httpx_client=http_client, postgrest_client_timeout=timeout)
+                )
+    return _client
+
+async def get_async_supabase_client() -> AsyncClient:
+    """Get the async Supabase client of the process, creating it on first use"""
+    global _async_client, _async_client_lock
+    if _async_client is None:
+        if _async_client_lock is None:
+            _async_client_lock = asyncio.Lock()
+        async with _async_client_lock:
+            if _async_client is None:
+                # Load environment variables
+                load_dotenv()
+                timeout = get_http_timeout()
+                http_client = httpx.AsyncClient(limits=get_http_limits(), timeout=timeout)
+                _async_client = await acreate_client(
+                    os.getenv('SUPABASE_URL'),
+                    os.getenv('SUPABASE_KEY'),
+                    options=AsyncClientOptions(httpx_client=http_client, postgrest_client_timeout=timeout)
+                )
+    return _async_client
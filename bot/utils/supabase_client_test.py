@@ -0,0 +1,48 @@
+import asyncio
+import unittest
+from unittest import mock
+from utils import supabase_client
+
+class SupabaseClientTest(unittest.TestCase):
+    def setUp(self):
+        for name in ["_client", "_async_client", "_async_client_lock"]:
+            patcher = mock.patch.object(supabase_client, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_client_is_created_once(self):
+        with mock.patch.object(supabase_client, "create_client") as create_client:
+            self.assertIs(supabase_client.get_supabase_client(), supabase_client.get_supabase_client())
+        create_client.assert_called_once()
+        # every request goes through the pooled http client
+        options = create_client.call_args.kwargs["options"]
+        self.assertIsInstance(options.httpx_client, supabase_client.httpx.Client)
+
+    def test_async_client_is_created_once(self):
+        async def get_clients():
+            return await asyncio.gather(*(supabase_client.get_async_supabase_client() for _ in range(3)))
+
+        with mock.patch.object(supabase_client, "acreate_client", new_callable=mock.AsyncMock) as acreate_client:
+            clients = asyncio.run(get_clients())
+        acreate_client.assert_awaited_once()
+        self.assertTrue(all(client is clients[0] for client in clients))
+
+    def test_http_settings_from_environment(self):
+        with mock.patch.dict("os.environ", {"SUPABASE_MAX_CONNECTIONS": "5", "SUPABASE_CONNECT_TIMEOUT": "1.5"}):
+            limits = supabase_client.get_http_limits()
+            timeout = supabase_client.get_http_timeout()
+        self.assertEqual(limits.max_connections, 5)
+        self.assertEqual(limits.max_keepalive_connections, supabase_client.MAX_KEEPALIVE_CONNECTIONS)
+        self.assertEqual(timeout.connect, 1.5)
+        self.assertEqual(timeout.read, supabase_client.REQUEST_TIMEOUT)
+
+    def test_select_columns(self):
+        self.assertEqual(supabase_client.select_columns(None), "*")
+        self.assertEqual(supabase_client.select_columns(["uuid", "tele_id"]), "uuid,tele_id")
+
+    def test_chunk_values(self):
+        self.assertEqual(list(supabase_client.chunk_values(["a", "b", "a", "c"], 2)), [["a", "b"], ["c"]])
+        self.assertEqual(list(supabase_client.chunk_values([])), [])
+
+if __name__ == "__main__":
+    unittest.main()
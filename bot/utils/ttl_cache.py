@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+import threading
+import time
+
+"""
+Least recently used cache with a time to live
+
+Entries are kept in order of use and the least recently used entry is evicted once the cache is
+full. Every entry also expires ttl seconds after it was set, which bounds how stale a result can be
+when the data behind it can change without the bot knowing (e.g. writes from the webapp).
+Lookups are counted as hits or misses (missing or expired) so the cache can be monitored.
+"""
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Mapping of at most maxsize entries, each expiring ttl seconds after it was set
+    """
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()  # key -> (expiry time, value)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get the value of a key, default if it is missing or expired
+        """
+        with self.lock:
+            entry = self.entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expiry, value = entry
+            if time.monotonic() >= expiry:
+                del self.entries[key]
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        """
+        Set the value of a key, evicting the least recently used entries if the cache is full
+        """
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def get_or_set(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Get the value of a key, computing and setting it if it is missing or expired
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Remove a key, returning its value (expired or not), default if it is missing
+        """
+        with self.lock:
+            entry = self.entries.pop(key, _MISSING)
+            return default if entry is _MISSING else entry[1]
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Remove every entry whose key matches the predicate
+        Returns the number of entries removed
+        """
+        with self.lock:
+            keys = [key for key in self.entries if predicate(key)]
+            for key in keys:
+                del self.entries[key]
+            return len(keys)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get the number of hits, misses and entries
+        """
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
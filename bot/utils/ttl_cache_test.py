@@ -0,0 +1,82 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from utils import ttl_cache
+from utils.ttl_cache import TTLCache
+
+class TTLCacheTest(unittest.TestCase):
+    def setUp(self):
+        # a clock the tests move by hand
+        self.now = 0.0
+        patcher = mock.patch.object(ttl_cache, "time", SimpleNamespace(monotonic=lambda: self.now))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_expiry(self):
+        cache = TTLCache(4, 10)
+        cache.set("a", 1)
+        self.now = 9.9
+        self.assertEqual(cache.get("a"), 1)
+        self.now = 10
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+        # setting again restarts the time to live
+        cache.set("a", 2)
+        self.now = 19.9
+        self.assertEqual(cache.get("a", "missing"), 2)
+        self.now = 20
+        self.assertEqual(cache.get("a", "missing"), "missing")
+
+    def test_lru_eviction(self):
+        cache = TTLCache(2, 10)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        # using a makes b the least recently used
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(list(cache.entries), ["a", "c"])
+        # setting an existing key makes it the most recently used
+        cache.set("a", 4)
+        cache.set("d", 5)
+        self.assertEqual(list(cache.entries), ["a", "d"])
+        self.assertEqual(cache.get("a"), 4)
+
+    def test_stats(self):
+        cache = TTLCache(4, 10)
+        cache.get("a")
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("a")
+        self.now = 10
+        # expired entries are misses
+        cache.get("a")
+        self.assertEqual(cache.get_stats(), {"hits": 2, "misses": 2, "size": 0})
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+    def test_get_or_set(self):
+        cache = TTLCache(4, 10)
+        compute = mock.Mock(return_value=[])
+        self.assertEqual(cache.get_or_set("a", compute), [])
+        self.assertEqual(cache.get_or_set("a", compute), [])
+        # a falsy value is cached like any other
+        compute.assert_called_once()
+        self.now = 10
+        cache.get_or_set("a", compute)
+        self.assertEqual(compute.call_count, 2)
+
+    def test_pop_and_invalidate(self):
+        cache = TTLCache(4, 10)
+        for key in [("users", 1), ("users", 2), ("events", 1)]:
+            cache.set(key, key[1])
+        self.assertEqual(cache.invalidate(lambda key: key[0] == "users"), 2)
+        self.assertEqual(list(cache.entries), [("events", 1)])
+        self.now = 10
+        # pop returns expired values too
+        self.assertEqual(cache.pop(("events", 1)), 1)
+        self.assertEqual(cache.pop(("events", 1), "missing"), "missing")
+        cache.set("a", 1)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -18,7 +18,7 @@ class AvailabilityService:
         """Get a user's availability for an event"""
         try:
             # Get user details
-            user_data = self.db.getEntry("users", "tele_id", tele_id)
+            user_data = self.db.getEntry("users", "tele_id", tele_id, columns=["uuid"])
             if not user_data:
                 return []
             
@@ -51,7 +51,7 @@ class AvailabilityService:
         """Update a user's availability for an event"""
         try:
             # Get user details
-            user_data = self.db.getEntry("users", "tele_id", tele_id)
+            user_data = self.db.getEntry("users", "tele_id", tele_id, columns=["uuid"])
             if not user_data:
                 return False
             
@@ -120,17 +120,18 @@ class AvailabilityService:
             if not availability_blocks:
                 return {}
             
+            # Get the details of all users at once
+            user_uuids = [block["user_uuid"] for block in availability_blocks if block.get("user_uuid")]
+            users = self.db.getEntriesIn("users", "uuid", user_uuids, columns=["uuid", "tele_id"]) or []
+            tele_ids = {user["uuid"]: user.get("tele_id") for user in users}
+            
             # Group by user
             availability_by_user = defaultdict(list)
             
             for block in availability_blocks:
                 user_uuid = block.get("user_uuid")
-                if user_uuid:
-                    # Get user details
-                    user_data = self.db.getEntry("users", "uuid", user_uuid)
-                    if user_data:
-                        tele_id = user_data.get("tele_id")
-                        availability_by_user[tele_id].append(block)
+                if user_uuid in tele_ids:
+                    availability_by_user[tele_ids[user_uuid]].append(block)
             
             return dict(availability_by_user)
         except Exception as e:
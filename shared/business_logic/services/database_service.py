@@ -1,24 +1,18 @@
-import os
-from supabase import create_client, Client
-from dotenv import load_dotenv
+from supabase import Client
+
+from ...utils.supabase_client import get_supabase_client, select_columns, chunk_values
 
 class DatabaseService:
     """Database service for direct database operations"""
     
     def __init__(self):
-        # Load environment variables
-        load_dotenv()
-        
-        # Initialize Supabase client
-        self.supabase: Client = create_client(
-            os.getenv('SUPABASE_URL'),
-            os.getenv('SUPABASE_KEY')
-        )
+        # Every instance shares the pooled client of the process
+        self.supabase: Client = get_supabase_client()
     
-    def getEntry(self, table: str, key_field: str, key_value: str):
-        """Get an entry from a table by a key field"""
+    def getEntry(self, table: str, key_field: str, key_value: str, columns: list[str] = None):
+        """Get an entry from a table by a key field, with only the given columns if any"""
         try:
-            response = self.supabase.table(table).select("*").eq(key_field, key_value).execute()
+            response = self.supabase.table(table).select(select_columns(columns)).eq(key_field, key_value).limit(1).execute()
             if response.data and len(response.data) > 0:
                 return response.data[0]
             return None
@@ -26,15 +20,28 @@ class DatabaseService:
             print(f"Error getting entry from {table}: {e}")
             return None
     
-    def getEntries(self, table: str, key_field: str, key_value: str):
-        """Get multiple entries from a table by a key field"""
+    def getEntries(self, table: str, key_field: str, key_value: str, columns: list[str] = None):
+        """Get multiple entries from a table by a key field, with only the given columns if any"""
         try:
-            response = self.supabase.table(table).select("*").eq(key_field, key_value).execute()
+            response = self.supabase.table(table).select(select_columns(columns)).eq(key_field, key_value).execute()
             return response.data
         except Exception as e:
             print(f"Error getting entries from {table}: {e}")
             return None
 
+    def getEntriesIn(self, table: str, key_field: str, key_values: list[str], columns: list[str] = None):
+        """Get the entries of a table whose key field is any of the given values, with only the given columns if any"""
+        try:
+            entries = []
+            # one request per chunk of values rather than one per value
+            for chunk in chunk_values(key_values):
+                response = self.supabase.table(table).select(select_columns(columns)).in_(key_field, chunk).execute()
+                entries.extend(response.data or [])
+            return entries
+        except Exception as e:
+            print(f"Error getting entries from {table}: {e}")
+            return None
+
     def setEntry(self, table: str, id: str, data: dict) -> bool:
         """Set an entry in a table with the given ID"""
         try:
@@ -41,7 +41,7 @@ class EventService:
         """Create a new event and return its ID"""
         try:
             # Get creator details
-            creator_data = self.db.getEntry("users", "tele_id", creator_tele_id)
+            creator_data = self.db.getEntry("users", "tele_id", creator_tele_id, columns=["uuid"])
             if not creator_data:
                 print(f"Creator not found: {creator_tele_id}")
                 return None
@@ -80,7 +80,7 @@ class EventService:
                 return False
             
             # Get user details
-            user_data = self.db.getEntry("users", "tele_id", user_tele_id)
+            user_data = self.db.getEntry("users", "tele_id", user_tele_id, columns=["uuid"])
             if not user_data:
                 return False
             
@@ -120,12 +120,12 @@ class EventService:
             sleep_prefs = {}
             participants = current_event_data.get("participants", [])
             
-            for user_uuid in participants:
-                user_data = self.db.getEntry("users", "uuid", user_uuid)
-                if user_data and "sleep_start" in user_data and "sleep_end" in user_data:
-                    sleep_prefs[user_uuid] = {
-                        "start": user_data["sleep_start"],
-                        "end": user_data["sleep_end"]
+            users = self.db.getEntriesIn("users", "uuid", participants, columns=["uuid", "sleep_start_time", "sleep_end_time"]) or []
+            for user_data in users:
+                if user_data.get("sleep_start_time") and user_data.get("sleep_end_time"):
+                    sleep_prefs[user_data["uuid"]] = {
+                        "start": user_data["sleep_start_time"],
+                        "end": user_data["sleep_end_time"]
                     }
             
             return sleep_prefs
@@ -137,7 +137,7 @@ class EventService:
         """Get all events that a user is a member of"""
         try:
             # Get user details
-            user_data = self.db.getEntry("users", "tele_id", user_tele_id)
+            user_data = self.db.getEntry("users", "tele_id", user_tele_id, columns=["uuid"])
             if not user_data:
                 return []
             
@@ -44,6 +44,8 @@ CREATE TABLE events (
   creator         UUID            NOT NULL
                     REFERENCES users(uuid)
                     ON DELETE RESTRICT,
+  required_participants UUID[] NOT NULL DEFAULT '{}', -- besides the creator, participants every best time must include
+  availability_version BIGINT NOT NULL DEFAULT 0, -- bumped by a trigger on every write to the availability blocks of the event
   created_at      TIMESTAMPTZ       NOT NULL DEFAULT NOW()
 );
 
@@ -91,6 +93,7 @@ CREATE TABLE availability_blocks (
                     ON DELETE CASCADE,
   start_time    TIMESTAMPTZ       NOT NULL,      
   end_time      TIMESTAMPTZ       NOT NULL,      
+  weight        SMALLINT          NOT NULL DEFAULT 1, -- 1 possible, 2 preferred
   PRIMARY KEY (event_id, user_uuid, start_time)
 );
 
@@ -0,0 +1,26 @@
+-- Bump the availability version of every event whose availability blocks a statement changed,
+-- so results cached against the version are not served again, whether the bot or the webapp wrote them
+CREATE OR REPLACE FUNCTION bump_availability_version()
+RETURNS TRIGGER AS $$
+BEGIN
+  UPDATE events
+  SET availability_version = availability_version + 1
+  WHERE event_id IN (SELECT DISTINCT event_id FROM changed_rows);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER availability_blocks_inserted
+AFTER INSERT ON availability_blocks
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE FUNCTION bump_availability_version();
+
+CREATE TRIGGER availability_blocks_updated
+AFTER UPDATE ON availability_blocks
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE FUNCTION bump_availability_version();
+
+CREATE TRIGGER availability_blocks_deleted
+AFTER DELETE ON availability_blocks
+REFERENCING OLD TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE FUNCTION bump_availability_version();
@@ -0,0 +1,22 @@
+# Import from the bot, which is deployed on its own with bot/ as its root and so keeps the factory
+from bot.utils.supabase_client import (
+    MAX_CONNECTIONS,
+    MAX_KEEPALIVE_CONNECTIONS,
+    KEEPALIVE_EXPIRY,
+    CONNECT_TIMEOUT,
+    REQUEST_TIMEOUT,
+    IN_CHUNK_SIZE,
+    select_columns,
+    chunk_values,
+    get_http_limits,
+    get_http_timeout,
+    get_supabase_client,
+    get_async_supabase_client,
+)
+
+"""
+Supabase client of the shared services
+
+The pooled client factory and its settings live in bot/utils/supabase_client.py and are re-exported here,
+so the pool is configured in a single place for both layers.
+"""
@@ -25,6 +25,15 @@ export interface EventBlock {
   participant_count: number;
 }
 
+export interface EventHeatmap {
+  slot_size: number;
+  start_times: string[];
+  counts: number[];
+  // only present when requested with includeBitmaps, bit i of bitmaps[j] (hex) is participants[i]
+  participants?: string[];
+  bitmaps?: string[];
+}
+
 export class EventService {
   /**
    * Get event details by ID
@@ -258,4 +267,25 @@ export class EventService {
       return [];
     }
   }
-} 
\ No newline at end of file
+
+  /**
+   * Get the number of participants available at each slot of an event
+   */
+  async getEventHeatmap(eventId: string, includeBitmaps = false): Promise<EventHeatmap | null> {
+    try {
+      const data = {
+        event_id: eventId,
+        include_bitmaps: includeBitmaps,
+      }
+      const response = await fetch(process.env.API_URL + '/api/event/heatmap', {
+        method: 'POST',
+        body: JSON.stringify(data),
+      });
+      const result = await response.json();
+      return result.data;
+    } catch (error) {
+      console.error('Error getting event heatmap:', error);
+      return null;
+    }
+  }
+}